@@ -48,6 +48,19 @@ class Config:
     ASM_EXT = {".asm", ".txt"}
     LXP_EXT = {".lxp"}
     MAC_EXT = {".mac", ".txt"}
+    # Symbol tables of data macros are cached here. Set MACRO_CACHE_FOLDER to "off" to disable the cache.
+    MACRO_CACHE_FOLDER = os.environ.get("MACRO_CACHE_FOLDER") or os.path.join(DOWNLOAD_PATH, "tpf_macro_cache")
+    MACRO_CACHE_FOLDER = str() if MACRO_CACHE_FOLDER == "off" else MACRO_CACHE_FOLDER
+    MACRO_CACHE_VERSION = 2  # Increment to discard all cached macros
+    # Assembled segments are cached here. Set SEGMENT_CACHE_FOLDER to "off" to disable the cache.
+    SEGMENT_CACHE_FOLDER = os.environ.get("SEGMENT_CACHE_FOLDER") or os.path.join(DOWNLOAD_PATH, "tpf_segment_cache")
+    SEGMENT_CACHE_FOLDER = str() if SEGMENT_CACHE_FOLDER == "off" else SEGMENT_CACHE_FOLDER
+    SEGMENT_CACHE_VERSION = 3  # Increment to discard all cached segments
+    PREWARM_WORKERS: int = int(os.environ.get("PREWARM_WORKERS") or os.cpu_count() or 1)
+    # Listing commands are written to firestore in write batches of LST_CMD_BATCH_SIZE (at most 500 writes in a batch).
+    # LST_CMD_WORKERS batches are committed at the same time.
+    LST_CMD_BATCH_SIZE: int = 200
+    LST_CMD_WORKERS: int = 20
 
     # Used by utils
     REG_INVALID: str = "??"
@@ -83,6 +96,7 @@ class Config:
     CALL_AND_RETURN: Set[str] = {"ENTRC", "BAS", "BAL", "JAS", "BRAS"}
 
     # Used by assembly
+    EXPRESSION_CACHE_SIZE: int = 1 << 16  # Number of compiled operands of get_value
     MASK: Dict[str, int] = {"BR": 15, "B": 15, "J": 15, "BAS": 15, "JAS": 15, "BE": 8, "BNE": 7, "BH": 2, "BNH": 13,
                             "BL": 4, "BNL": 11, "BM": 4, "BNM": 11, "BP": 2, "BNP": 13, "BCRY": 3, "BO": 1, "BNO": 14,
                             "BZ": 8, "BNZ": 7, "JE": 8, "JNE": 7, "JH": 2, "JNH": 13, "JL": 4, "JNL": 11, "JM": 4,
@@ -126,6 +140,14 @@ class Config:
                                  "VA": 0x45, "S2": 0x46, "SU": 0x48, "MN": 0x49, "IW": 0x4A, "EY": 0x4B, "9V": 0x4C,
                                  "8U": 0x4D, "3M": 0x4E, "F0": 0x50, "XH": 0x51, "HM": 0x55, "XL": 0x59, "LA": 0x5A,
                                  "4M": 0x5B}
+    # Variations of a test data are run in a process pool when there is more than 1 worker
+    VARIATION_WORKERS: int = int(os.environ.get("VARIATION_WORKERS") or 0)
+    VARIATION_START_METHOD: str = os.environ.get("VARIATION_START_METHOD") or "spawn"
+    # Only the last TRACE_BUFFER_SIZE instructions of the debugged segments are traced
+    TRACE_BUFFER_SIZE: int = int(os.environ.get("TRACE_BUFFER_SIZE") or 10000)
+    TRACE_PAGE_SIZE: int = 500  # Traces in an output. The remaining traces are read a page at a time.
+    # Test data of a profiler run are run in a process pool when there is more than 1 worker
+    PROFILER_WORKERS: int = int(os.environ.get("PROFILER_WORKERS") or 0)
 
     # Used by db
     AAAPNR: str = "AAAAAA"
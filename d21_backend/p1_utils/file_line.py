@@ -1,5 +1,6 @@
 import re
-from typing import List, Optional
+from sys import intern
+from typing import List, Optional, Iterator, Iterable, Union, TextIO
 
 from d21_backend.config import config
 
@@ -21,39 +22,74 @@ class File:
         return lines
 
     def __init__(self, filename: str = None):
-        self.lines: List[str] = list()
+        self.filename: Optional[str] = filename
         self.buffer: List[str] = list()
-        if not filename:
-            return
-        self.buffer = self.open_file(filename)
-        self.convert_to_lines()
+        self._lines: Optional[List[str]] = None
+
+    @property
+    def lines(self) -> List[str]:
+        if self._lines is None:
+            self._lines = list(self.iter_lines())
+        return self._lines
 
     def convert_to_lines(self):
-        # Remove the CVS header if present
-        index = 0
-        for line in self.buffer:
-            if line[:2] not in config.CVS_C2:
-                break
-            index += 1
-        lines = self.buffer[index:] if index < len(self.buffer) else list()
-        # Remove empty lines and trailing new line character & make everything upper case
-        lines = [line.strip("\n").upper() for line in lines if line.strip()]
-        if not lines:
-            return
-        # Find the character that is added by CVS on each line
-        char = str()
-        if all(line[0] == lines[0][0] for line in lines):
-            char = lines[0][0]
-        # Remove (TRIM) the character from each line
-        if char in config.TRIM:
-            lines = [line[config.TRIM[char]:] for line in lines]
-        # Remove comments
-        lines = [line for line in lines if line.strip() and line[0] not in config.COMMENT_C1]
-        self.lines = lines
+        self._lines = list(self.iter_lines())
         return
 
+    def iter_lines(self) -> Iterator[str]:
+        # Lines are read from the file as they are consumed. Only the buffer is used if it has lines.
+        if self.buffer or not self.filename:
+            yield from self.convert(self.buffer)
+            return
+        try:
+            with open(self.filename, "r", errors="replace") as file:
+                yield from self.convert(file)
+        except FileNotFoundError:
+            return
+
+    @staticmethod
+    def _remove_header(file_lines: Iterable[str]) -> Iterator[str]:
+        # Remove the CVS header if present. Remove empty lines and trailing new line character & make it upper case.
+        file_lines = iter(file_lines)
+        for line in file_lines:
+            if line[:2] in config.CVS_C2:
+                continue
+            if line.strip():
+                yield line.strip("\n").upper()
+            break
+        for line in file_lines:
+            if line.strip():
+                yield line.strip("\n").upper()
+
+    @classmethod
+    def _get_trim_char(cls, file_lines: Iterable[str]) -> str:
+        # The character that is added by CVS on each line. The scan stops at the first line that does not have it.
+        lines = cls._remove_header(file_lines)
+        first_line = next(lines, None)
+        if first_line is None or first_line[0] not in config.TRIM:
+            return str()
+        char = first_line[0]
+        return char if all(line[0] == char for line in lines) else str()
+
+    @classmethod
+    def convert(cls, file_lines: Union[TextIO, List[str]]) -> Iterator[str]:
+        # The file is scanned once for the trim character and then read again from the start.
+        char = cls._get_trim_char(file_lines)
+        if not isinstance(file_lines, list):
+            file_lines.seek(0)
+        for line in cls._remove_header(file_lines):
+            # Remove (TRIM) the character from each line
+            if char:
+                line = line[config.TRIM[char]:]
+            # Remove comments
+            if line.strip() and line[0] not in config.COMMENT_C1:
+                yield line
+
 
 class Line:
+    __slots__ = ("label", "command", "operand", "continuation", "quote_continuation", "next_line_comment", "index",
+                 "dsp", "node_exception")
+
     def __init__(self):
         self.label: Optional[str] = None
         self.command: Optional[str] = None
@@ -108,8 +144,9 @@ class Line:
             if main_line_has_operand and not quote_continuing:
                 if line_is_comment or (len(file_line) > 15 and file_line[15] == " "):
                     words.insert(0, None)  # The operand is None for continuing line that does NOT start at CC=16
-        line.label = words[0]
-        line.command = words[1] if len(words) > 1 else None
+        # Labels and commands repeat across lines and are used as keys of the symbol table.
+        line.label = intern(words[0]) if words[0] is not None else None
+        line.command = intern(words[1]) if len(words) > 1 and words[1] is not None else None
         line.operand = words[2] if len(words) > 2 else None
         if line.continuation and not line.quote_continuation and line.operand:
             if not line.operand.endswith(","):
@@ -118,21 +155,27 @@ class Line:
         return line
 
     @classmethod
-    def from_file(cls, file_lines: List[str]) -> List["Line"]:
-        # Create a list of Line objects. Also combines multiple continuing lines in a single line object.
-        lines = list()
+    def from_file(cls, file_lines: Iterable[str]) -> List["Line"]:
+        return list(cls.iter_from_file(file_lines))
+
+    @classmethod
+    def iter_from_file(cls, file_lines: Iterable[str]) -> Iterator["Line"]:
+        # Create Line objects. Also combines multiple continuing lines in a single line object. A line is only yielded
+        # once all its continuing lines are read.
         prior_line = Line()
-        main_line = Line()
+        main_line: Optional[Line] = None
         for file_line in file_lines:
             line = cls.from_line(file_line, prior_line.continuation, prior_line.quote_continuation,
-                                 prior_line.next_line_comment, main_line.operand is not None)
+                                 prior_line.next_line_comment, main_line is not None and main_line.operand is not None)
             if not prior_line.continuation:
-                lines.append(line)
+                if main_line is not None:
+                    yield main_line
                 main_line = line
             elif line.operand:
                 main_line.operand = main_line.operand + line.operand if main_line.operand is not None else line.operand
             prior_line = line
-        return lines
+        if main_line is not None:
+            yield main_line
 
     def remove_suffix(self) -> "Line":
         self.label = next(iter(self.label.split("&"))) if self.label is not None else None
@@ -202,8 +245,4 @@ class Line:
 
 
 def get_lines_from_data_stream(data_stream: str) -> List[Line]:
-    data_lines: List[str] = data_stream.split("\n")
-    data_file: File = File()
-    data_file.buffer = data_lines
-    data_file.convert_to_lines()
-    return Line.from_file(data_file.lines)
+    return Line.from_file(File.convert(data_stream.split("\n")))
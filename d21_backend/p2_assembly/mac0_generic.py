@@ -1,17 +1,24 @@
+import ast
 import re
-from typing import Optional, Dict, Tuple, List
+from functools import lru_cache
+from operator import add, sub, mul, truediv, floordiv, neg, pos
+from sys import intern
+from typing import Optional, Dict, Tuple, List, Callable, Union
 
+from d21_backend.config import config
 from d21_backend.p1_utils.data_type import DataType, Register
 from d21_backend.p1_utils.errors import NotFoundInSymbolTableError
 
 
 class LabelReference:
+    # Symbol tables hold many of these. Names are interned as the same label and macro name repeat across tables.
+    __slots__ = ("label", "dsp", "length", "name", "_branch", "based")
 
     def __init__(self, label=None, dsp=None, length=None, name=None, based=True):
-        self.label: Optional[str] = label
+        self.label: Optional[str] = intern(label) if label is not None else None
         self.dsp: Optional[int] = dsp
         self.length: Optional[int] = length
-        self.name: Optional[str] = name  # Macro name or Segment name or Dsect name
+        self.name: Optional[str] = intern(name) if name is not None else None  # Macro name or Segment name or Dsect
         self._branch: int = 0  # Code cannot branch to this label.
         self.based: bool = based
 
@@ -34,12 +41,160 @@ class LabelReference:
         self._branch = 1
 
     def to_dict(self) -> dict:
-        self_dict = self.__dict__.copy()
+        self_dict = {"label": self.label, "dsp": self.dsp, "length": self.length, "name": self.name,
+                     "based": self.based}
         self_dict["dsp_hex"] = self.dsp_hex
-        del self_dict["_branch"]
         return self_dict
 
 
+class Expression:
+    # Compiled form of an operand of get_value. Data constants, numbers and registers are folded at compile time.
+    # Labels and the location counter are the terms that are resolved against the symbol table on every evaluation.
+    LOCATION = "*"
+    OPERATORS = {ast.Add: add, ast.Sub: sub, ast.Mult: mul, ast.Div: truediv, ast.FloorDiv: floordiv}
+    UNARY_OPERATORS = {ast.USub: neg, ast.UAdd: pos}
+
+    def __init__(self, operand: str):
+        self.operand: str = operand
+        self.terms: List[str] = list()
+        self.value: Optional[int] = None
+        self.error: Optional[type] = None
+        self._function: Optional[Callable[[List[int]], Union[int, float]]] = None
+        # Python source with term indexes in place of terms. Only used when two values are next to each other.
+        self._source: List[Union[str, int]] = list()
+        self._compile()
+
+    def __repr__(self) -> str:
+        return f"{self.operand}:{self.value if self.value is not None else self.terms}"
+
+    @property
+    def is_constant(self) -> bool:
+        return self.value is not None
+
+    def evaluate(self, macro: "MacroGeneric") -> int:
+        if self.value is not None:
+            return self.value
+        values = [macro._location_counter if term == self.LOCATION else macro.evaluate(term) for term in self.terms]
+        if self.error:
+            raise self.error(self.operand)
+        if self._source:
+            return self._evaluate_source(values)
+        if self._function is None:
+            return values[0]
+        return int(self._function(values))
+
+    def _evaluate_source(self, values: List[int]) -> int:
+        # Adjacent values are concatenated as digits, which is how the operand was always evaluated.
+        try:
+            return int(eval("".join(str(values[item]) if isinstance(item, int) else item for item in self._source)))
+        except SyntaxError:
+            raise SyntaxError(self.operand)
+        except TypeError:
+            raise TypeError(self.operand)
+
+    def _compile(self) -> None:
+        if self.operand.strip().isdigit():
+            self.value = int(self.operand.strip())
+            return
+        updated_operand = self.operand.upper()
+        data_list = re.findall(r"[CXHFDBZPAY]D?'[^']+'", updated_operand)
+        value_list = list()
+        if data_list:
+            updated_operand = re.sub(r"[CXHFDBZPAY]D?'[^']+'", "~", updated_operand)
+            for data in data_list:
+                value = DataType(data[0], input=data[2:-1]).value
+                value_list.insert(0, value)
+        exp_list = re.split(r"([+*()/-])", updated_operand)
+        if len(exp_list) == 1:
+            if exp_list[0] == "~":
+                self.value = value_list.pop()
+            elif exp_list[0].isdigit():
+                self.value = int(exp_list[0])
+            else:
+                self.terms.append(exp_list[0])
+            return
+        exp_list = [expression for expression in exp_list if expression]
+        if len(exp_list) >= 2 and exp_list[0] == "-" and exp_list[1].isdigit():
+            exp_list.pop(0)
+            exp_list[0] = f"-{exp_list[0]}"
+        # Build a python expression in which every term is a name (t0, t1 ...) and every constant is a number.
+        source: List[Union[str, int]] = list()
+        index = 0
+        previous_is_value = False
+        adjacent_values = False
+        for expression in exp_list:
+            if expression in "()":
+                source.append(expression)
+                previous_is_value = False
+                continue
+            is_operator = expression in ("-", "+", "/") or (expression == "*" and index % 2 == 1)
+            index += 1
+            if is_operator:
+                source.append(expression)
+                previous_is_value = False
+                continue
+            adjacent_values = adjacent_values or previous_is_value
+            previous_is_value = True
+            if expression == "~":
+                source.append(str(value_list.pop()))
+            elif expression.isdigit() or (expression[0] == "-" and expression[1:].isdigit()):
+                source.append(str(int(expression)))
+            elif Register(expression).is_valid():
+                source.append(str(Register(expression).value))
+            else:
+                source.append(len(self.terms))
+                self.terms.append(self.LOCATION if expression == "*" else expression)
+        if adjacent_values:
+            self._source = source
+            return
+        try:
+            tree = ast.parse("".join(f"t{item}" if isinstance(item, int) else item for item in source), mode="eval")
+        except SyntaxError:
+            self.error = SyntaxError
+            return
+        try:
+            is_constant, function = self._build(tree.body)
+        except (TypeError, ZeroDivisionError) as error:
+            self.error = type(error)
+            return
+        if is_constant:
+            self.value = int(function)
+        else:
+            self._function = function
+        return
+
+    def _build(self, node: ast.AST) -> Tuple[bool, Union[int, float, Callable]]:
+        # Returns (True, value) for a constant sub expression and (False, function of the term values) otherwise.
+        if isinstance(node, ast.Constant) and isinstance(node.value, int):
+            return True, node.value
+        if isinstance(node, ast.Name):
+            term_index = int(node.id[1:])
+            return False, lambda values: values[term_index]
+        if isinstance(node, ast.UnaryOp) and type(node.op) in self.UNARY_OPERATORS:
+            operator = self.UNARY_OPERATORS[type(node.op)]
+            is_constant, operand = self._build(node.operand)
+            if is_constant:
+                return True, operator(operand)
+            return False, lambda values: operator(operand(values))
+        if isinstance(node, ast.BinOp) and type(node.op) in self.OPERATORS:
+            operator = self.OPERATORS[type(node.op)]
+            left_constant, left = self._build(node.left)
+            right_constant, right = self._build(node.right)
+            if left_constant and right_constant:
+                return True, operator(left, right)
+            if left_constant:
+                return False, lambda values: operator(left, right(values))
+            if right_constant:
+                return False, lambda values: operator(left(values), right)
+            return False, lambda values: operator(left(values), right(values))
+        raise TypeError
+
+
+@lru_cache(maxsize=config.EXPRESSION_CACHE_SIZE)
+def get_expression(operand: str) -> Expression:
+    return Expression(operand)
+
+
 class MacroGeneric:
 
     def __init__(self, name):
@@ -82,54 +237,7 @@ class MacroGeneric:
         return value
 
     def get_value(self, operand: str) -> int:
-        if operand.strip().isdigit():
-            return int(operand.strip())
-        updated_operand = operand.upper()
-        data_list = re.findall(r"[CXHFDBZPAY]D?'[^']+'", updated_operand)
-        value_list = list()
-        if data_list:
-            updated_operand = re.sub(r"[CXHFDBZPAY]D?'[^']+'", "~", updated_operand)
-            for data in data_list:
-                value = DataType(data[0], input=data[2:-1]).value
-                value_list.insert(0, value)
-        exp_list = re.split(r"([+*()/-])", updated_operand)
-        if len(exp_list) == 1:
-            if exp_list[0] == "~":
-                return value_list.pop()
-            return self._location_counter if exp_list[0] == "*" else self.evaluate(exp_list[0])
-        exp_list = [expression for expression in exp_list if expression]
-        if len(exp_list) >= 2 and exp_list[0] == "-" and exp_list[1].isdigit():
-            exp_list.pop(0)
-            exp_list[0] = f"-{exp_list[0]}"
-        exp_list = [(index, expression) for index, expression in enumerate(exp_list)]
-        parenthesis = [indexed_expression for indexed_expression in exp_list if indexed_expression[1] in "()"]
-        exp_list = [indexed_expression for indexed_expression in exp_list if indexed_expression[1] not in "()"]
-        eval_list = list()
-        for index, (position, expression) in enumerate(exp_list):
-            if expression in ("-", "+", "/") or (expression == "*" and index % 2 == 1):
-                eval_list.append((position, expression))
-            else:
-                if expression == "~":
-                    value = value_list.pop()
-                elif expression == "*":
-                    value = self._location_counter
-                elif expression.isdigit() or (expression[0] == "-" and expression[1:].isdigit()):
-                    value = str(int(expression))
-                elif Register(expression).is_valid():
-                    value = Register(expression).value
-                else:
-                    value = self.evaluate(expression)
-                eval_list.append((position, str(value)))
-        eval_list.extend(parenthesis)
-        eval_list.sort(key=lambda item: item[0])
-        eval_list = [expression for _, expression in eval_list]
-        try:
-            return_value = int(eval("".join(eval_list)))
-        except SyntaxError:
-            raise SyntaxError(operand)
-        except TypeError:
-            raise TypeError(operand)
-        return return_value
+        return get_expression(operand).evaluate(self)
 
     def is_based(self, operand: str) -> bool:
         if operand == "*":
@@ -152,7 +260,7 @@ class MacroGeneric:
 
     def add_label(self, label: str, dsp: int, length: int, name: str, based: bool = True) -> LabelReference:
         label_ref = LabelReference(label, dsp, length, name, based)
-        self._symbol_table[label] = label_ref
+        self._symbol_table[label_ref.label] = label_ref
         index_label = name + str(dsp)
         if index_label not in self._index:
             self._index[index_label] = list()
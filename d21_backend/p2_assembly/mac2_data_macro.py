@@ -1,4 +1,9 @@
-from typing import Dict, List, Tuple, Optional
+import os
+import pickle
+from collections import ChainMap
+from hashlib import sha1
+from itertools import chain
+from typing import Dict, List, Tuple, Optional, Set
 
 from d21_backend.config import config
 from d21_backend.p1_utils.domain import get_domain_folder, read_folder, get_base_folder, get_domain
@@ -6,16 +11,123 @@ from d21_backend.p1_utils.errors import EquDataTypeHasAmpersandError, NotFoundIn
 from d21_backend.p1_utils.file_line import Line, File
 from d21_backend.p2_assembly.mac0_generic import LabelReference
 from d21_backend.p2_assembly.mac1_implementation import DataMacroImplementation
+from d21_backend.p2_assembly.mac3_symbol_table import SymbolTableFile, SharedSymbolTable
 
 
 class DataMacro(DataMacroImplementation):
-    def __init__(self, name: str, filename: str = None, default_macros: Dict[str, LabelReference] = None):
+    # The symbol table is loaded on first use. A default macro that appears earlier in DEFAULT_MACROS is the parent and
+    # all its labels are included. The symbol table is a chain of the own labels of the macro followed by the own labels
+    # of each default macro, so the labels of the default macros are not copied into every macro. The labels of the
+    # macro itself are cached on disk and keyed by the file and its parent chain. If the collection has a shared symbol
+    # table file then the labels are looked up in the file.
+    def __init__(self, name: str, filename: str = None, parent: Optional["DataMacro"] = None,
+                 collection: Optional["DataMacroCollection"] = None):
         super().__init__(name)
         self.file_name: str = filename if filename else str()
-        self.default_macros: Dict[str, LabelReference] = default_macros if default_macros else dict()
+        self.parent: Optional[DataMacro] = parent
+        self.collection: Optional[DataMacroCollection] = collection
+        self._labels: Optional[Dict[str, LabelReference]] = None
+        self.loaded_file_key: Optional[Tuple] = None
 
     def __repr__(self) -> str:
-        return f"{self.name} ({len(self._symbol_table)})"
+        return f"{self.name} ({len(self._labels) if self.loaded else 0})"
+
+    @property
+    def _symbol_table(self) -> Dict[str, LabelReference]:
+        if self._labels is None:
+            self.load()
+        return self._labels
+
+    @_symbol_table.setter
+    def _symbol_table(self, symbol_table: Dict[str, LabelReference]) -> None:
+        self._labels = symbol_table
+
+    @property
+    def indexed_data(self) -> Dict[str, List[Tuple[str, int]]]:
+        if self._index is None and isinstance(self._labels, SharedSymbolTable):
+            self._index = self._labels.table_file.get_index(self._labels.position)
+        return self._index
+
+    @property
+    def default_macros(self) -> Dict[str, LabelReference]:
+        return self.parent.all_labels if self.parent else dict()
+
+    @property
+    def own_labels(self) -> Dict[str, LabelReference]:
+        if isinstance(self.all_labels, ChainMap):
+            return self.all_labels.maps[0]
+        default_macros = self.default_macros
+        return {label: label_ref for label, label_ref in self.all_labels.items()
+                if default_macros.get(label) is not label_ref}
+
+    @property
+    def macro_names(self) -> List[str]:
+        # Name of the macro and of all the default macros it inherits.
+        return [self.name] + (self.parent.macro_names if self.parent else list())
+
+    @property
+    def is_changed(self) -> bool:
+        return self.loaded and self.file_key != self.loaded_file_key
+
+    @property
+    def file_key(self) -> Tuple:
+        try:
+            stat = os.stat(self.file_name)
+            return os.path.abspath(self.file_name), stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return self.file_name, None, None
+
+    @property
+    def cache_key(self) -> Tuple:
+        return self.name, self.file_key, self.parent.cache_key if self.parent else None
+
+    @property
+    def cache_filename(self) -> str:
+        digest = sha1(repr((config.MACRO_CACHE_VERSION, self.cache_key)).encode()).hexdigest()
+        return os.path.join(config.MACRO_CACHE_FOLDER, f"{self.name}.{digest}.pkl")
+
+    def _load_from_shared(self) -> bool:
+        shared = self.collection.shared if self.collection else None
+        if shared is None or self.name not in shared.positions:
+            return False
+        parent_labels = self.parent.all_labels if self.parent else None
+        if parent_labels is not None and not isinstance(parent_labels, SharedSymbolTable):
+            return False
+        self._labels = SharedSymbolTable(shared, shared.positions[self.name], parent_labels)
+        self._index = None
+        return True
+
+    def _chain_labels(self, labels: Dict[str, LabelReference]) -> ChainMap:
+        default_macros = self.default_macros
+        if isinstance(default_macros, ChainMap):
+            return ChainMap(labels, *default_macros.maps)
+        return ChainMap(labels, default_macros) if self.parent else ChainMap(labels)
+
+    def _load_from_cache(self) -> bool:
+        if not config.MACRO_CACHE_FOLDER:
+            return False
+        try:
+            with open(self.cache_filename, "rb") as cache_file:
+                labels, index = pickle.load(cache_file)
+        except (OSError, pickle.PickleError, EOFError, AttributeError, ValueError):
+            return False
+        self._labels = self._chain_labels(labels)
+        self._index = index
+        self._add_to_collection(labels)
+        return True
+
+    def _save_to_cache(self, labels: Dict[str, LabelReference]) -> None:
+        if not config.MACRO_CACHE_FOLDER:
+            return
+        temp_filename = f"{self.cache_filename}.{os.getpid()}"
+        try:
+            os.makedirs(config.MACRO_CACHE_FOLDER, exist_ok=True)
+            with open(temp_filename, "wb") as cache_file:
+                pickle.dump((labels, self._index), cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_filename, self.cache_filename)
+        except OSError:
+            return
+        return
 
     def _second_pass(self, second_list: List[Tuple[Line, int]]):
         for line, location_counter in second_list:
@@ -29,18 +141,17 @@ class DataMacro(DataMacroImplementation):
         return
 
     def load(self) -> None:
-        if self.all_labels:
+        if self.loaded:
+            return
+        self.loaded_file_key = self.file_key
+        if self._load_from_shared() or self._load_from_cache():
             return
-        # Load default macros
-        self._symbol_table = {**self.all_labels, **self.default_macros}
-        # Create a list of Line objects from file or listing
-        file_lines = File(self.file_name).lines
-        lines = Line.from_file(file_lines)
+        # Labels of the default macros are looked up through the chain
+        self._symbol_table = self._chain_labels(dict())
+        # Line objects are streamed from the file. The macro name is added first in symbol table.
+        lines = chain([Line.from_line(f"{self.name} EQU *")], Line.iter_from_file(File(self.file_name).iter_lines()))
         # Remove suffix like &CG1 from label and only keep the accepted commands.
-        lines = [line.remove_suffix() for line in lines if line.command in self._command]
-        # Add the macro name in symbol table
-        line = Line.from_line(f"{self.name} EQU *")
-        lines.insert(0, line)
+        lines = (line.remove_suffix() for line in lines if line.command in self._command)
         # Create LabelReference for each label and add it to dummy macro data_map.
         second_list: List[Tuple[Line, int]] = list()
         for line in lines:
@@ -51,19 +162,23 @@ class DataMacro(DataMacroImplementation):
             except NotFoundInSymbolTableError:
                 second_list.append((line, self._location_counter))
         self._second_pass(second_list)
+        labels = self.own_labels
+        self._save_to_cache(labels)
+        self._add_to_collection(labels)
+        return
+
+    def _add_to_collection(self, labels: Dict[str, LabelReference]) -> None:
+        if self.collection:
+            self.collection.add_to_index(self, labels)
         return
 
     @property
     def loaded(self):
-        return self.all_labels != dict()
+        return self._labels is not None
 
     @classmethod
     def get_label_reference(cls, field_name) -> Optional[LabelReference]:
-        for _, data_macro in get_macros().items():
-            data_macro.load()
-            if data_macro.check(field_name):
-                return data_macro.lookup(field_name)
-        return None
+        return _macro_collection.get_label_reference(field_name)
 
 
 class DataMacroCollection:
@@ -76,39 +191,172 @@ class DataMacroCollection:
     def __init__(self):
         self.domain: str = get_domain()
         self.macros: Dict[str, DataMacro] = dict()
-        self.indexed_labels: Dict[str, str] = dict()  # Only used in api v2. Init commented out to improve test exec.
-        default_macros: Dict[str, LabelReference] = dict()
-        # Load macros from folders
+        # Label -> (macro, label_ref) of the first macro in self.macros that defines the label. It is updated as the
+        # macros are loaded and is complete for all macros before self._loaded_count.
+        self.label_index: Dict[str, Tuple[DataMacro, LabelReference]] = dict()
+        self.merged_labels: Dict[Tuple[str, ...], Dict[str, LabelReference]] = dict()
+        self._positions: Dict[str, int] = dict()
+        self._load_order: List[DataMacro] = list()
+        self._loaded_count: int = 0
+        self._cache_key: str = str()
+        self.shared: Optional[SymbolTableFile] = None
+        # Macros from folders are only loaded on first use
         macro_filenames: List[Tuple[str, str]] = read_folder(get_domain_folder(config.MAC_FOLDER),
                                                              config.MAC_EXT, self.filename_parser)
         macro_filenames += read_folder(get_base_folder(config.MAC_FOLDER), config.MAC_EXT, self.filename_parser)
         # Default Macros should be in the hierarchical order and required by all other macros.
+        parent: Optional[DataMacro] = None
         for macro_name in self.DEFAULT_MACROS:
             filename = next((filename for macro, filename in macro_filenames if macro == macro_name), None)
             if not filename:
                 continue
-            self.macros[macro_name] = DataMacro(macro_name, filename, default_macros)
-            self.macros[macro_name].load()
-            default_macros = {**default_macros, **self.macros[macro_name].all_labels}
-        # Load all macros to improve test execution
+            self.macros[macro_name] = DataMacro(macro_name, filename, parent, self)
+            parent = self.macros[macro_name]
         for macro_name, filename in macro_filenames:
             if macro_name in self.macros:
                 continue
-            if macro_name == "WA0AA":
-                debug = True
-            self.macros[macro_name] = DataMacro(macro_name, filename, default_macros)
-            self.macros[macro_name].load()
-            # self.indexed_labels = {**self.indexed_labels, **{l: lr.name for l, lr in data_macro.all_labels.items()}}
+            self.macros[macro_name] = DataMacro(macro_name, filename, parent, self)
+        self._positions = {macro_name: position for position, macro_name in enumerate(self.macros)}
+        self._load_order = list(self.macros.values())
+        if config.MACRO_CACHE_FOLDER:
+            self.attach_symbol_table(self.symbol_table_filename)
+
+    @property
+    def cache_key(self) -> str:
+        # Hash of all macro files of the collection. It keys the caches that depend on the macros.
+        if not self._cache_key:
+            file_keys = [(macro_name, data_macro.file_key) for macro_name, data_macro in self.macros.items()]
+            self._cache_key = sha1(repr(file_keys).encode()).hexdigest()
+        return self._cache_key
+
+    @property
+    def symbol_table_filename(self) -> str:
+        return os.path.join(config.MACRO_CACHE_FOLDER, f"symbols.{self.cache_key}.sym")
+
+    def attach_symbol_table(self, filename: str) -> bool:
+        # Macros that are loaded after this look up their labels in the file. The file is ignored if it was created
+        # for other versions of the macro files.
+        shared = SymbolTableFile.read(filename)
+        if shared is None or shared.cache_key != self.cache_key:
+            return False
+        self.shared = shared
+        return True
+
+    def write_symbol_table(self, filename: str) -> bool:
+        # Symbol tables of all the macros in one file that can be attached by other processes
+        macros = list()
+        for data_macro in self.macros.values():
+            data_macro.load()
+            macros.append((data_macro.name, data_macro.parent.name if data_macro.parent else None,
+                           data_macro.own_labels, data_macro.indexed_data))
+        try:
+            os.makedirs(os.path.dirname(filename) or os.curdir, exist_ok=True)
+            SymbolTableFile.write(filename, self.cache_key, macros)
+        except OSError:
+            return False
+        return True
+
+    def get_changed_macros(self) -> Set[str]:
+        return {macro_name for macro_name, data_macro in self.macros.items() if data_macro.is_changed}
+
+    def get_dependent_macros(self, macro_names: Set[str]) -> Set[str]:
+        return {macro_name for macro_name, data_macro in self.macros.items()
+                if macro_names.intersection(data_macro.macro_names)}
+
+    def invalidate(self, macro_names: Set[str]) -> Set[str]:
+        # The macros and the macros that inherit them are replaced by macros that are not loaded. Returns their names.
+        dependent_macros = self.get_dependent_macros(macro_names)
+        for macro_name, data_macro in self.macros.items():
+            if macro_name not in dependent_macros:
+                continue
+            parent = self.macros[data_macro.parent.name] if data_macro.parent else None
+            self.macros[macro_name] = DataMacro(macro_name, data_macro.file_name, parent, self)
+        self.label_index = dict()
+        self.merged_labels = dict()
+        self._load_order = list(self.macros.values())
+        self._loaded_count = 0
+        self._cache_key = str()
+        self.shared = None
+        for data_macro in self._load_order:
+            if data_macro.loaded:
+                self.add_to_index(data_macro, data_macro.own_labels)
+        return dependent_macros
+
+    def add_to_index(self, data_macro: DataMacro, labels: Dict[str, LabelReference]) -> None:
+        position = self._positions.get(data_macro.name)
+        if position is None or self.macros[data_macro.name] is not data_macro:
+            return
+        for label, label_ref in labels.items():
+            indexed = self.label_index.get(label)
+            if indexed is None or self._positions[indexed[0].name] > position:
+                self.label_index[label] = (data_macro, label_ref)
+        return
+
+    def get_indexed_label(self, label: str) -> Optional[Tuple[DataMacro, LabelReference]]:
+        # Macros are loaded in order only until the label is found in a macro that is ahead of all unloaded macros.
+        if self.shared is not None:
+            position = self.shared.find_macro_position(label)
+            return (self._load_order[position], self._load_order[position].all_labels[label]) \
+                if position is not None else None
+        indexed = self.label_index.get(label)
+        while self._loaded_count < len(self._load_order):
+            if indexed is not None and self._positions[indexed[0].name] < self._loaded_count:
+                break
+            self._load_order[self._loaded_count].load()
+            self._loaded_count += 1
+            indexed = self.label_index.get(label)
+        return indexed
+
+    def get_label_reference(self, label: str) -> Optional[LabelReference]:
+        indexed = self.get_indexed_label(label)
+        return indexed[1] if indexed else None
+
+    def get_label_macro_name(self, label: str) -> Optional[str]:
+        indexed = self.get_indexed_label(label)
+        return indexed[0].name if indexed else None
+
+    def get_merged_labels(self, macro_names: Tuple[str, ...]) -> Dict[str, LabelReference]:
+        # All labels of the macros. A label in an earlier macro takes precedence.
+        if macro_names not in self.merged_labels:
+            merged_labels: Dict[str, LabelReference] = dict()
+            for macro_name in reversed(macro_names):
+                merged_labels.update(self.macros[macro_name].all_labels)
+            self.merged_labels[macro_names] = merged_labels
+        return self.merged_labels[macro_names]
 
 
 _macro_collection: DataMacroCollection = DataMacroCollection()
-indexed_macros = dict()
 
 
 def get_macros():
     return _macro_collection.macros
 
 
+def get_macros_cache_key() -> str:
+    return _macro_collection.cache_key
+
+
+def get_changed_macros() -> Set[str]:
+    return _macro_collection.get_changed_macros()
+
+
+def invalidate_macros(macro_names: Set[str]) -> Set[str]:
+    return _macro_collection.invalidate(macro_names)
+
+
+def create_symbol_table() -> bool:
+    return bool(config.MACRO_CACHE_FOLDER) and \
+        _macro_collection.write_symbol_table(_macro_collection.symbol_table_filename)
+
+
+def get_label_macro_name(label: str) -> Optional[str]:
+    return _macro_collection.get_label_macro_name(label)
+
+
+def get_merged_labels(macro_names: Tuple[str, ...]) -> Dict[str, LabelReference]:
+    return _macro_collection.get_merged_labels(macro_names)
+
+
 def init_macros():
     global _macro_collection
     if _macro_collection.domain != get_domain():
@@ -117,15 +365,7 @@ def init_macros():
 
 
 def get_global_ref(global_name: str) -> Optional[LabelReference]:
-    global_macros = ["GLOBAS", "GLOBYS", "GL0BS"]
-    macros = get_macros()
-    for macro_name in global_macros:
-        macros[macro_name].load()
-    global_macro = next((macros[macro_name] for macro_name in global_macros if macros[macro_name].check(global_name)),
-                        None)
-    if not global_macro:
-        return None
-    return global_macro.lookup(global_name)
+    return get_merged_labels(("GLOBAS", "GLOBYS", "GL0BS")).get(global_name)
 
 
 def get_global_address(global_name: str) -> int:
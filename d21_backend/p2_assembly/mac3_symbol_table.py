@@ -0,0 +1,266 @@
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+from mmap import mmap, ACCESS_READ
+from typing import Dict, List, Optional, Tuple, Iterator, Sequence
+
+from d21_backend.p2_assembly.mac0_generic import LabelReference
+
+
+class SymbolTableFile:
+    # Read only symbol tables of all the macros of a collection in one memory mapped file. Worker processes that map
+    # the same file share its pages, and a LabelReference is only created when a label is looked up.
+    # Header: magic, version, macro count, label count, index count, string count, size of the string bytes, cache key.
+    # Strings are sorted, so a string id orders the same as the string. Columns follow the header in this order:
+    #   macros: name id, parent position (-1 for none), first label row, label count, first index row, index count
+    #   labels (own labels of each macro in the order they were defined): label id, dsp, length, name id, flags
+    #   sorted label rows of each macro (by label id), first macro position that defines each string as a label
+    #   index rows (indexed_data of each macro): key id, label id, length
+    #   string offsets and then the utf-8 bytes of all strings.
+    MAGIC = b"TPF1SYM\x00"
+    VERSION = 1
+    HEADER = struct.Struct("<8sHIIIII40s")
+    NONE = -(1 << 31)  # dsp or length that is None
+    NOT_FOUND = 0xFFFFFFFF
+    BASED, BRANCH = 0x01, 0x02
+    MACRO_COLUMNS = (("macro_name", "I"), ("parent", "i"), ("label_start", "I"), ("label_count", "I"),
+                     ("index_start", "I"), ("index_count", "I"))
+    LABEL_COLUMNS = (("label", "I"), ("dsp", "i"), ("length", "i"), ("name", "I"), ("flags", "B"))
+    INDEX_COLUMNS = (("key", "I"), ("index_label", "I"), ("index_length", "i"))
+
+    def __init__(self, cache_key: str, columns: Dict[str, Sequence[int]], strings: memoryview,
+                 buffer: Optional[mmap] = None):
+        self.cache_key: str = cache_key
+        self.columns: Dict[str, Sequence[int]] = columns
+        self._strings: memoryview = strings
+        self._string_ids: Dict[str, Optional[int]] = dict()
+        self._buffer: Optional[mmap] = buffer  # Keeps the file mapped
+        self.positions: Dict[str, int] = {self.get_string(name_id): position
+                                          for position, name_id in enumerate(columns["macro_name"])}
+
+    def __repr__(self) -> str:
+        return f"SymbolTableFile:{len(self.positions)}:{len(self.columns['label'])}"
+
+    @property
+    def string_count(self) -> int:
+        return len(self.columns["offsets"]) - 1
+
+    def get_string(self, string_id: int) -> str:
+        offsets = self.columns["offsets"]
+        return sys.intern(str(self._strings[offsets[string_id]: offsets[string_id + 1]], encoding="utf-8"))
+
+    def _get_bytes(self, string_id: int) -> bytes:
+        offsets = self.columns["offsets"]
+        return self._strings[offsets[string_id]: offsets[string_id + 1]].tobytes()
+
+    def find_string(self, string: str) -> Optional[int]:
+        if string not in self._string_ids:
+            self._string_ids[string] = self._search_string(string)
+        return self._string_ids[string]
+
+    def _search_string(self, string: str) -> Optional[int]:
+        target = string.encode()
+        low, high = 0, self.string_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._get_bytes(middle) < target:
+                low = middle + 1
+            else:
+                high = middle
+        return low if low < self.string_count and self._get_bytes(low) == target else None
+
+    def find_row(self, position: int, label_id: int) -> Optional[int]:
+        # Row of an own label of the macro
+        start = self.columns["label_start"][position]
+        end = start + self.columns["label_count"][position]
+        label_ids, sorted_rows = self.columns["label"], self.columns["sorted_rows"]
+        index = bisect_left(sorted_rows, label_id, start, end, key=lambda row: label_ids[row])
+        return sorted_rows[index] if index < end and label_ids[sorted_rows[index]] == label_id else None
+
+    def find_macro_position(self, label: str) -> Optional[int]:
+        # Position of the first macro that defines the label
+        label_id = self.find_string(label)
+        if label_id is None:
+            return None
+        position = self.columns["first_position"][label_id]
+        return None if position == self.NOT_FOUND else position
+
+    def get_label_ref(self, row: int) -> LabelReference:
+        dsp, length = self.columns["dsp"][row], self.columns["length"][row]
+        label_ref = LabelReference(self.get_string(self.columns["label"][row]), None if dsp == self.NONE else dsp,
+                                   None if length == self.NONE else length, self.get_string(self.columns["name"][row]),
+                                   bool(self.columns["flags"][row] & self.BASED))
+        if self.columns["flags"][row] & self.BRANCH:
+            label_ref.set_branch()
+        return label_ref
+
+    def get_rows(self, position: int) -> range:
+        start = self.columns["label_start"][position]
+        return range(start, start + self.columns["label_count"][position])
+
+    def get_index(self, position: int) -> Dict[str, List[Tuple[str, int]]]:
+        index: Dict[str, List[Tuple[str, int]]] = dict()
+        start = self.columns["index_start"][position]
+        for row in range(start, start + self.columns["index_count"][position]):
+            index.setdefault(self.get_string(self.columns["key"][row]), list()).append(
+                (self.get_string(self.columns["index_label"][row]), self.columns["index_length"][row]))
+        return index
+
+    @staticmethod
+    def _read_column(buffer: memoryview, start: int, count: int, typecode: str) -> Tuple[Sequence[int], int]:
+        end = start + count * array(typecode).itemsize
+        if sys.byteorder == "little":
+            return buffer[start:end].cast(typecode), end
+        column = array(typecode, buffer[start:end].tobytes())
+        column.byteswap()
+        return column, end
+
+    @classmethod
+    def read(cls, filename: str) -> Optional["SymbolTableFile"]:
+        try:
+            with open(filename, "rb") as file:
+                buffer = mmap(file.fileno(), 0, access=ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        view = memoryview(buffer)
+        try:
+            magic, version, macro_count, label_count, index_count, string_count, strings_size, cache_key = \
+                cls.HEADER.unpack_from(view)
+        except struct.error:
+            return None
+        if magic != cls.MAGIC or version != cls.VERSION:
+            return None
+        columns: Dict[str, Sequence[int]] = dict()
+        start = cls.HEADER.size
+        for name, typecode in cls.MACRO_COLUMNS:
+            columns[name], start = cls._read_column(view, start, macro_count, typecode)
+        for name, typecode in cls.LABEL_COLUMNS:
+            columns[name], start = cls._read_column(view, start, label_count, typecode)
+        columns["sorted_rows"], start = cls._read_column(view, start, label_count, "I")
+        columns["first_position"], start = cls._read_column(view, start, string_count, "I")
+        for name, typecode in cls.INDEX_COLUMNS:
+            columns[name], start = cls._read_column(view, start, index_count, typecode)
+        columns["offsets"], start = cls._read_column(view, start, string_count + 1, "I")
+        if start + strings_size != len(view):
+            return None
+        return cls(cache_key.decode(), columns, view[start:], buffer)
+
+    @classmethod
+    def write(cls, filename: str, cache_key: str, macros: List[Tuple[str, Optional[str], Dict[str, LabelReference],
+                                                                      Dict[str, List[Tuple[str, int]]]]]) -> None:
+        # macros is a list of macro name, parent name, own labels and indexed data in the order of the collection.
+        strings = set()
+        for macro_name, _, labels, index in macros:
+            strings.add(macro_name)
+            strings.update(label_ref.label for label_ref in labels.values())
+            strings.update(label_ref.name for label_ref in labels.values())
+            strings.update(index)
+            strings.update(label for entries in index.values() for label, _ in entries)
+        sorted_strings = sorted((string.encode() for string in strings))
+        string_ids: Dict[str, int] = {string.decode(): string_id for string_id, string in enumerate(sorted_strings)}
+        positions: Dict[str, int] = {macro_name: position for position, (macro_name, _, _, _) in enumerate(macros)}
+        columns: Dict[str, List[int]] = {name: list() for name, _ in cls.MACRO_COLUMNS + cls.LABEL_COLUMNS +
+                                         cls.INDEX_COLUMNS}
+        columns["sorted_rows"] = list()
+        columns["first_position"] = [cls.NOT_FOUND] * len(sorted_strings)
+        for position, (macro_name, parent_name, labels, index) in enumerate(macros):
+            start = len(columns["label"])
+            columns["macro_name"].append(string_ids[macro_name])
+            columns["parent"].append(positions[parent_name] if parent_name else -1)
+            columns["label_start"].append(start)
+            columns["label_count"].append(len(labels))
+            for label_ref in labels.values():
+                columns["label"].append(string_ids[label_ref.label])
+                columns["dsp"].append(cls.NONE if label_ref.dsp is None else label_ref.dsp)
+                columns["length"].append(cls.NONE if label_ref.length is None else label_ref.length)
+                columns["name"].append(string_ids[label_ref.name])
+                columns["flags"].append((cls.BASED if label_ref.based else 0) |
+                                        (cls.BRANCH if label_ref.is_branch else 0))
+                if columns["first_position"][string_ids[label_ref.label]] == cls.NOT_FOUND:
+                    columns["first_position"][string_ids[label_ref.label]] = position
+            columns["sorted_rows"].extend(sorted(range(start, len(columns["label"])),
+                                                 key=lambda row: columns["label"][row]))
+            columns["index_start"].append(len(columns["key"]))
+            columns["index_count"].append(sum(len(entries) for entries in index.values()))
+            for key, entries in index.items():
+                for label, length in entries:
+                    columns["key"].append(string_ids[key])
+                    columns["index_label"].append(string_ids[label])
+                    columns["index_length"].append(length)
+        offsets = [0]
+        for string in sorted_strings:
+            offsets.append(offsets[-1] + len(string))
+        columns["offsets"] = offsets
+        temp_filename = f"{filename}.{os.getpid()}"
+        with open(temp_filename, "wb") as file:
+            file.write(cls.HEADER.pack(cls.MAGIC, cls.VERSION, len(macros), len(columns["label"]), len(columns["key"]),
+                                       len(sorted_strings), offsets[-1], cache_key.encode()))
+            column_order = [name for name, _ in cls.MACRO_COLUMNS + cls.LABEL_COLUMNS] + \
+                           ["sorted_rows", "first_position"] + [name for name, _ in cls.INDEX_COLUMNS] + ["offsets"]
+            typecodes = {name: typecode for name, typecode in cls.MACRO_COLUMNS + cls.LABEL_COLUMNS +
+                         cls.INDEX_COLUMNS}
+            for name in column_order:
+                column = array(typecodes.get(name, "I"), columns[name])
+                if sys.byteorder != "little":
+                    column.byteswap()
+                file.write(column.tobytes())
+            file.write(b"".join(sorted_strings))
+        os.replace(temp_filename, filename)
+        return
+
+
+class SharedSymbolTable(Mapping):
+    # Symbol table of a macro backed by a SymbolTableFile. Labels not defined by the macro are looked up in the symbol
+    # tables of its parent macros. A LabelReference is created once per process when it is first looked up.
+
+    def __init__(self, table_file: SymbolTableFile, position: int, parent: Optional["SharedSymbolTable"] = None):
+        self.table_file: SymbolTableFile = table_file
+        self.position: int = position
+        self.parent: Optional[SharedSymbolTable] = parent
+        self._label_refs: Dict[str, LabelReference] = dict()
+        self._new_labels: Optional[List[str]] = None
+        self._length: Optional[int] = None
+
+    def __repr__(self) -> str:
+        return f"SharedSymbolTable:{self.position}:{len(self._label_refs)}"
+
+    def _find(self, label_id: int) -> Optional[LabelReference]:
+        symbol_table = self
+        while symbol_table is not None:
+            row = self.table_file.find_row(symbol_table.position, label_id)
+            if row is not None:
+                label_ref = symbol_table._label_refs.get(self.table_file.get_string(label_id))
+                if label_ref is None:
+                    label_ref = self.table_file.get_label_ref(row)
+                    symbol_table._label_refs[label_ref.label] = label_ref
+                return label_ref
+            symbol_table = symbol_table.parent
+        return None
+
+    def __getitem__(self, label: str) -> LabelReference:
+        label_ref = self._label_refs.get(label)
+        if label_ref is not None:
+            return label_ref
+        label_id = self.table_file.find_string(label) if isinstance(label, str) else None
+        label_ref = self._find(label_id) if label_id is not None else None
+        if label_ref is None:
+            raise KeyError(label)
+        return label_ref
+
+    def __iter__(self) -> Iterator[str]:
+        # Same order as a dict of the labels of the parent updated with the labels of the macro
+        if self._new_labels is None:
+            labels = self.table_file.columns["label"]
+            own_labels = (self.table_file.get_string(labels[row]) for row in self.table_file.get_rows(self.position))
+            self._new_labels = [label for label in own_labels if self.parent is None or label not in self.parent]
+        if self.parent is not None:
+            yield from self.parent
+        yield from self._new_labels
+
+    def __len__(self) -> int:
+        if self._length is None:
+            self._length = sum(1 for _ in self)
+        return self._length
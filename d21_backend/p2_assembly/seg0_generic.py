@@ -39,6 +39,7 @@ class SegmentGeneric(DataMacroImplementation):
         self._using: List[List[str]] = [list() for _ in range(16)]  # Each pos. indicates a reg and has a dsect name
         self._using_stack: List[list] = list()  # A stack of using list
         self.data_macro: Set[str] = set()  # Set of data macro names which are already loaded.
+        self.macro_names: Set[str] = set()  # Names of the data macros the segment depends on (without suffix)
         self.data: Data = Data()
         self.dc_list: List[Dc] = list()
         self.literal_list: List[Dc] = list()
@@ -49,6 +50,7 @@ class SegmentGeneric(DataMacroImplementation):
     def load_macro(self, name: str, base: str = None, suffix: Optional[str] = None, using: bool = True) -> None:
         macros = get_macros()
         macros[name].load()
+        self.macro_names.add(name)
         suffix_name = name + suffix if suffix else name
         if suffix_name not in self.data_macro:
             new_symbol_table: Dict[str, LabelReference] = {
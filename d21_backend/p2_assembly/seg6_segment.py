@@ -1,20 +1,55 @@
 import os.path
+import pickle
 import re
-from typing import Optional, List
+from functools import lru_cache
+from hashlib import sha1
+from typing import Optional, List, Dict, Tuple, BinaryIO
 
 from d21_backend.config import config, Config
 from d21_backend.p1_utils.data_type import DataType
 from d21_backend.p1_utils.errors import NotFoundInSymbolTableError, AssemblyError, AssemblyFileNotFoundError
 from d21_backend.p1_utils.file_line import Line, File, get_lines_from_data_stream
-from d21_backend.p2_assembly.mac2_data_macro import get_macros
+from d21_backend.p2_assembly.mac0_generic import LabelReference
+from d21_backend.p2_assembly.mac2_data_macro import get_macros, get_macros_cache_key
 from d21_backend.p2_assembly.seg2_ins_operand import Label
 from d21_backend.p2_assembly.seg5_exec_macro import RealtimeMacroImplementation
-from d21_backend.p2_assembly.seg8_listing import LstCmd, get_lines_from_listing_commands, get_or_create_lst_cmds, \
-    download_from_cloud
+from d21_backend.p2_assembly.seg8_listing import get_or_create_lines, download_from_cloud, get_listing_store
+
+
+@lru_cache(maxsize=1)
+def get_assembler_key() -> str:
+    # Segments assembled by a different version of the assembler are not picked up from the cache.
+    folders = [os.path.dirname(os.path.abspath(__file__)), os.path.join(config.ROOT_DIR, "p1_utils")]
+    file_keys = [config.SEGMENT_CACHE_VERSION]
+    for folder in folders:
+        for filename in sorted(os.listdir(folder)):
+            if filename.endswith(".py"):
+                stat = os.stat(os.path.join(folder, filename))
+                file_keys.append((filename, stat.st_mtime_ns, stat.st_size))
+    return sha1(repr(file_keys).encode()).hexdigest()
+
+
+class SegmentPickler(pickle.Pickler):
+    # Labels of data macros are saved as a reference to the macro and are shared with the macro on load.
+
+    def __init__(self, file: BinaryIO, macro_labels: Dict[int, Tuple[str, str]]):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.macro_labels: Dict[int, Tuple[str, str]] = macro_labels
+
+    def persistent_id(self, obj) -> Optional[Tuple[str, str]]:
+        return self.macro_labels.get(id(obj)) if type(obj) is LabelReference else None
+
+
+class SegmentUnpickler(pickle.Unpickler):
+
+    def persistent_load(self, pid: Tuple[str, str]) -> LabelReference:
+        macro_name, label = pid
+        return get_macros()[macro_name].all_labels[label]
 
 
 class Segment(RealtimeMacroImplementation):
     STARTUP = "STARTUP"
+    NOT_CACHED = {"_command", "file_name", "file_type", "source", "blob_name", "data_stream"}
 
     def __init__(self, name: str, file_name: str, data_stream: str = str()):
         super().__init__(name)
@@ -42,6 +77,65 @@ class Segment(RealtimeMacroImplementation):
     def assemble(self) -> None:
         if self.nodes:
             return
+        cache_filename = self.cache_filename
+        if cache_filename and self._load_from_cache(cache_filename):
+            return
+        self._assemble()
+        if cache_filename and self.nodes and not self.error_line:
+            self._save_to_cache(cache_filename)
+        return
+
+    @property
+    def cache_filename(self) -> str:
+        # The key is the content of the source file, all macro files and the assembler.
+        if not config.SEGMENT_CACHE_FOLDER or self.data_stream or not self._download_source():
+            return str()
+        try:
+            with open(self.file_name, "rb") as source_file:
+                source_key = sha1(source_file.read()).hexdigest()
+        except OSError:
+            return str()
+        key = sha1(f"{self.seg_name}:{self.file_type}:{source_key}:{get_macros_cache_key()}:{get_assembler_key()}"
+                   .encode()).hexdigest()
+        return os.path.join(config.SEGMENT_CACHE_FOLDER, f"{self.seg_name}.{key}.pkl")
+
+    def _download_source(self) -> bool:
+        # Cloud files are downloaded on first use. The cache key is computed from the downloaded file.
+        if os.path.exists(self.file_name):
+            return True
+        if self.source != config.CLOUD or not self.blob_name:
+            return False
+        return download_from_cloud(self.blob_name, self.file_name)
+
+    def _load_from_cache(self, cache_filename: str) -> bool:
+        try:
+            with open(cache_filename, "rb") as cache_file:
+                state: dict = SegmentUnpickler(cache_file).load()
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError, KeyError, ValueError):
+            return False
+        self.__dict__.update(state)
+        return True
+
+    def _save_to_cache(self, cache_filename: str) -> None:
+        macros = get_macros()
+        macro_labels: Dict[int, Tuple[str, str]] = dict()
+        for macro_name in self.data_macro:
+            if macro_name not in macros:
+                continue
+            for label, label_ref in macros[macro_name].all_labels.items():
+                macro_labels.setdefault(id(label_ref), (macro_name, label))
+        state = {key: value for key, value in self.__dict__.items() if key not in self.NOT_CACHED}
+        temp_filename = f"{cache_filename}.{os.getpid()}"
+        try:
+            os.makedirs(config.SEGMENT_CACHE_FOLDER, exist_ok=True)
+            with open(temp_filename, "wb") as cache_file:
+                SegmentPickler(cache_file, macro_labels).dump(state)
+            os.replace(temp_filename, cache_filename)
+        except (OSError, pickle.PicklingError):
+            return
+        return
+
+    def _assemble(self) -> None:
         # Default processing
         self.set_using(self.name, base_reg="R8")
         if self.file_type == config.ASM:
@@ -67,7 +161,7 @@ class Segment(RealtimeMacroImplementation):
                 self.error_line = str(e)
             self.nodes = dict()
             if self.file_type == config.LST:
-                LstCmd.objects.filter_by(seg_name=self.seg_name).delete(workers=100)
+                get_listing_store().delete(self.seg_name)
         return
 
     def _get_asm_lines(self) -> List[Line]:
@@ -81,8 +175,7 @@ class Segment(RealtimeMacroImplementation):
                 raise AssemblyFileNotFoundError("Blob name not initialized for cloud file.")
             if not download_from_cloud(self.blob_name, self.file_name):
                 raise AssemblyFileNotFoundError("Unable to download the file from cloud.")
-        file = File(self.file_name)
-        lines = Line.from_file(file.lines)
+        lines = Line.from_file(File(self.file_name).iter_lines())
         return lines
 
     def _assemble_asm(self, lines: List[Line]) -> None:
@@ -111,8 +204,7 @@ class Segment(RealtimeMacroImplementation):
 
     def _assemble_lst(self):
         blob_name = self.blob_name if self.source == config.CLOUD else str()
-        listing_commands: List[LstCmd] = get_or_create_lst_cmds(self.seg_name, self.file_name, blob_name)
-        lines: List[Line] = get_lines_from_listing_commands(listing_commands)
+        lines: List[Line] = get_or_create_lines(self.seg_name, self.file_name, blob_name)
         prior_label: Label = Label(self.root_label())
         dsect_name = self.seg_name
         for line in lines:
@@ -1,5 +1,5 @@
 from enum import Enum, auto
-from typing import List, Optional
+from typing import List, Optional, Dict
 
 
 class Continuation(Enum):
@@ -196,12 +196,14 @@ def create_listing_lines(seg_name: str, lines: List[str]) -> List[ListingLine]:
                      or (line.dsp != -1 and line.command not in {"ORG"})
                      or (line.command in {"PUSH", "POP"} and line.operand == "USING")]
     # Third pass to update the dsp of source line on executable macros
+    machine_code_dsp: Dict[str, int] = dict()
+    for line in listing_lines:
+        if line.source_stmt and line.source_stmt not in machine_code_dsp and line.is_machine_code:
+            machine_code_dsp[line.source_stmt] = line.dsp
     for source_line in listing_lines:
         if source_line.is_generated or source_line.dsp != -1:
             continue
-        next_line = next((line for line in listing_lines if line.source_stmt == source_line.stmt
-                          and line.is_machine_code), None)
-        if not next_line:
+        if source_line.stmt not in machine_code_dsp:
             continue
-        source_line.dsp = next_line.dsp
+        source_line.dsp = machine_code_dsp[source_line.stmt]
     return listing_lines
@@ -1,15 +1,25 @@
 import os
 import pickle
 import re
+import struct
+import sys
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 from copy import copy
-from typing import List, Optional
+from itertools import count
+from mmap import mmap, ACCESS_READ
+from typing import List, Optional, Dict, Tuple, Callable
 
 # noinspection PyPackageRequirements
 import google.api_core.exceptions
 from firestore_ci import FirestoreDocument
+# noinspection PyProtectedMember
+from firestore_ci.firestore_ci import _DB as firestore_db
+# noinspection PyPackageRequirements
+from google.cloud.firestore import WriteBatch, CollectionReference
 
 from d21_backend.config import config
-from d21_backend.p1_utils.domain import get_bucket, get_domain_folder
+from d21_backend.p1_utils.domain import get_bucket, get_domain_folder, read_folder
 from d21_backend.p1_utils.file_line import Line, File
 from d21_backend.p2_assembly.seg7_listing_line import ListingLine, create_listing_lines
 
@@ -73,63 +83,82 @@ def create_listing_commands(seg_name: str, lines: List[str]) -> List[LstCmd]:
                                 "SCANA", "REGSA", "REGLA"}
     # Init with commands that will never be expanded (IBM TPF specific executable macro)
     ibm_cmds: set = {"DETAC", "FINIS", "FLIPC", "ATTAC", "ENTNC"}
-    # Initialize the different type of source stmt
-    ibm_source_stmt: set = {line.stmt for line in listing_lines if line.command in ibm_cmds and not line.source_stmt}
-    exec_macro_source_stmt: set = {line.stmt for line in listing_lines if line.command in exec_macro_commands
-                                   and not line.source_stmt}
-    exec_ibm_source_stmt: set = exec_macro_source_stmt.union(ibm_source_stmt)
-    other_source_stm: set = {line.source_stmt for line in listing_lines if line.source_stmt
-                             and line.source_stmt not in exec_ibm_source_stmt}
+    node_exception_cmds: set = {"BEGIN", "PGMID"}
+    using_cmds: set = {"USING", "DSECT", "CSECT", "PUSH", "POP"}
+    # Single pass to classify the source stmt and to group the generated lines by their source stmt.
+    source_lines: List[ListingLine] = list()
+    generated_lines: Dict[str, List[ListingLine]] = dict()
+    ibm_source_stmt: set = set()
+    exec_macro_source_stmt: set = set()
+    node_exception_stmt: set = set()
+    machine_code_source_stmt: set = set()
+    for line in listing_lines:
+        if line.source_stmt:
+            if line.source_stmt not in generated_lines:
+                generated_lines[line.source_stmt] = list()
+            generated_lines[line.source_stmt].append(line)
+            if line.is_machine_code:
+                machine_code_source_stmt.add(line.source_stmt)
+            continue
+        source_lines.append(line)
+        if line.command in exec_macro_commands:
+            exec_macro_source_stmt.add(line.stmt)
+        elif line.command in ibm_cmds:
+            ibm_source_stmt.add(line.stmt)
+        elif line.command in node_exception_cmds:
+            node_exception_stmt.add(line.stmt)
+    # Generated lines of executable macros and of other macros (data macros). Lines of IBM macros are ignored.
+    exec_lines: List[ListingLine] = list()
+    exec_equ_ds_lines: List[ListingLine] = list()
+    using_data_lines: List[ListingLine] = list()
+    equ_ds_lines: List[ListingLine] = list()
+    other_source_stm: set = set()
+    for source_stmt, lines_of_stmt in generated_lines.items():
+        if source_stmt in exec_macro_source_stmt:
+            for line in lines_of_stmt:
+                (exec_equ_ds_lines if line.command in equ_ds else exec_lines).append(line)
+        elif source_stmt not in ibm_source_stmt:
+            other_source_stm.add(source_stmt)
+            for line in lines_of_stmt:
+                if line.command in equ_ds:
+                    equ_ds_lines.append(line)
+                elif line.command in using_cmds:
+                    using_data_lines.append(line)
     # Source commands = True Source - Data Macro declaration - Source commands that have been expanded
-    source_commands: List[LstCmd] = [create_listing_command(line, seg_name) for line in listing_lines
-                                     if not line.source_stmt
-                                     and line.stmt not in exec_macro_source_stmt
-                                     and not line.command.startswith("=")]
+    source_commands: List[LstCmd] = [create_listing_command(line, seg_name) for line in source_lines
+                                     if line.stmt not in exec_macro_source_stmt and not line.command.startswith("=")]
     # source_labels are all words in the operands of source commands
     source_labels: set = {label for cmd in source_commands for label in split_operand(cmd.operand) if label}
     # source_branch_labels are all branch labels from the source_commands
     source_branch_labels: set = {cmd.label for cmd in source_commands}
     # Exec cmds = Exec cmds that have been expanded - Ignored Exec cmds - EQU/DS cmds that are not used
-    non_equ_exec_cmds: List[LstCmd] = [create_listing_command(line, seg_name) for line in listing_lines
-                                       if line.source_stmt and line.source_stmt in exec_macro_source_stmt
-                                       and line.command not in equ_ds]
+    non_equ_exec_cmds: List[LstCmd] = [create_listing_command(line, seg_name) for line in exec_lines]
     non_equ_exec_labels: set = {label for cmd in non_equ_exec_cmds for label in split_operand(cmd.operand) if label}
     source_exec_labels: set = source_labels.union(non_equ_exec_labels)
-    equ_exec_cmds: List[LstCmd] = [create_listing_command(line, seg_name) for line in listing_lines
-                                   if line.source_stmt and line.source_stmt in exec_macro_source_stmt
-                                   and line.command in equ_ds and line.label in source_exec_labels]
+    equ_exec_cmds: List[LstCmd] = [create_listing_command(line, seg_name) for line in exec_equ_ds_lines
+                                   if line.label in source_exec_labels]
     exec_labels: set = {label for cmd in equ_exec_cmds for label in split_operand(cmd.operand) if label}
     source_exec_labels: set = source_exec_labels.union(exec_labels)
     # Data cmds = Generated USING,DSECT,CSECT,PUSH,POP + Generated EQU, DS that are used in source or exec cmds.
-    using_data_cmds: List[LstCmd] = [create_listing_command(line, seg_name) for line in listing_lines
-                                     if line.source_stmt and line.source_stmt in other_source_stm
-                                     and line.command in {"USING", "DSECT", "CSECT", "PUSH", "POP"}]
+    using_data_cmds: List[LstCmd] = [create_listing_command(line, seg_name) for line in using_data_lines]
     # equ_ds_data_cmds is Generated EQU, DS that are used in source or exec cmds - branch labels from source cmds
     # This is to remove generated labels with labels in front of realtime macros.
-    equ_ds_data_cmds: List[LstCmd] = [create_listing_command(line, seg_name) for line in listing_lines
-                                      if line.source_stmt and line.source_stmt in other_source_stm
-                                      and line.command in equ_ds and line.label in source_exec_labels
-                                      and line.label not in source_branch_labels]
+    equ_ds_data_lines: List[ListingLine] = [line for line in equ_ds_lines if line.label in source_exec_labels
+                                            and line.label not in source_branch_labels]
+    equ_ds_data_cmds: List[LstCmd] = [create_listing_command(line, seg_name) for line in equ_ds_data_lines]
     # equ_ds_labels are all words in the operands of equ_ds_data commands
     equ_ds_labels: set = {label for cmd in equ_ds_data_cmds for label in split_operand(cmd.operand) if label}
     # equ_ds_stmt are all stmt that are in generated EQU DS - This is to avoid duplicates
     equ_ds_stmt: set = {cmd.stmt for cmd in equ_ds_data_cmds}
     # equ_ds_extra_cmds are EQU DS definition that are used as operands in equ_ds_data_cmds
-    equ_ds_extra_cmds: List[LstCmd] = [create_listing_command(line, seg_name) for line in listing_lines
-                                       if line.source_stmt and line.source_stmt in other_source_stm
-                                       and line.command in equ_ds and line.label in equ_ds_labels
-                                       and line.label not in source_branch_labels
+    equ_ds_extra_cmds: List[LstCmd] = [create_listing_command(line, seg_name) for line in equ_ds_lines
+                                       if line.label in equ_ds_labels and line.label not in source_branch_labels
                                        and line.stmt not in equ_ds_stmt]
     listing_commands: List[LstCmd] = (source_commands + non_equ_exec_cmds + equ_exec_cmds + using_data_cmds
                                       + equ_ds_data_cmds + equ_ds_extra_cmds)
     listing_commands.sort(key=lambda item: item.stmt)
     # Setup node exception
-    node_exception_cmds: set = {"BEGIN", "PGMID"}
-    node_exception_stmt: set = {line.stmt for line in listing_lines if line.command in node_exception_cmds
-                                and not line.source_stmt}
-    data_macro_source_stmt: set = {stmt for stmt in other_source_stm
-                                   if not any(line.is_machine_code for line in listing_lines
-                                              if line.source_stmt == stmt)}
+    data_macro_source_stmt: set = other_source_stm - machine_code_source_stmt
     for cmd in listing_commands:
         if cmd.source_stmt:
             if cmd.source_stmt in data_macro_source_stmt and cmd.source_stmt not in exec_macro_source_stmt:
@@ -185,7 +214,136 @@ def get_lines_from_listing_commands(listing_commands: List[LstCmd]) -> List[Line
     return [create_line(command) for command in listing_commands]
 
 
-def get_from_lxp(filename: str) -> List[LstCmd]:
+class LxpFile:
+    # Columnar listing commands of a segment. All strings are interned in one table and each row is stored in the
+    # columns below in stmt order. The file is memory mapped and each column is read with a single cast.
+    # Header: magic, version, row count, string count, seg_name string id, size of the string table.
+    MAGIC = b"TPF1LXP\x00"
+    VERSION = 1
+    HEADER = struct.Struct("<8sHHIIII")
+    STRING_COLUMNS = ("stmt", "source_stmt", "label", "command", "operand")
+    MACHINE_CODE, NODE_EXCEPTION = 0x01, 0x02
+
+    def __init__(self, seg_name: str, strings: List[str], columns: Dict[str, List[int]]):
+        self.seg_name: str = seg_name
+        self.strings: List[str] = strings
+        self.columns: Dict[str, List[int]] = columns
+
+    def __len__(self) -> int:
+        return len(self.columns["index"])
+
+    def __repr__(self) -> str:
+        return f"LxpFile:{self.seg_name}:{len(self)}"
+
+    @classmethod
+    def is_lxp_file(cls, filename: str) -> bool:
+        try:
+            with open(filename, "rb") as file:
+                return file.read(len(cls.MAGIC)) == cls.MAGIC
+        except OSError:
+            return False
+
+    @staticmethod
+    def _read_column(buffer: memoryview, start: int, count: int, typecode: str) -> Tuple[List[int], int]:
+        end = start + count * array(typecode).itemsize
+        if sys.byteorder == "little":
+            return buffer[start:end].cast(typecode).tolist(), end
+        column = array(typecode, buffer[start:end].tobytes())
+        column.byteswap()
+        return column.tolist(), end
+
+    @staticmethod
+    def _write_column(file, values: List[int], typecode: str) -> None:
+        column = array(typecode, values)
+        if sys.byteorder != "little":
+            column.byteswap()
+        file.write(column.tobytes())
+
+    @classmethod
+    def read(cls, filename: str) -> Optional["LxpFile"]:
+        # A truncated or partly written file is not read. The listing commands are used instead.
+        try:
+            with open(filename, "rb") as file, mmap(file.fileno(), 0, access=ACCESS_READ) as buffer:
+                view = memoryview(buffer)
+                try:
+                    magic, version, _, count, string_count, seg_name_id, strings_size = cls.HEADER.unpack_from(view)
+                    if magic != cls.MAGIC or version != cls.VERSION:
+                        return None
+                    columns: Dict[str, List[int]] = dict()
+                    start = cls.HEADER.size
+                    columns["index"], start = cls._read_column(view, start, count, "i")
+                    for name in cls.STRING_COLUMNS:
+                        columns[name], start = cls._read_column(view, start, count, "I")
+                    columns["dsp"], start = cls._read_column(view, start, count, "i")
+                    columns["flags"], start = cls._read_column(view, start, count, "B")
+                    if start + strings_size != len(view):
+                        return None
+                    strings = [sys.intern(string) for string in
+                               str(view[start: start + strings_size], encoding="utf-8").split("\x00")]
+                finally:
+                    view.release()
+        except (OSError, struct.error, TypeError, ValueError):
+            return None
+        if len(strings) != string_count or seg_name_id >= string_count:
+            return None
+        return cls(strings[seg_name_id], strings, columns)
+
+    @classmethod
+    def write(cls, filename: str, lst_cmds: List[LstCmd]) -> None:
+        lst_cmds = sorted(lst_cmds, key=lambda item: item.stmt)
+        string_ids: Dict[str, int] = dict()
+        seg_name = lst_cmds[0].seg_name if lst_cmds else str()
+        seg_name_id = string_ids.setdefault(seg_name, len(string_ids))
+        columns: Dict[str, List[int]] = {name: [string_ids.setdefault(getattr(cmd, name), len(string_ids))
+                                                for cmd in lst_cmds] for name in cls.STRING_COLUMNS}
+        strings = "\x00".join(string_ids).encode("utf-8")
+        # The file is replaced only after it is completely written. So an existing file is never left truncated.
+        temp_filename = f"{filename}.{os.getpid()}"
+        with open(temp_filename, "wb") as file:
+            file.write(cls.HEADER.pack(cls.MAGIC, cls.VERSION, 0, len(lst_cmds), len(string_ids), seg_name_id,
+                                       len(strings)))
+            cls._write_column(file, [int(cmd.stmt.strip()) for cmd in lst_cmds], "i")
+            for name in cls.STRING_COLUMNS:
+                cls._write_column(file, columns[name], "I")
+            cls._write_column(file, [cmd.dsp for cmd in lst_cmds], "i")
+            cls._write_column(file, [(cls.MACHINE_CODE if cmd.is_machine_code else 0) |
+                                     (cls.NODE_EXCEPTION if cmd.node_exception else 0) for cmd in lst_cmds], "B")
+            file.write(strings)
+        os.replace(temp_filename, filename)
+        return
+
+    def to_lines(self) -> List[Line]:
+        lines: List[Line] = list()
+        strings = self.strings
+        for index, label, command, operand, dsp, flags in zip(self.columns["index"], self.columns["label"],
+                                                              self.columns["command"], self.columns["operand"],
+                                                              self.columns["dsp"], self.columns["flags"]):
+            line = Line()
+            line.label = strings[label]
+            line.command = strings[command]
+            line.operand = strings[operand]
+            line.dsp = dsp
+            line.node_exception = bool(flags & self.NODE_EXCEPTION)
+            line.index = index
+            lines.append(line)
+        return lines
+
+    def to_lst_cmds(self) -> List[LstCmd]:
+        lst_cmds: List[LstCmd] = list()
+        strings = self.strings
+        for row in range(len(self)):
+            lst_cmd = LstCmd()
+            lst_cmd.seg_name = self.seg_name
+            for name in self.STRING_COLUMNS:
+                setattr(lst_cmd, name, strings[self.columns[name][row]])
+            lst_cmd.dsp = self.columns["dsp"][row]
+            lst_cmd.is_machine_code = bool(self.columns["flags"][row] & self.MACHINE_CODE)
+            lst_cmd.node_exception = bool(self.columns["flags"][row] & self.NODE_EXCEPTION)
+            lst_cmds.append(lst_cmd)
+        return lst_cmds
+
+
+def get_from_pickled_lxp(filename: str) -> List[LstCmd]:
     try:
         with open(filename, "rb") as file:
             lst_cmds = pickle.load(file)
@@ -195,14 +353,37 @@ def get_from_lxp(filename: str) -> List[LstCmd]:
     return lst_cmds
 
 
+def get_from_lxp(filename: str) -> List[LstCmd]:
+    if not LxpFile.is_lxp_file(filename):
+        return get_from_pickled_lxp(filename)
+    lxp_file = LxpFile.read(filename)
+    return lxp_file.to_lst_cmds() if lxp_file else list()
+
+
+def convert_lxp(filename: str) -> bool:
+    # Convert a pickled lxp file to the columnar format in place.
+    if LxpFile.is_lxp_file(filename):
+        return True
+    lst_cmds: List[LstCmd] = get_from_pickled_lxp(filename)
+    if not lst_cmds:
+        return False
+    LxpFile.write(filename, lst_cmds)
+    return True
+
+
+def convert_lxp_folder(folder_name: str) -> List[str]:
+    # Returns the list of the files that could not be converted.
+    return [filename for _, filename in read_folder(folder_name, config.LXP_EXT, lambda name: name)
+            if not convert_lxp(filename)]
+
+
 def create_lxp(seg_name: str) -> str:
     lst_cmds: List[LstCmd] = LstCmd.objects.filter_by(seg_name=seg_name.upper()).order_by("stmt").get()
     if not lst_cmds:
         return str()
     filename = f"{seg_name.lower()}.{config.LXP}"
     file_path = os.path.join(get_domain_folder(config.LXP), filename)
-    with open(file_path, "wb") as file:
-        pickle.dump(lst_cmds, file)
+    LxpFile.write(file_path, lst_cmds)
     return file_path
 
 
@@ -220,18 +401,167 @@ def download_from_cloud(blob_name: str, filename: str) -> bool:
     return True
 
 
-def get_or_create_lst_cmds(seg_name: str, filename: str, blob_name: str) -> List[LstCmd]:
-    lst_cmds_from_lxp: List[LstCmd] = get_from_lxp(filename)
-    if lst_cmds_from_lxp:
-        return lst_cmds_from_lxp
-    lst_cmds: List[LstCmd] = LstCmd.objects.filter_by(seg_name=seg_name).order_by("stmt").get()
-    if lst_cmds:
+class FirestoreListingBackend:
+    # The writes are committed in firestore write batches of LST_CMD_BATCH_SIZE. LST_CMD_WORKERS batches are committed
+    # at the same time.
+    MAX_BATCH_SIZE: int = 500  # Firestore limit of writes in a batch
+
+    @classmethod
+    def _commit(cls, write: Callable[[WriteBatch, CollectionReference, LstCmd], None], lst_cmds: List[LstCmd]) -> None:
+        collection = firestore_db.collection(LstCmd.COLLECTION)
+        batch_size = min(config.LST_CMD_BATCH_SIZE, cls.MAX_BATCH_SIZE)
+        batches: List[WriteBatch] = list()
+        for index in range(0, len(lst_cmds), batch_size):
+            batch = firestore_db.batch()
+            for lst_cmd in lst_cmds[index: index + batch_size]:
+                write(batch, collection, lst_cmd)
+            batches.append(batch)
+        if not batches:
+            return
+        with ThreadPoolExecutor(max_workers=min(config.LST_CMD_WORKERS, len(batches))) as executor:
+            list(executor.map(lambda item: item.commit(), batches))
+        return
+
+    @staticmethod
+    def get(seg_name: str) -> List[LstCmd]:
+        return LstCmd.objects.filter_by(seg_name=seg_name).order_by("stmt").get()
+
+    def create(self, lst_cmds: List[LstCmd]) -> None:
+        def write(batch: WriteBatch, collection: CollectionReference, lst_cmd: LstCmd) -> None:
+            doc_ref = collection.document()
+            batch.set(doc_ref, lst_cmd.doc_to_dict())
+            lst_cmd.set_id(doc_ref.id)
+
+        self._commit(write, lst_cmds)
+        return
+
+    def save(self, lst_cmds: List[LstCmd]) -> None:
+        self._commit(lambda batch, collection, lst_cmd: batch.set(collection.document(lst_cmd.id),
+                                                                  lst_cmd.doc_to_dict()), lst_cmds)
+        return
+
+    def delete(self, lst_cmds: List[LstCmd]) -> None:
+        self._commit(lambda batch, collection, lst_cmd: batch.delete(collection.document(lst_cmd.id)), lst_cmds)
+        return
+
+
+class LocalListingBackend:
+    # Keeps the listing commands in memory. It is used in place of firestore by the tests.
+    def __init__(self):
+        self.documents: Dict[str, dict] = dict()
+        self.writes: int = 0
+        self._ids = count(1)
+
+    def get(self, seg_name: str) -> List[LstCmd]:
+        doc_dicts = [{**doc_dict, "id": doc_id} for doc_id, doc_dict in self.documents.items()
+                     if doc_dict["seg_name"] == seg_name]
+        lst_cmds: List[LstCmd] = LstCmd.objects.from_dicts(doc_dicts)
+        for lst_cmd, doc_dict in zip(lst_cmds, doc_dicts):
+            lst_cmd.set_id(doc_dict["id"])
+        lst_cmds.sort(key=lambda item: item.stmt)
         return lst_cmds
+
+    def create(self, lst_cmds: List[LstCmd]) -> None:
+        for lst_cmd in lst_cmds:
+            lst_cmd.set_id(f"LST{next(self._ids):06}")
+        self.save(lst_cmds)
+        return
+
+    def save(self, lst_cmds: List[LstCmd]) -> None:
+        for lst_cmd in lst_cmds:
+            self.documents[lst_cmd.id] = lst_cmd.doc_to_dict()
+        self.writes += len(lst_cmds)
+        return
+
+    def delete(self, lst_cmds: List[LstCmd]) -> None:
+        for lst_cmd in lst_cmds:
+            del self.documents[lst_cmd.id]
+        self.writes += len(lst_cmds)
+        return
+
+
+class ListingStore:
+    # A listing is stored as one document per statement. On re-upload only the statements that are added, changed or
+    # removed are written. Statements are matched on stmt and a repeated stmt is matched in the order of the listing.
+
+    def __init__(self, backend=None):
+        self.backend = backend if backend is not None else FirestoreListingBackend()
+
+    @staticmethod
+    def _get_keys(lst_cmds: List[LstCmd]) -> List[Tuple[str, int]]:
+        occurrences: Dict[str, int] = dict()
+        keys = list()
+        for lst_cmd in lst_cmds:
+            occurrences[lst_cmd.stmt] = occurrences.get(lst_cmd.stmt, -1) + 1
+            keys.append((lst_cmd.stmt, occurrences[lst_cmd.stmt]))
+        return keys
+
+    def get(self, seg_name: str) -> List[LstCmd]:
+        return self.backend.get(seg_name)
+
+    def sync(self, seg_name: str, lst_cmds: List[LstCmd]) -> Tuple[int, int, int]:
+        # Returns the number of statements created, updated and deleted. The ids of lst_cmds are set.
+        stored_list: List[LstCmd] = self.backend.get(seg_name)
+        stored_cmds: Dict[Tuple[str, int], LstCmd] = dict(zip(self._get_keys(stored_list), stored_list))
+        created_cmds: List[LstCmd] = list()
+        updated_cmds: List[LstCmd] = list()
+        for key, lst_cmd in zip(self._get_keys(lst_cmds), lst_cmds):
+            stored_cmd = stored_cmds.pop(key, None)
+            if stored_cmd is None:
+                created_cmds.append(lst_cmd)
+                continue
+            lst_cmd.set_id(stored_cmd.id)
+            if lst_cmd.doc_to_dict() != stored_cmd.doc_to_dict():
+                updated_cmds.append(lst_cmd)
+        deleted_cmds: List[LstCmd] = list(stored_cmds.values())
+        self.backend.create(created_cmds)
+        self.backend.save(updated_cmds)
+        self.backend.delete(deleted_cmds)
+        return len(created_cmds), len(updated_cmds), len(deleted_cmds)
+
+    def delete(self, seg_name: str) -> int:
+        stored_cmds = self.backend.get(seg_name)
+        self.backend.delete(stored_cmds)
+        return len(stored_cmds)
+
+
+_listing_store: ListingStore = ListingStore()
+
+
+def get_listing_store() -> ListingStore:
+    return _listing_store
+
+
+def get_lst_cmds_from_file(seg_name: str, filename: str, blob_name: str) -> List[LstCmd]:
     # Ensure file is present for cloud objects
     if blob_name and not os.path.exists(filename):
         if not download_from_cloud(blob_name, filename):
             return list()
     lines: List[str] = File.open_file(filename)
-    listing_commands: List[LstCmd] = create_listing_commands(seg_name, lines)
-    LstCmd.objects.create_all(LstCmd.objects.to_dicts(listing_commands))
+    return create_listing_commands(seg_name, lines)
+
+
+def sync_lst_cmds(seg_name: str, filename: str, blob_name: str) -> List[LstCmd]:
+    # Update the stored listing commands with the listing in the file.
+    listing_commands: List[LstCmd] = get_lst_cmds_from_file(seg_name, filename, blob_name)
+    if listing_commands:
+        get_listing_store().sync(seg_name, listing_commands)
     return listing_commands
+
+
+def get_or_create_lst_cmds(seg_name: str, filename: str, blob_name: str) -> List[LstCmd]:
+    lst_cmds_from_lxp: List[LstCmd] = get_from_lxp(filename)
+    if lst_cmds_from_lxp:
+        return lst_cmds_from_lxp
+    lst_cmds: List[LstCmd] = get_listing_store().get(seg_name)
+    if lst_cmds:
+        return lst_cmds
+    return sync_lst_cmds(seg_name, filename, blob_name)
+
+
+def get_or_create_lines(seg_name: str, filename: str, blob_name: str) -> List[Line]:
+    # Lines are decoded straight from the columns of a lxp file without creating LstCmd.
+    lxp_file: Optional[LxpFile] = LxpFile.read(filename) if LxpFile.is_lxp_file(filename) else None
+    if lxp_file:
+        return lxp_file.to_lines()
+    return get_lines_from_listing_commands(get_or_create_lst_cmds(seg_name, filename, blob_name))
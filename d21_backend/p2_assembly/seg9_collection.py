@@ -1,5 +1,5 @@
 import os
-from typing import Dict, Optional, List, Tuple
+from typing import Dict, Optional, List, Tuple, Set
 
 from firestore_ci import FirestoreDocument
 # noinspection PyPackageRequirements
@@ -7,6 +7,7 @@ from google.cloud.storage import Client
 
 from d21_backend.config import config
 from d21_backend.p1_utils.domain import read_folder, get_domain_folder, get_base_folder, get_domain, get_bucket
+from d21_backend.p2_assembly.mac2_data_macro import get_changed_macros, invalidate_macros
 from d21_backend.p2_assembly.seg6_segment import Segment
 
 
@@ -135,6 +136,16 @@ class SegmentCollection:
             return None
         return self.segments[seg_name]
 
+    def invalidate(self, macro_names: Set[str]) -> List[str]:
+        # Assembled segments that use any of the macros are replaced by segments that are not assembled.
+        seg_names = [seg_name for seg_name, segment in self.segments.items()
+                     if segment.nodes and macro_names.intersection(segment.macro_names)]
+        for seg_name in seg_names:
+            segment = self.segments[seg_name]
+            self.segments[seg_name] = get_segment(seg_name, segment.file_name, segment.file_type, segment.source,
+                                                  segment.blob_name)
+        return seg_names
+
     def is_seg_local(self, seg_name) -> bool:
         if not self.is_seg_present(seg_name):
             return False
@@ -153,3 +164,18 @@ def init_seg_collection() -> None:
     if _seg_collection.domain != get_domain():
         _seg_collection = SegmentCollection()
     return
+
+
+def reload_macros(macro_names: Optional[Set[str]] = None, rebuild: bool = False) -> Tuple[Set[str], List[str]]:
+    # Invalidate the macros whose file has changed (or the given macros) with the macros and segments that depend on
+    # them. They are loaded and assembled again on next use or straight away with rebuild.
+    # Returns the names of the invalidated macros and segments.
+    macro_names = get_changed_macros() if macro_names is None else macro_names
+    if not macro_names:
+        return set(), list()
+    invalidated_macros = invalidate_macros(macro_names)
+    seg_names = get_seg_collection().invalidate(invalidated_macros)
+    if rebuild:
+        for seg_name in seg_names:
+            get_seg_collection().get_seg(seg_name).assemble()
+    return invalidated_macros, seg_names
@@ -1,11 +1,11 @@
-from typing import List, Dict, Union, Tuple, Optional
+from typing import List, Dict, Tuple, Optional
 
 from d21_backend.config import config
 from d21_backend.p1_utils.data_type import DataType
 from d21_backend.p1_utils.domain import get_domain
 from d21_backend.p1_utils.errors import PnrElementError, PnrLocatorNotFoundError, NotFoundInSymbolTableError, TestDataError
 from d21_backend.p2_assembly.mac0_generic import LabelReference
-from d21_backend.p2_assembly.mac2_data_macro import get_macros
+from d21_backend.p2_assembly.mac2_data_macro import get_macros, get_merged_labels
 from d21_backend.p3_db.stream import Stream
 
 NAME, HFAX, FQTV, ITIN, RCVD_FROM, PHONE, REMARKS = "name", "hfax", "fqtv", "itin", "rcvd_from", "phone", "remarks"
@@ -60,7 +60,6 @@ def load_pdequ():
 
 
 class Pnr:
-    DB: List[Dict[str, Union[str, List[Dict[str, bytearray]]]]] = [{"id": config.AAAPNR, "doc": list()}]
     STD_PREFIX_BYTES = bytearray([0x00] * 0x14)
     PDEQU: Dict[str, Dict[str, int]] = load_pdequ()
     ATTRIBUTES = [
@@ -82,6 +81,7 @@ class Pnr:
         PnrAttribute(ADM_CLUB, "82", std_var=bytearray([0x80])),  # Indicate NEW item
         PnrAttribute(TKT_TIM_LMT, "68", std_var=bytearray([0x80])),  # Indicate NEW item
     ]
+    MACRO_NAMES: Tuple[str, ...] = tuple(dict.fromkeys(attribute.macro_name for attribute in ATTRIBUTES))
     DOMAIN = get_domain()
 
     @classmethod
@@ -91,11 +91,6 @@ class Pnr:
             cls.DOMAIN = get_domain()
         return
 
-    @classmethod
-    def init_db(cls) -> None:
-        cls.DB = [{"id": config.AAAPNR, "doc": list()}]
-        cls.add_from_byte_array(byte_array={"PR00_20_SID": bytearray([0x00])}, key=HEADER, locator=config.AAAPNR)
-
     @classmethod
     def load_macros(cls):
         for attribute in Pnr.ATTRIBUTES:
@@ -104,9 +99,7 @@ class Pnr:
 
     @classmethod
     def get_field(cls, field_name) -> Optional[LabelReference]:
-        macros = get_macros()
-        pnr_macros: set = {attribute.macro_name for attribute in Pnr.ATTRIBUTES}
-        return next((macros[macro].lookup(field_name) for macro in pnr_macros if macros[macro].check(field_name)), None)
+        return get_merged_labels(cls.MACRO_NAMES).get(field_name)
 
     @classmethod
     def is_valid_field(cls, field_name) -> bool:
@@ -126,15 +119,51 @@ class Pnr:
             raise TestDataError
         return field.dsp
 
-    @staticmethod
-    def get_pnr_data(pnr_locator: str, key: str, item_number: int, packed: bool = False,
-                     starts_with: Optional[str] = None) -> Tuple[Optional[bytearray], int]:
-        # item_number starts from 1 for the 1st item (index 0)
+    @classmethod
+    def get_attribute_by_name(cls, name: str) -> PnrAttribute:
+        return next((attribute for attribute in cls.ATTRIBUTES if attribute.name == name), None)
+
+    @classmethod
+    def get_attribute_by_key(cls, key: str) -> PnrAttribute:
+        return next((attribute for attribute in cls.ATTRIBUTES if attribute.key == key), None)
+
+    @classmethod
+    def get_pdequ_label(cls, idk: str, value: int) -> str:
+        if idk not in {"index", "designator", "key"}:
+            return str()
+        return next((label for label, idk_dict in cls.PDEQU.items() if idk_dict[idk] == value), str())
+
+
+class PnrStore:
+    # PNR items indexed by locator and key. The items of a key are in the order in which they were added.
+
+    def __init__(self):
+        self.pnrs: Dict[str, Dict[str, List[bytearray]]] = {config.AAAPNR: dict()}
+
+    def init_db(self) -> None:
+        self.pnrs = {config.AAAPNR: dict()}
+        self.add_from_byte_array(byte_array={"PR00_20_SID": bytearray([0x00])}, key=HEADER, locator=config.AAAPNR)
+
+    def copy(self) -> "PnrStore":
+        pnr_store = PnrStore()
+        pnr_store.pnrs = {locator: {key: [bytearray(data) for data in items] for key, items in pnr.items()}
+                          for locator, pnr in self.pnrs.items()}
+        return pnr_store
+
+    def _get_pnr(self, pnr_locator: str) -> Dict[str, List[bytearray]]:
         try:
-            pnr_doc = next(pnr["doc"] for pnr in Pnr.DB if pnr["id"] == pnr_locator)
-            data_list = [element["data"] for element in pnr_doc if element["key"] == key]
-        except StopIteration:
+            return self.pnrs[pnr_locator]
+        except KeyError:
             raise PnrLocatorNotFoundError
+
+    def _get_items(self, locator: str, key: str) -> List[bytearray]:
+        pnr = self.pnrs.setdefault(locator, dict())
+        return pnr.setdefault(key, list())
+
+    def get_pnr_data(self, pnr_locator: str, key: str, item_number: int, packed: bool = False,
+                     starts_with: Optional[str] = None) -> Tuple[Optional[bytearray], int]:
+        # item_number starts from 1 for the 1st item (index 0)
+        data_list = self._get_pnr(pnr_locator).get(key, list())
         starts_with = DataType("C", input=starts_with).to_bytes() if starts_with is not None else None
         attribute = Pnr.get_attribute_by_key(key)
         if not attribute:
@@ -152,15 +181,12 @@ class Pnr:
                 return data, item_number
         return None, item_number
 
-    @staticmethod
-    def replace_pnr_data(data: bytearray, pnr_locator: str, key: str, item_number: int, packed: bool = False) -> None:
+    def replace_pnr_data(self, data: bytearray, pnr_locator: str, key: str, item_number: int,
+                         packed: bool = False) -> None:
         # item_number starts from 1 for the 1st item (index 0)
-        try:
-            pnr_doc: List[Dict[str, bytearray]] = next(pnr["doc"] for pnr in Pnr.DB if pnr["id"] == pnr_locator)
-        except StopIteration:
-            raise PnrLocatorNotFoundError
+        data_list = self._get_pnr(pnr_locator).get(key, list())
         attribute = Pnr.get_attribute_by_key(key)
-        if not attribute:
+        if not attribute or not 1 <= item_number <= len(data_list):
             raise PnrElementError
         new_data = bytearray()
         if not packed:
@@ -168,57 +194,28 @@ class Pnr:
             new_data.extend(attribute.std_fix)
             new_data.extend(attribute.std_var)
         new_data.extend(data)
-        pnr_doc.sort(key=lambda pnr_lrec: pnr_lrec["key"])
-        key_index = next(index for index, pnr_lrec in enumerate(pnr_doc) if pnr_lrec["key"] == key)
-        index_to_update = key_index + item_number - 1
-        pnr_doc[index_to_update]["data"] = new_data
+        data_list[item_number - 1] = new_data
         return
 
-    @staticmethod
-    def get_len(pnr_locator: str, key: str) -> int:
-        try:
-            pnr_doc = next(pnr["doc"] for pnr in Pnr.DB if pnr["id"] == pnr_locator)
-        except StopIteration:
-            raise PnrLocatorNotFoundError
-        return len([element for element in pnr_doc if element["key"] == key])
-
-    @classmethod
-    def get_pnr_doc(cls, pnr_locator: str) -> List[Dict[str, bytearray]]:
-        try:
-            pnr_doc = next(pnr["doc"] for pnr in cls.DB if pnr["id"] == pnr_locator)
-        except StopIteration:
-            pnr_doc: List[Dict[str, bytearray]] = list()
-            Pnr.DB.append({"id": pnr_locator, "doc": pnr_doc})
-        return pnr_doc
+    def get_len(self, pnr_locator: str, key: str) -> int:
+        return len(self._get_pnr(pnr_locator).get(key, list()))
 
-    @classmethod
-    def get_attribute_by_name(cls, name: str) -> PnrAttribute:
-        return next((attribute for attribute in cls.ATTRIBUTES if attribute.name == name), None)
-
-    @classmethod
-    def get_attribute_by_key(cls, key: str) -> PnrAttribute:
-        return next((attribute for attribute in cls.ATTRIBUTES if attribute.key == key), None)
-
-    @staticmethod
-    def add_from_data(data: str, key: str, locator: str):
+    def add_from_data(self, data: str, key: str, locator: str):
         attribute = Pnr.get_attribute_by_name(key)
         if attribute is None or attribute.byte_array or attribute.packed:
             raise PnrElementError
-        pnr_doc: List[Dict[str, bytearray]] = Pnr.get_pnr_doc(locator)
         lrec = PnrLrec(attribute.key)
         lrec.data.extend(Pnr.STD_PREFIX_BYTES[:])
         lrec.data.extend(attribute.std_fix)
         lrec.data.extend(attribute.std_var)
         lrec.data.extend(DataType("C", input=data).to_bytes())
-        pnr_doc.append(lrec.to_dict())
+        self._get_items(locator, lrec.key).append(lrec.data)
 
-    @staticmethod
-    def add_from_byte_array(byte_array: Dict[str, bytearray], key: str, locator: str):
+    def add_from_byte_array(self, byte_array: Dict[str, bytearray], key: str, locator: str):
         macros = get_macros()
         attribute = Pnr.get_attribute_by_name(key)
         if attribute is None or not attribute.byte_array or attribute.macro_name not in get_macros():
             raise PnrElementError
-        pnr_doc: List[Dict[str, bytearray]] = Pnr.get_pnr_doc(locator)
         lrec = PnrLrec(attribute.key)
         if not attribute.packed:
             lrec.data.extend(Pnr.STD_PREFIX_BYTES[:])
@@ -230,13 +227,7 @@ class Pnr:
         except NotFoundInSymbolTableError:
             data_bytes = Stream(macros["PR001W"]).to_bytes(byte_array)
             lrec.data = data_bytes
-        pnr_doc.append(lrec.to_dict())
-
-    @classmethod
-    def get_pdequ_label(cls, idk: str, value: int) -> str:
-        if idk not in {"index", "designator", "key"}:
-            return str()
-        return next((label for label, idk_dict in cls.PDEQU.items() if idk_dict[idk] == value), str())
+        self._get_items(locator, lrec.key).append(lrec.data)
 
 
 class PnrLocator:
@@ -2,6 +2,7 @@ from typing import List, Optional
 
 from munch import Munch
 
+from d21_backend.config import config
 from d21_backend.p2_assembly.seg6_segment import Segment
 from d21_backend.p2_assembly.seg9_collection import get_seg_collection
 from d21_backend.p3_db.response import StandardResponse, RequestType
@@ -9,10 +10,11 @@ from d21_backend.p3_db.startup_script import validate_seg_name
 from d21_backend.p3_db.test_data import TestData
 from d21_backend.p3_db.test_data_get import get_whole_test_data
 from d21_backend.p4_execution.ex5_execute import TpfServer
-from d21_backend.p4_execution.profiler import SegmentProfiler
+from d21_backend.p4_execution.parallel import run_profiler_in_pool
+from d21_backend.p4_execution.profiler import SegmentProfiler, ProfilerSession
 
 
-def initialize_profiler(rsp: StandardResponse) -> Optional[SegmentProfiler]:
+def initialize_profiler(rsp: StandardResponse) -> Optional[ProfilerSession]:
     validate_seg_name(rsp)
     if rsp.error:
         return None
@@ -23,7 +25,7 @@ def initialize_profiler(rsp: StandardResponse) -> Optional[SegmentProfiler]:
         rsp.error_fields.seg_name = f"Assembly error. {assembly_error}"
         rsp.error = True
         return None
-    profiler: SegmentProfiler = SegmentProfiler(segment.get_instructions())
+    profiler: ProfilerSession = ProfilerSession(segment.seg_name)
     return profiler
 
 
@@ -47,7 +49,13 @@ def extract_test_data(rsp: StandardResponse) -> List[TestData]:
     return test_data_list
 
 
-def execute_profiler(profiler: SegmentProfiler, test_data_list: List[TestData]) -> None:
+def execute_profiler(profiler: ProfilerSession, test_data_list: List[TestData],
+                     workers: int = config.PROFILER_WORKERS) -> None:
+    if workers > 1 and len(test_data_list) > 1:
+        for path_hits in run_profiler_in_pool(TpfServer, profiler.seg_name, test_data_list, workers,
+                                              config.VARIATION_START_METHOD):
+            profiler.merge(path_hits)
+        return
     for test_data in test_data_list:
         tpf_server = TpfServer()
         tpf_server.run(test_data.seg_name, test_data, profiler)
@@ -65,18 +73,26 @@ def extract_data_from_profiler(profiler: SegmentProfiler) -> Munch:
                  )
 
 
+def extract_data_from_session(profiler: ProfilerSession) -> Munch:
+    # The coverage of the segment is at the top level. The coverage of every segment that was executed is in segments.
+    data: Munch = extract_data_from_profiler(profiler.profiler)
+    data.segments = [Munch(seg_name=seg_name, **extract_data_from_profiler(seg_profiler))
+                     for seg_name, seg_profiler in sorted(profiler.profilers.items()) if seg_profiler]
+    return data
+
+
 def run_profiler(body: Munch) -> Munch:
     rsp: StandardResponse = StandardResponse(body, RequestType.PROFILER_RUN)
     if rsp.error:
         return rsp.dict_with_data
-    profiler: SegmentProfiler = initialize_profiler(rsp)
+    profiler: ProfilerSession = initialize_profiler(rsp)
     if rsp.error:
         return rsp.dict_with_data
     test_data_list: List[TestData] = extract_test_data(rsp)
     if rsp.error:
         return rsp.dict_with_data
     execute_profiler(profiler, test_data_list)
-    rsp.data = extract_data_from_profiler(profiler)
+    rsp.data = extract_data_from_session(profiler)
     rsp.data.test_data_list = [Munch(name=test_data.name, id=test_data.id) for test_data in test_data_list]
     rsp.message = "Profiler ran successfully."
     return rsp.dict_with_data
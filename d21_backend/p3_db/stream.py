@@ -11,14 +11,13 @@ class Stream:
         self.data_macro = data_macro
         self.vm = Storage()
         self.address = self.vm.allocate()
-        self.base_key = self.vm.base_key(self.address)
         self.data_macro.load()
 
     def to_bytes(self, data: Dict[str, bytearray]) -> bytearray:
         for field_name, byte_array in data.items():
             dsp = self.data_macro.evaluate(field_name)
             self.vm.set_bytes(byte_array, self.address + dsp, len(byte_array))
-        return self.vm.frames[self.base_key]
+        return self.vm.get_data_from_base_address(self.address)
 
     def item_to_bytes(self, item_list: List[Dict[str, bytearray]], item: str, count: Optional[str] = None,
                       data: Optional[Dict[str, bytearray]] = None, adjust: bool = False) -> bytearray:
@@ -36,4 +35,4 @@ class Stream:
                 dsp = dsp - item_ref.dsp if adjust else dsp
                 self.vm.set_bytes(byte_array, self.address + dsp + item_start, len(byte_array))
             item_start += item_ref.length
-        return self.vm.frames[self.base_key]
+        return self.vm.get_data_from_base_address(self.address)
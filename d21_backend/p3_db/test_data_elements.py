@@ -159,6 +159,9 @@ class Output(FirestoreDocument):
         self.debug: List[Union[str, dict]] = list()
         self.debug_missed: List[dict] = list()
         self.traces: List[dict] = list()
+        self.trace_count: int = 0  # Number of traces in the buffer. Only a page of them is in traces.
+        self.traces_dropped: int = 0  # Number of earliest traces dropped from the buffer. The buffer starts after them.
+        self.stats: dict = dict()
         self.variation: Dict[str, int] = {"core": 0, "pnr": 0, "tpfdf": 0, "file": 0}
         self.variation_name: Dict[str, str] = {"core": str(), "pnr": str(), "tpfdf": str(), "file": str()}
         self.result_id: int = 0
@@ -1,4 +1,5 @@
-from typing import List, Dict, Union, Tuple, Optional
+from bisect import bisect_left
+from typing import List, Dict, Union, Tuple, Optional, Callable
 
 from d21_backend.p1_utils.data_type import DataType
 from d21_backend.p2_assembly.mac2_data_macro import get_macros
@@ -7,6 +8,8 @@ from d21_backend.p3_db.stream import Stream
 
 class Tpfdf:
     DB: List[Dict[str, Union[str, List[Dict[str, bytearray]]]]] = list()
+    # Index of the primary key of each ref. ref_name -> (ref, {key: sorted list of indexes of the lrecs in the ref})
+    KEY_INDEX: Dict[str, Tuple[List[Dict[str, bytearray]], Dict[str, List[int]]]] = dict()
 
     @staticmethod
     def get_ref(ref_name: str) -> List[Dict[str, bytearray]]:
@@ -36,7 +39,27 @@ class Tpfdf:
         return True
 
     @staticmethod
-    def get_item_numbers(ref_name: str, key: str, other_keys: Dict[str, Tuple[str, int]], start: int = 0) -> List[int]:
+    def get_key_indexes(ref_name: str, key: str) -> List[int]:
+        ref = Tpfdf.get_ref(ref_name)
+        ref_index = Tpfdf.KEY_INDEX.get(ref_name)
+        if ref_index is None or ref_index[0] is not ref:
+            key_index: Dict[str, List[int]] = dict()
+            for index, lrec in enumerate(ref):
+                key_index.setdefault(lrec["key"], list()).append(index)
+            ref_index = (ref, key_index)
+            Tpfdf.KEY_INDEX[ref_name] = ref_index
+        return ref_index[1].get(key, list())
+
+    @staticmethod
+    def _add_to_key_index(ref_name: str, ref: List[Dict[str, bytearray]]) -> None:
+        ref_index = Tpfdf.KEY_INDEX.get(ref_name)
+        if ref_index is not None and ref_index[0] is ref:
+            ref_index[1].setdefault(ref[-1]["key"], list()).append(len(ref) - 1)
+
+    @staticmethod
+    def get_item_numbers(ref_name: str, key: str, other_keys: Dict[str, Tuple[Callable, bytearray]],
+                         start: int = 0) -> List[int]:
+        # other_keys is field_name -> (comparison operator, value). The lrec field is the left operand.
         ref = Tpfdf.get_ref(ref_name)
         start_index = 0 if start == 0 else start - 1
         if not 0 <= start_index < len(ref):
@@ -44,9 +67,11 @@ class Tpfdf:
         if ref_name not in get_macros():
             return list()
         symbol_table = get_macros()[ref_name].all_labels
-        return [index + start_index + 1 for index, lrec in enumerate(ref[start_index:]) if lrec["key"] == key and
-                all(eval(f"{lrec['data'][symbol_table[field_name].dsp: symbol_table[field_name].dsp + length]} {exp}")
-                    for field_name, (exp, length) in other_keys.items())]
+        predicates = [(symbol_table[field_name].dsp, symbol_table[field_name].dsp + len(value), compare, value)
+                      for field_name, (compare, value) in other_keys.items()]
+        indexes = Tpfdf.get_key_indexes(ref_name, key)
+        return [index + 1 for index in indexes[bisect_left(indexes, start_index):]
+                if all(compare(ref[index]["data"][dsp: end], value) for dsp, end, compare, value in predicates)]
 
     @staticmethod
     def get_size(ref_name: str):
@@ -66,6 +91,7 @@ class Tpfdf:
         final_data.extend(input_data)
         lrec["data"] = final_data
         ref.append(lrec)
+        Tpfdf._add_to_key_index(ref_name, ref)
 
     @staticmethod
     def add_bytes(data: bytearray, key: str, ref_name: str) -> None:
@@ -75,12 +101,15 @@ class Tpfdf:
         lrec["key"] = key
         lrec["data"] = data
         ref.append(lrec)
+        Tpfdf._add_to_key_index(ref_name, ref)
 
     @staticmethod
     def init_db(ref_name: Optional[str] = None):
         if ref_name is None:
             Tpfdf.DB = list()
+            Tpfdf.KEY_INDEX = dict()
         else:
+            Tpfdf.KEY_INDEX.pop(ref_name, None)
             df_record = next((df_record for df_record in Tpfdf.DB if df_record["id"] == ref_name), None)
             if df_record is not None:
                 Tpfdf.DB.remove(df_record)
@@ -93,4 +122,6 @@ class Tpfdf:
         indexes = [index - 1 for index in item_numbers if 0 <= index - 1 < len(ref)]
         for index in sorted(indexes, reverse=True):
             del ref[index]
+        if indexes:
+            Tpfdf.KEY_INDEX.pop(ref_name, None)
         return
@@ -1,5 +1,5 @@
 from copy import copy
-from typing import Union, Optional, Tuple, Dict
+from typing import Union, Optional, Tuple, Dict, Set
 
 from d21_backend.config import config
 from d21_backend.p1_utils.data_type import DataType, Register
@@ -117,8 +117,12 @@ class Registers:
 
 class Storage:
     def __init__(self):
-        self.frames: Dict[str, bytearray] = dict()  # Frames init with ZERO
-        self._frame: Dict[str, bytearray] = dict()  # Frames init with ONES
+        # Storage is a set of 4K pages indexed by page number (address >> 12). Each page is zero initialised.
+        self.pages: Dict[int, bytearray] = dict()
+        self.lengths: Dict[int, int] = dict()  # Highest displacement accessed in the page (logical frame length)
+        self.updated: Dict[int, int] = dict()  # Bitmap of the bytes that are updated. Bit n is byte n of the page.
+        self.updated_bits: Dict[int, Dict[int, int]] = dict()  # Mask of updated bits of partially updated bytes
+        self.shared: Set[int] = set()  # Pages shared with a snapshot. They are copied before they are updated.
         self.nab: int = config.F4K << config.NIBBLE  # To ensure total 16 fixed frames
         self.allocate_fixed(config.ECB)
         self.allocate_fixed(config.GL0BS)
@@ -128,19 +132,40 @@ class Storage:
         self.allocate_fixed(config.GLOBYS)
 
     def __repr__(self) -> str:
-        return f"Storage:{len(self.frames)}"
+        return f"Storage:{len(self.pages)}"
+
+    def snapshot(self) -> "Storage":
+        # Copy on write. Both storages share the pages until one of them updates it.
+        storage = copy(self)
+        storage.pages = dict(self.pages)
+        storage.lengths = dict(self.lengths)
+        storage.updated = dict(self.updated)
+        storage.updated_bits = {page: dict(updated_bits) for page, updated_bits in self.updated_bits.items()}
+        storage.shared = set(self.pages)
+        self.shared = set(self.pages)
+        return storage
+
+    def _get_page_for_update(self, page: int) -> bytearray:
+        if page in self.shared:
+            self.shared.discard(page)
+            self.pages[page] = bytearray(self.pages[page])
+        return self.pages[page]
+
+    def _init_page(self, page: int, length: int = 0) -> bytearray:
+        self.shared.discard(page)
+        self.pages[page] = bytearray(max(config.F4K, length))
+        self.lengths[page] = length
+        self.updated[page] = (1 << length) - 1
+        self.updated_bits[page] = dict()
+        return self.pages[page]
 
     def allocate(self) -> int:
-        base_address = self.base_key(self.nab)
-        self.frames[base_address] = bytearray()
-        self._frame[base_address] = bytearray()
+        self._init_page(self.page_number(self.nab))
         self.nab += config.F4K
         return self.nab - config.F4K
 
     def allocate_fixed(self, address: int) -> None:
-        base_address = self.base_key(address)
-        self.frames[base_address] = bytearray()
-        self._frame[base_address] = bytearray()
+        self._init_page(self.page_number(address))
 
     def get_allocated_address(self) -> bytearray:
         return DataType('F', input=str(self.nab - config.F4K)).to_bytes(config.REG_BYTES)
@@ -151,114 +176,166 @@ class Storage:
         address = (address >> config.DSP_SHIFT) << config.DSP_SHIFT
         return f"{address:08X}"
 
+    @staticmethod
+    def page_number(address: int) -> int:
+        return (address & config.REG_MAX) >> config.DSP_SHIFT
+
     @staticmethod
     def dsp(address: int) -> int:
         return address & (config.F4K - 1)
 
-    def extend_frame(self, base_address: str, length: int) -> None:
+    @classmethod
+    def is_within_page(cls, address: int, length: int) -> bool:
+        return cls.dsp(address) + length <= config.F4K
+
+    def extend_frame(self, page: int, length: int) -> None:
         try:
-            frame_len = len(self.frames[base_address])
+            frame_len = self.lengths[page]
         except KeyError:
             raise BaseAddressError
         if length > frame_len:
-            self.frames[base_address].extend(bytearray([config.ZERO] * (length - frame_len)))
-            self._frame[base_address].extend(bytearray([config.ONES] * (length - frame_len)))
+            self.lengths[page] = length
+            if length > len(self.pages[page]):
+                frame = self._get_page_for_update(page)
+                frame.extend(bytes(length - len(frame)))
 
-    def _get_data(self, address: int, length: Optional[int] = None) -> Tuple[str, int, int]:
-        base_address = self.base_key(address)
+    def _get_data(self, address: int, length: Optional[int] = None) -> Tuple[int, int, int]:
+        page = self.page_number(address)
         start = self.dsp(address)
         end = start + 1 if length is None else start + length
-        self.extend_frame(base_address, end)
-        return base_address, start, end
+        self.extend_frame(page, end)
+        return page, start, end
+
+    def _set_updated(self, page: int, start: int, end: int) -> None:
+        self.updated[page] |= ((1 << (end - start)) - 1) << start
+        updated_bits = self.updated_bits[page]
+        if updated_bits:
+            for dsp in [dsp for dsp in updated_bits if start <= dsp < end]:
+                del updated_bits[dsp]
+
+    def _set_updated_bits(self, page: int, dsp: int, bits: int) -> None:
+        if self.updated[page] >> dsp & 1:
+            return
+        updated_bits = self.updated_bits[page]
+        bits |= updated_bits.get(dsp, 0)
+        if bits == config.ONES:
+            updated_bits.pop(dsp, None)
+            self.updated[page] |= 1 << dsp
+        elif bits:
+            updated_bits[dsp] = bits
 
     def get_data_from_base_address(self, address: int) -> bytearray:
-        base_address = self.base_key(address)
+        page = self.page_number(address)
         try:
-            return self.frames[base_address]
+            return self.pages[page][:self.lengths[page]]
         except KeyError:
             raise BaseAddressError
 
     def get_bytes(self, address: int, length: Optional[int] = None) -> bytearray:
-        base_address, start, end = self._get_data(address, length)
-        return self.frames[base_address][start: end]
+        page, start, end = self._get_data(address, length)
+        return self.pages[page][start: end]
 
     def get_byte(self, address: int) -> int:
-        base_address, dsp, _ = self._get_data(address)
-        return self.frames[base_address][dsp]
+        page, dsp, _ = self._get_data(address)
+        return self.pages[page][dsp]
 
     def get_value(self, address: int, length: int = 4) -> int:
-        return DataType('F', bytes=self.get_bytes(address, length)).value
+        return int.from_bytes(self.get_bytes(address, length), "big", signed=True)
 
     def get_unsigned_value(self, address: int, length: int = 4) -> int:
-        return DataType('X', bytes=self.get_bytes(address, length)).value
+        return int.from_bytes(self.get_bytes(address, length), "big", signed=False)
 
     def set_frame(self, byte_array: bytearray, address: int):
-        base_address = self.base_key(address)
-        self.frames[base_address] = byte_array
-        self._frame[base_address] = byte_array
+        frame = self._init_page(self.page_number(address), len(byte_array))
+        frame[:len(byte_array)] = byte_array
 
     def set_bytes(self, byte_array: bytearray, address: int, length: Optional[int] = None) -> None:
-        base_address, start, end = self._get_data(address, length)
-        for index, byte in enumerate(byte_array[: end - start]):
-            self.frames[base_address][index + start] = byte
-            self._frame[base_address][index + start] = byte
+        page, start, end = self._get_data(address, length)
+        data = memoryview(byte_array)[: end - start]
+        end = start + len(data)
+        self._get_page_for_update(page)[start: end] = data
+        self._set_updated(page, start, end)
 
     def set_byte(self, byte: int, address: int) -> None:
-        base_address, dsp, _ = self._get_data(address)
-        self.frames[base_address][dsp] = byte
-        self._frame[base_address][dsp] = byte
+        page, dsp, _ = self._get_data(address)
+        self._get_page_for_update(page)[dsp] = byte
+        self._set_updated(page, dsp, dsp + 1)
 
     def set_value(self, value: int, address: int, length: int = 4):
-        base_address, start, end = self._get_data(address, length)
-        for index, byte in enumerate(DataType('F', input=str(value)).to_bytes(end - start)):
-            self.frames[base_address][index + start] = byte
-            self._frame[base_address][index + start] = byte
+        self.set_bytes(DataType('F', input=str(value)).to_bytes(length), address, length)
+
+    def move_bytes(self, source: int, target: int, length: int) -> bytearray:
+        # Bytes are moved left to right one at a time. So a bulk move is only done if the target does not overlap
+        # the right side of the source and both fields are within their pages.
+        if self.is_within_page(source, length) and self.is_within_page(target, length) \
+                and not source < target < source + length:
+            byte_array = self.get_bytes(source, length)
+            self.set_bytes(byte_array, target, length)
+            return byte_array
+        byte_array = bytearray()
+        for index in range(length):
+            byte = self.get_byte(source + index)
+            self.set_byte(byte, target + index)
+            byte_array.append(byte)
+        return byte_array
+
+    def xor_bytes(self, source: int, target: int, length: int) -> bytearray:
+        if self.is_within_page(source, length) and self.is_within_page(target, length) \
+                and (source == target or source + length <= target or target + length <= source):
+            value = self.get_unsigned_value(source, length) ^ self.get_unsigned_value(target, length)
+            byte_array = bytearray(value.to_bytes(length, "big"))
+            self.set_bytes(byte_array, target, length)
+            return byte_array
+        byte_array = bytearray()
+        for index in range(length):
+            byte = self.get_byte(source + index) ^ self.get_byte(target + index)
+            self.set_byte(byte, target + index)
+            byte_array.append(byte)
+        return byte_array
 
     def is_updated(self, address: int, length: Optional[int] = None) -> bool:
         # Will return True only if all requested bytes are updated
-        base_address, start, end = self._get_data(address, length)
-        return self.frames[base_address][start: end] == self._frame[base_address][start: end]
+        page, start, end = self._get_data(address, length)
+        mask = ((1 << (end - start)) - 1) << start
+        return self.updated[page] & mask == mask
 
     def all_bits_on(self, address: int, bits: int) -> bool:
         # Will return True only if all requested bits are ON
-        base_address, dsp, _ = self._get_data(address)
-        return self.frames[base_address][dsp] & bits == bits
+        page, dsp, _ = self._get_data(address)
+        return self.pages[page][dsp] & bits == bits
 
     def all_bits_off(self, address: int, bits: int) -> bool:
         # Will return True only if all requested bits are OFF
-        base_address, dsp, _ = self._get_data(address)
-        return self.frames[base_address][dsp] & bits == 0
+        page, dsp, _ = self._get_data(address)
+        return self.pages[page][dsp] & bits == 0
 
     def or_bit(self, address: int, bit: int) -> None:
-        base_address, dsp, _ = self._get_data(address)
-        self.frames[base_address][dsp] |= bit
-        self._frame[base_address][dsp] |= bit
+        page, dsp, _ = self._get_data(address)
+        self._get_page_for_update(page)[dsp] |= bit
+        self._set_updated_bits(page, dsp, bit)
 
     def and_bit(self, address: int, bit: int) -> None:
-        base_address, dsp, _ = self._get_data(address)
-        self.frames[base_address][dsp] &= bit
-        self._frame[base_address][dsp] &= bit
+        page, dsp, _ = self._get_data(address)
+        self._get_page_for_update(page)[dsp] &= bit
+        self._set_updated_bits(page, dsp, ~bit & config.ONES)
 
     def xor_bit(self, address: int, bit: int) -> None:
-        base_address, dsp, _ = self._get_data(address)
-        self.frames[base_address][dsp] ^= bit
-        self._frame[base_address][dsp] ^= bit
+        # Flipped bits are not marked as updated
+        page, dsp, _ = self._get_data(address)
+        self._get_page_for_update(page)[dsp] ^= bit
 
     def is_updated_bit(self, address: int, bit: int) -> bool:
         # Will return True only if all requested bits are updated
-        base_address, dsp, _ = self._get_data(address)
-        return self.frames[base_address][dsp] & bit == self._frame[base_address][dsp] & bit
+        page, dsp, _ = self._get_data(address)
+        if self.updated[page] >> dsp & 1:
+            return True
+        return self.updated_bits[page].get(dsp, 0) & bit == bit
 
     def init(self, address: int) -> None:
-        base_address = self.base_key(address)
-        try:
-            self.frames[base_address] = bytearray()
-            self._frame[base_address] = bytearray()
-        except KeyError:
-            raise BaseAddressError
+        self._init_page(self.page_number(address))
 
     def valid_address(self, address: int) -> int:
-        return address if self.base_key(address) in self.frames else self.allocate()
+        return address if self.page_number(address) in self.pages else self.allocate()
 
     def is_address_valid(self, address: int) -> bool:
-        return self.base_key(address) in self.frames
+        return self.page_number(address) in self.pages
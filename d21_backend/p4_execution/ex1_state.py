@@ -1,8 +1,10 @@
 from base64 import b64encode, b64decode
-from copy import deepcopy
+from copy import copy, deepcopy
 from datetime import datetime
 from itertools import groupby
-from typing import Callable, Optional, Tuple, Dict, List, Set
+from time import perf_counter_ns
+from types import MappingProxyType
+from typing import Callable, Optional, Tuple, Dict, List, Set, Mapping, Iterable, Union
 
 from d21_backend.config import config
 from d21_backend.p1_utils.data_type import DataType, Register
@@ -19,25 +21,37 @@ from d21_backend.p2_assembly.seg5_exec_macro import KeyValue
 from d21_backend.p2_assembly.seg6_segment import Segment, get_assembled_startup_seg
 from d21_backend.p2_assembly.seg9_collection import get_seg_collection
 from d21_backend.p3_db.flat_file import FlatFile
-from d21_backend.p3_db.pnr import Pnr
+from d21_backend.p3_db.pnr import Pnr, PnrStore
 from d21_backend.p3_db.stream import Stream
 from d21_backend.p3_db.test_data import TestData
 from d21_backend.p3_db.test_data_elements import Output, Core
 from d21_backend.p3_db.tpfdf import Tpfdf
 from d21_backend.p4_execution.debug import Debug
 from d21_backend.p4_execution.ex0_regs_store import Registers, Storage
-from d21_backend.p4_execution.profiler import SegmentProfiler
-from d21_backend.p4_execution.trace import TraceList, TraceData
+from d21_backend.p4_execution.parallel import run_variations_in_pool
+from d21_backend.p4_execution.profiler import SegmentProfiler, ProfilerSession
+from d21_backend.p4_execution.program import Program
+from d21_backend.p4_execution.stats import ExecutionStats
+from d21_backend.p4_execution.trace import TraceList, TraceData, NO_TRACE_DATA
 
 
 class State:
 
+    # Opcode dispatch table of unbound handlers. It is built once per class (see TpfServer) and never mutated.
+    _ex: Mapping[str, Callable] = MappingProxyType(dict())
+
     def __init__(self):
         self.seg: Optional[Segment] = None
+        self.programs: Dict[str, Program] = dict()
+        self.trace_page: Tuple[int, Optional[int]] = (0, config.TRACE_PAGE_SIZE)  # Cursor, limit of traces
+        self.reset()
+
+    def reset(self) -> None:
+        # Clear only the mutable machine state. Compiled programs and the dispatch table are reused across runs.
+        self.seg = None
         self.regs: Registers = Registers()
         self.vm: Storage = Storage()
         self.cc: int = 0
-        self._ex: Dict[str, Callable] = dict()
         self.detac_stack: Dict[str, List] = {level: list() for level in config.ECB_LEVELS}
         self.messages: List[str] = list()
         self.dumps: List[str] = list()
@@ -48,12 +62,13 @@ class State:
         self.errors: Set[str] = set()
         self.debug: Debug = Debug()
         self.trace_list: TraceList = TraceList()
-        self.trace_data: TraceData = TraceData()
+        self.trace_data: TraceData = NO_TRACE_DATA
         self.fields: dict = {"CE3ENTPGM": bytearray()}
         self.stop_segments: List[str] = list()
         self.instruction_counter: int = 0
+        self.stats: Optional[ExecutionStats] = None
         self.aaa_field_data: List[dict] = list()
-        self._ex: Dict[str, callable] = dict()
+        self.pnr_store: PnrStore = PnrStore()
 
     def __repr__(self) -> str:
         return f"State:{self.seg}:{self.regs}:{self.vm}"
@@ -128,28 +143,56 @@ class State:
         self.vm.set_bytes(time_bytes, u1tym, len(time_bytes))
 
     def init_run(self, seg_name) -> None:
-        self.__init__()
+        self.reset()
         self._init_seg(seg_name)
         self._init_ecb()
         self._init_globals()
         self._core_block(config.IMG, "D0")
-        Pnr.init_db()
+        self.pnr_store.init_db()
         Tpfdf.init_db()
         FlatFile.init_db()
 
-    def run(self, seg_name: str, test_data: TestData, profiler: SegmentProfiler = None) -> TestData:
+    def run(self, seg_name: str, test_data: TestData, profiler: Union[SegmentProfiler, ProfilerSession] = None,
+            workers: Optional[int] = None, stats: bool = False) -> TestData:
         if not get_seg_collection().is_seg_present(seg_name):
             raise SegmentNotFoundError
+        workers = config.VARIATION_WORKERS if workers is None else workers
+        if workers > 1 and profiler is None:
+            test_data_variants = list(test_data.yield_variation())
+        else:
+            test_data_variants = test_data.yield_variation()
+        if workers > 1 and profiler is None and len(test_data_variants) > 1:
+            # The state of this server is not updated. Each worker process runs a contiguous chunk of variations.
+            outputs = run_variations_in_pool(type(self), seg_name, test_data.startup_script, test_data_variants,
+                                             workers, config.VARIATION_START_METHOD, stats)
+        else:
+            outputs = self.run_variations(seg_name, test_data.startup_script, test_data_variants, profiler, stats)
+        output_test_data = deepcopy(test_data)
+        for index, output in enumerate(outputs):
+            output.result_id = index + 1
+        output_test_data.outputs = outputs
+        return output_test_data
+
+    def run_variations(self, seg_name: str, startup_script: str, test_data_variants: Iterable[TestData],
+                       profiler: Union[SegmentProfiler, ProfilerSession] = None, stats: bool = False) -> List[Output]:
         outputs = list()
-        startup_seg: Segment = get_assembled_startup_seg(test_data.startup_script)
+        startup_seg: Segment = get_assembled_startup_seg(startup_script)
         startup_error: str = startup_seg.error_line or startup_seg.error_constant
-        for test_data_variant in test_data.yield_variation():
-            self.init_run(seg_name)
-            self.init_debug(test_data_variant)
-            if test_data.startup_script and not startup_error:
-                self.seg = startup_seg
-                self._init_seg(startup_seg.seg_name)
-                node = self.run_seg()
+        image: Optional[StateImage] = None
+        for test_data_variant in test_data_variants:
+            if image is None:
+                # The initialization and the startup script do not depend on the variation. So they are run only once.
+                node = None
+                self.init_run(seg_name)
+                self.init_debug(test_data_variant)
+                if startup_script and not startup_error:
+                    self.seg = startup_seg
+                    self._init_seg(startup_seg.seg_name)
+                    node = self.run_seg()
+                image = StateImage(self, node)
+            else:
+                node = image.restore(self)
+            self.stats = ExecutionStats() if stats else None
             if not self.dumps:
                 self._init_seg(seg_name)
                 self.init_aaa_field_data(test_data_variant)
@@ -159,24 +202,46 @@ class State:
             # noinspection PyUnboundLocalVariable
             self._capture_output(test_data_variant.output, node)
             outputs.append(test_data_variant.output)
-        output_test_data = deepcopy(test_data)
-        for index, output in enumerate(outputs):
-            output.result_id = index + 1
-        output_test_data.outputs = outputs
-        return output_test_data
+        return outputs
 
-    def run_seg(self, profiler: SegmentProfiler = None) -> InstructionType:
+    def run_seg(self, profiler: Union[SegmentProfiler, ProfilerSession] = None) -> InstructionType:
         label = self.seg.root_label()
         node = self.seg.equ(Line.from_line(f"{label} EQU 0"))
         try:
             if not self.seg.nodes:
                 raise ExecutionError
-            node: InstructionType = self.seg.nodes[label]
+            program: Program = self.get_program()
+            index: int = program.labels[label]
+            node = program.nodes[index]
+            trace: bool = bool(self.trace_list.seg_list)
+            stats: Optional[ExecutionStats] = self.stats
             while self.instruction_counter < 2000:
-                label = self._ex_command(node, profiler)
+                handler = program.handlers[index]
+                if handler is None:
+                    raise NotImplementedExecutionError(node)
+                seg_name = program.seg_name
+                if trace:
+                    self.trace_data = TraceData() if seg_name in self.trace_list.seg_list else NO_TRACE_DATA
+                if stats is None:
+                    label = handler(self, node)
+                else:
+                    start = perf_counter_ns()
+                    label = handler(self, node)
+                    stats.hit(node, seg_name, perf_counter_ns() - start)
+                if trace:
+                    self.trace_list.hit(self.trace_data, node, seg_name)
+                if profiler:
+                    profiler.hit(node, label, seg_name)
                 if label is None:
                     break
-                node = self.seg.nodes[label]
+                if self.seg is not program.seg:  # ENTRC, BACKC etc. switch to another segment
+                    program = self.get_program()
+                    index = program.labels[label]
+                else:
+                    index = program.fall_down[index]
+                    if index == Program.NO_INDEX or label != node.fall_down:
+                        index = program.labels[label]
+                node = program.nodes[index]
                 self.instruction_counter += 1
             if label is not None:
                 self.dumps.append("000010")
@@ -191,15 +256,22 @@ class State:
             self.messages.append("MEMORY ERROR")
         return node
 
-    def _ex_command(self, node: InstructionType, profiler: SegmentProfiler = None) -> str:
+    def get_program(self) -> Program:
+        program = self.programs.get(self.seg.seg_name)
+        if program is None or not program.is_compiled_from(self.seg):
+            program = Program(self.seg, self._ex)
+            self.programs[self.seg.seg_name] = program
+        return program
+
+    def _ex_command(self, node: InstructionType, profiler: Union[SegmentProfiler, ProfilerSession] = None) -> str:
         seg_name = self.seg.seg_name
-        self.trace_data = TraceData()
+        self.trace_data = TraceData() if self.trace_list.seg_list else NO_TRACE_DATA
         if node.command not in self._ex:
             raise NotImplementedExecutionError(node)
-        label = self._ex[node.command](node)
+        label = self._ex[node.command](self, node)
         self.trace_list.hit(self.trace_data, node, seg_name)
         if profiler:
-            profiler.hit(node, label)
+            profiler.hit(node, label, seg_name)
         return label
 
     def set_number_cc(self, number: int) -> None:
@@ -215,10 +287,10 @@ class State:
 
     def init_aaa(self) -> None:
         getfc_node: KeyValue = self.seg.key_value(Line.from_line(" GETFC D1,ID=C'AA',BLOCK=YES"))
-        self._ex["GETFC"](getfc_node)
+        self._ex["GETFC"](self, getfc_node)
         self._set_core(self.aaa_field_data, config.AAA_MACRO_NAME, self.aaa_address)
         filnc_node: KeyValue = self.seg.key_value(Line.from_line(" FLINC D1"))
-        self._ex["FILNC"](filnc_node)
+        self._ex["FILNC"](self, filnc_node)
         return
 
     def init_aaa_field_data(self, test_data):
@@ -312,12 +384,12 @@ class State:
             pnr_locator = pnr.locator if pnr.locator else config.AAAPNR
             if pnr.text:
                 for pnr_text in pnr.text:
-                    Pnr.add_from_data(pnr_text, pnr.key, pnr_locator)
+                    self.pnr_store.add_from_data(pnr_text, pnr.key, pnr_locator)
             elif pnr.field_data_item:
                 pnr.field_data_item.sort(key=lambda item: item["item_number"])
                 for _, field_group in groupby(pnr.field_data_item, key=lambda item: item["item_number"]):
                     pnr_field_bytes: dict = self._field_data_to_bytearray(list(field_group))
-                    Pnr.add_from_byte_array(pnr_field_bytes, pnr.key, pnr_locator)
+                    self.pnr_store.add_from_byte_array(pnr_field_bytes, pnr.key, pnr_locator)
         for lrec in test_data.tpfdf:
             if lrec.macro_name not in get_macros():
                 raise TpfdfError
@@ -420,7 +492,11 @@ class State:
         output.last_node = str(last_node)
         if output.debug:
             output.debug = list()
-            output.traces = self.trace_list.get_traces()
+            output.traces = self.trace_list.get_traces(*self.trace_page)
+            output.trace_count = len(self.trace_list.trace_items)
+            output.traces_dropped = self.trace_list.dropped_count
+        if self.stats:
+            output.stats = self.stats.get_stats()
         for core in output.cores:
             macro_name = core.macro_name.upper()
             if macro_name in config.FIXED_MACROS:
@@ -442,8 +518,7 @@ class State:
         self._capture_output_pnr(output)
         return
 
-    @staticmethod
-    def _capture_output_pnr(output: Output) -> None:
+    def _capture_output_pnr(self, output: Output) -> None:
         for pnr_output in output.pnr_outputs:
             key = Pnr.get_attribute_by_name(pnr_output.key).key
             pnr_locator = config.AAAPNR if not pnr_output.locator else pnr_output.locator
@@ -455,7 +530,8 @@ class State:
                 pnr_output.field_data.append(field_byte)
                 field_byte["field_text"] = f"{field} #{item_number}"
                 field_byte["field"] = field
-                data = Pnr.get_pnr_data(pnr_locator=pnr_locator, key=key, item_number=item_number, packed=True)
+                data = self.pnr_store.get_pnr_data(pnr_locator=pnr_locator, key=key, item_number=item_number,
+                                                   packed=True)
                 pnr_data: bytearray = data[0]
                 if not pnr_data:
                     field_byte["data"] = str()
@@ -475,3 +551,34 @@ class State:
             except BaseAddressError:
                 field_byte["data"] = str()
         return
+
+
+class StateImage:
+    # Machine state after the common initialization and the startup script. Every variation starts from a copy of it.
+    # Storage is shared copy on write. The remaining state is small and is copied.
+    MACHINE_STATE = ("cc", "detac_stack", "messages", "dumps", "heap", "call_stack", "tpfdf_ref", "errors", "debug",
+                     "trace_list", "fields", "stop_segments", "instruction_counter", "aaa_field_data")
+
+    def __init__(self, state: State, node: Optional[InstructionType]):
+        self.node: Optional[InstructionType] = node
+        self.seg: Optional[Segment] = state.seg
+        self.regs: Registers = copy(state.regs)
+        self.vm: Storage = state.vm.snapshot()
+        self.loaded_seg: Dict[str, Tuple[Segment, int]] = dict(state.loaded_seg)
+        self.machine_state: dict = deepcopy({name: getattr(state, name) for name in self.MACHINE_STATE})
+        self.pnr_store: PnrStore = state.pnr_store.copy()
+        self.tpfdf_db: list = deepcopy(Tpfdf.DB)
+        self.flat_file_db: dict = deepcopy(FlatFile.DB)
+
+    def restore(self, state: State) -> Optional[InstructionType]:
+        state.seg = self.seg
+        state.regs = copy(self.regs)
+        state.vm = self.vm.snapshot()
+        state.loaded_seg = dict(self.loaded_seg)
+        for name, value in deepcopy(self.machine_state).items():
+            setattr(state, name, value)
+        state.trace_data = NO_TRACE_DATA
+        state.pnr_store = self.pnr_store.copy()
+        Tpfdf.DB = deepcopy(self.tpfdf_db)
+        FlatFile.DB = deepcopy(self.flat_file_db)
+        return self.node
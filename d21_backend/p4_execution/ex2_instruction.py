@@ -288,12 +288,8 @@ class MoveLogicControl(State):
     def move_character(self, node: FieldLenField) -> str:
         source_address = self.regs.get_address(node.field.base, node.field.dsp)
         target_address = self.regs.get_address(node.field_len.base, node.field_len.dsp)
-        byte_list: List[int] = list()
-        for index in range(node.field_len.length + 1):
-            byte = self.vm.get_byte(source_address + index)
-            self.vm.set_byte(byte, target_address + index)
-            byte_list.append(byte)
-        self.trace_data.set_byte_array1(bytearray(byte_list))
+        byte_array = self.vm.move_bytes(source_address, target_address, node.field_len.length + 1)
+        self.trace_data.set_byte_array1(byte_array)
         return node.fall_down
 
     def move_character_long(self, node: RegisterRegister) -> str:
@@ -722,12 +718,8 @@ class LogicalUsefulConversion(State):
     def xor_character(self, node: FieldLenField) -> str:
         source_address = self.regs.get_address(node.field.base, node.field.dsp)
         target_address = self.regs.get_address(node.field_len.base, node.field_len.dsp)
-        byte_list: List[int] = list()
-        for index in range(node.field_len.length + 1):
-            byte = self.vm.get_byte(source_address + index) ^ self.vm.get_byte(target_address + index)
-            self.vm.set_byte(byte, target_address + index)
-            byte_list.append(byte)
-        self.trace_data.set_byte_array1(bytearray(byte_list))
+        byte_array = self.vm.xor_bytes(source_address, target_address, node.field_len.length + 1)
+        self.trace_data.set_byte_array1(byte_array)
         self.set_zero_cc(self.vm.get_value(target_address, node.field_len.length + 1))
         return node.fall_down
 
@@ -1,5 +1,4 @@
 import random
-from copy import copy
 from typing import Optional
 
 from d21_backend.config import config
@@ -191,8 +190,7 @@ class RealTimeMacro(State):
 
 class UserDefinedMacro(State):
 
-    @staticmethod
-    def realtima(node: KeyValue) -> str:
+    def realtima(self, node: KeyValue) -> str:
         realtime_label = node.get_value("YES") if node.get_value("YES") else node.fall_down
         return realtime_label
 
@@ -212,7 +210,7 @@ class UserDefinedMacro(State):
         core_reference = self.get_ecb_address(f"D{to_level}", "CE1CR")
         aaa_copy = self.vm.allocate()
         self.vm.set_value(aaa_copy, core_reference)
-        aaa_bytes = copy(self.vm.frames[self.vm.base_key(self.aaa_address)])
+        aaa_bytes = self.vm.get_data_from_base_address(self.aaa_address)
         self.vm.set_bytes(aaa_bytes, aaa_copy, len(aaa_bytes))
         return node.fall_down
 
@@ -288,21 +286,18 @@ class UserDefinedMacro(State):
             return match_label if self.get_partition() in {"LA", "4M", "XL"} else not_match_label
         raise McpckExecutionError
 
-    @staticmethod
-    def nmsea(node: KeyValue) -> str:
+    def nmsea(self, node: KeyValue) -> str:
         # TODO Finish NMSEA when data on NM0ID or WGL1 is available
         error = node.get_value("ERROR")
         return error if error else node.fall_down
 
-    @staticmethod
-    def tkdna(node: KeyValue) -> str:
+    def tkdna(self, node: KeyValue) -> str:
         error = node.get_value("ERROR")
         if not error:
             raise NotImplementedExecutionError
         return error
 
-    @staticmethod
-    def toura(node: KeyValue) -> str:
+    def toura(self, node: KeyValue) -> str:
         inhibit = node.get_value("INHIBIT")
         if inhibit:
             return inhibit
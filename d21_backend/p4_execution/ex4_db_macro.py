@@ -1,4 +1,5 @@
 from copy import copy
+from operator import eq, ne, ge, le, gt, lt
 from typing import Optional, Tuple
 
 from d21_backend.p1_utils.data_type import Register, DataType
@@ -106,7 +107,7 @@ class UserDefinedDbMacro(State):
         if node.get_value("ACTION") == "VERIFY":
             not_found_label = node.get_value("NOTFOUND") if node.get_value("NOTFOUND") else node.fall_down
             found_label = node.get_value("FOUND") if node.get_value("FOUND") else node.fall_down
-            data, _ = Pnr.get_pnr_data(self._get_pnr_locator(), key, item_number=1)
+            data, _ = self.pnr_store.get_pnr_data(self._get_pnr_locator(), key, item_number=1)
             return not_found_label if data is None else found_label
 
         # Get the base of PD0WRK
@@ -151,9 +152,10 @@ class UserDefinedDbMacro(State):
         pnr_locator = self._get_pnr_locator()
         packed = node.get_value("FORMATOUT") == "PACKED"
         if key == "20":  # PNR Header
-            data, item_number = Pnr.get_pnr_data(pnr_locator, "20", 1, packed=True)
+            data, item_number = self.pnr_store.get_pnr_data(pnr_locator, "20", 1, packed=True)
         else:
-            data, item_number = Pnr.get_pnr_data(pnr_locator, key, item_number, packed=packed, starts_with=starts_with)
+            data, item_number = self.pnr_store.get_pnr_data(pnr_locator, key, item_number, packed=packed,
+                                                            starts_with=starts_with)
             self.vm.set_value(item_number, pd0_base + pd0_mc_cin.dsp, pd0_mc_cin.length)
             pd0_c_inum: LabelReference = self.seg.lookup("PD0_C_INUM")
             self.vm.set_value(item_number, pd0_base + pd0_c_inum.dsp, pd0_c_inum.length)
@@ -164,7 +166,7 @@ class UserDefinedDbMacro(State):
             if not_found is None:
                 raise PdredNotFoundError
             return not_found
-        elif item_number == Pnr.get_len(pnr_locator, key):
+        elif item_number == self.pnr_store.get_len(pnr_locator, key):
             last_item_bit: int = self.seg.evaluate("#PD0_RT_LST")
             pd0_rt_id1: LabelReference = self.seg.lookup("PD0_RT_ID1")
             self.vm.or_bit(pd0_base + pd0_rt_id1.dsp, last_item_bit)
@@ -245,7 +247,8 @@ class UserDefinedDbMacro(State):
         item_number = self._get_item_number(node) or item_number
 
         # Replace
-        Pnr.replace_pnr_data(data=data, pnr_locator=pnr_locator, key=key, item_number=item_number, packed=packed)
+        self.pnr_store.replace_pnr_data(data=data, pnr_locator=pnr_locator, key=key, item_number=item_number,
+                                        packed=packed)
         return node.fall_down
 
     def pdctl(self, node: KeyValue) -> str:
@@ -262,7 +265,8 @@ class UserDefinedDbMacro(State):
         self.vm.set_value(1, heap + pd0c_ctl_itm_cnt.dsp, pd0c_ctl_itm_cnt.length)
         # Init PDAT item as header
         pnr_locator: str = self._get_pnr_locator()
-        data: Tuple[bytearray, int] = Pnr.get_pnr_data(pnr_locator=pnr_locator, key="20", item_number=1, packed=True)
+        data: Tuple[bytearray, int] = self.pnr_store.get_pnr_data(pnr_locator=pnr_locator, key="20", item_number=1,
+                                                                  packed=True)
         data_length: int = len(data[0])
         pd0c_ctl_itm_lgth: LabelReference = self.seg.lookup("PD0C_CTL_ITM_LGTH")
         self.vm.set_value(data_length, heap + pd0c_ctl_itm_lgth.dsp, pd0c_ctl_itm_lgth.length)
@@ -354,8 +358,7 @@ class RealTimeDbMacro(State):
 
 
 class TpfdfMacro(State):
-    C = {"E": "==", "EQ": "==", "NE": "!=", "GE": ">=", "LE": "<=", "GT": ">", "LT": "<", "H": ">", "L": "<",
-         "NH": "<=", "NL": ">="}
+    C = {"E": eq, "EQ": eq, "NE": ne, "GE": ge, "LE": le, "GT": gt, "LT": lt, "H": gt, "L": lt, "NH": le, "NL": ge}
 
     def _base_sw00sr(self) -> None:
         self.regs.R3 = self.vm.valid_address(self.regs.R3)
@@ -380,7 +383,7 @@ class TpfdfMacro(State):
                 break
             df_field_name = node.get_sub_value(key_n, "R")
             condition = node.get_sub_value(key_n, "C")
-            sign = self.C[condition] if condition is not None else "=="
+            compare = self.C[condition] if condition is not None else eq
             field: FieldBaseDsp = node.get_sub_value(key_n, "S")
             if field is None:
                 # TODO For M, D, L types
@@ -388,7 +391,7 @@ class TpfdfMacro(State):
             base_address = self.regs.get_value(field.base)
             length = self.seg.lookup(df_field_name).length
             byte_array = self.vm.get_bytes(base_address + field.dsp, length)
-            other_keys[df_field_name] = (f"{sign} {byte_array}", length)
+            other_keys[df_field_name] = (compare, byte_array)
         return other_keys
 
     def _set_db_error(self, db_error: bool):
@@ -1,3 +1,6 @@
+from types import MappingProxyType
+from typing import Callable, Dict, Mapping
+
 from d21_backend.p2_assembly.seg3_ins_type import InstructionType
 from d21_backend.p4_execution.ex2_instruction import Instruction
 from d21_backend.p4_execution.ex3_executable_macro import ExecutableMacro
@@ -5,299 +8,304 @@ from d21_backend.p4_execution.ex4_db_macro import DbMacro
 
 
 class TpfServer(Instruction, ExecutableMacro, DbMacro):
-    def __init__(self):
-        super().__init__()
+
+    @classmethod
+    def _build_ex(cls) -> Mapping[str, Callable]:
+        ex: Dict[str, Callable] = dict()
 
         # S03 - Load & Store
-        self._ex["LR"] = self.load_register
-        self._ex["LPR"] = self.load_positive_register
-        self._ex["LNR"] = self.load_negative_register
-        self._ex["LTR"] = self.load_test_register
-        self._ex["LCR"] = self.load_complement_register
-        self._ex["L"] = self.load_fullword
-        self._ex["ST"] = self.store_fullword
-        self._ex["LA"] = self.load_address
-        self._ex["LARL"] = self.load_address
-        self._ex["LH"] = self.load_halfword
-        self._ex["LHI"] = self.load_halfword_immediate
-        self._ex["STH"] = self.store_halfword
-        self._ex["IC"] = self.insert_character
-        self._ex["ICM"] = self.insert_character_mask
-        self._ex["STC"] = self.store_character
-        self._ex["STCM"] = self.store_character_mask
-        self._ex["LM"] = self.load_multiple
-        self._ex["STM"] = self.store_multiple
+        ex["LR"] = cls.load_register
+        ex["LPR"] = cls.load_positive_register
+        ex["LNR"] = cls.load_negative_register
+        ex["LTR"] = cls.load_test_register
+        ex["LCR"] = cls.load_complement_register
+        ex["L"] = cls.load_fullword
+        ex["ST"] = cls.store_fullword
+        ex["LA"] = cls.load_address
+        ex["LARL"] = cls.load_address
+        ex["LH"] = cls.load_halfword
+        ex["LHI"] = cls.load_halfword_immediate
+        ex["STH"] = cls.store_halfword
+        ex["IC"] = cls.insert_character
+        ex["ICM"] = cls.insert_character_mask
+        ex["STC"] = cls.store_character
+        ex["STCM"] = cls.store_character_mask
+        ex["LM"] = cls.load_multiple
+        ex["STM"] = cls.store_multiple
 
         # S04 - Arithmetic & Shift Algebraic
-        self._ex["AR"] = self.add_register
-        self._ex["A"] = self.add_fullword
-        self._ex["AH"] = self.add_halfword
-        self._ex["AHI"] = self.add_halfword_immediate
-        self._ex["AFI"] = self.add_halfword_immediate
-        self._ex["SR"] = self.subtract_register
-        self._ex["S"] = self.subtract_fullword
-        self._ex["SH"] = self.subtract_halfword
-        self._ex["M"] = self.multiply_fullword
-        self._ex["MR"] = self.multiply_register
-        self._ex["MH"] = self.multiply_halfword
-        self._ex["MHI"] = self.multiply_halfword_immediate
-        self._ex["D"] = self.divide_fullword
-        self._ex["DR"] = self.divide_register
-        self._ex["SRDA"] = self.shift_right_double_algebraic
-        self._ex["SLDA"] = self.shift_left_double_algebraic
-        self._ex["SLA"] = self.shift_left_algebraic
-        self._ex["SRA"] = self.shift_right_algebraic
+        ex["AR"] = cls.add_register
+        ex["A"] = cls.add_fullword
+        ex["AH"] = cls.add_halfword
+        ex["AHI"] = cls.add_halfword_immediate
+        ex["AFI"] = cls.add_halfword_immediate
+        ex["SR"] = cls.subtract_register
+        ex["S"] = cls.subtract_fullword
+        ex["SH"] = cls.subtract_halfword
+        ex["M"] = cls.multiply_fullword
+        ex["MR"] = cls.multiply_register
+        ex["MH"] = cls.multiply_halfword
+        ex["MHI"] = cls.multiply_halfword_immediate
+        ex["D"] = cls.divide_fullword
+        ex["DR"] = cls.divide_register
+        ex["SRDA"] = cls.shift_right_double_algebraic
+        ex["SLDA"] = cls.shift_left_double_algebraic
+        ex["SLA"] = cls.shift_left_algebraic
+        ex["SRA"] = cls.shift_right_algebraic
 
         # S05 - Move Store & Logic Control
-        self._ex["MVC"] = self.move_character
-        self._ex["MVI"] = self.move_immediate
-        self._ex["MVCL"] = self.move_character_long
-        self._ex["MVN"] = self.move_numeric
-        self._ex["MVZ"] = self.move_zone
-        self._ex["MVO"] = self.move_with_offset
-        self._ex["BCT"] = self.branch_on_count
-        self._ex["JCT"] = self.branch_on_count
-        self._ex["BRCT"] = self.branch_on_count
-        self._ex["BCTR"] = self.branch_on_count_register
-        self._ex["BXLE"] = self.branch_on_index_low_or_equal
-        self._ex["BXH"] = self.branch_on_index_high
-        self._ex["BAS"] = self.branch_and_save
-        self._ex["BAL"] = self.branch_and_save
-        self._ex["JAS"] = self.branch_and_save
-        self._ex["BRAS"] = self.branch_and_save
-        self._ex["BASR"] = self.branch_and_save_register
-        self._ex["B"] = self.branch
-        self._ex["NOP"] = self.branch
-        self._ex["BZ"] = self.branch
-        self._ex["BNZ"] = self.branch
-        self._ex["BO"] = self.branch
-        self._ex["BNO"] = self.branch
-        self._ex["BE"] = self.branch
-        self._ex["BNE"] = self.branch
-        self._ex["BM"] = self.branch
-        self._ex["BNM"] = self.branch
-        self._ex["BP"] = self.branch
-        self._ex["BNP"] = self.branch
-        self._ex["BH"] = self.branch
-        self._ex["BNH"] = self.branch
-        self._ex["BL"] = self.branch
-        self._ex["BNL"] = self.branch
-        self._ex["BC"] = self.branch
-        self._ex["JC"] = self.branch
-        self._ex["BRC"] = self.branch
-        self._ex["J"] = self.branch
-        self._ex["JNOP"] = self.branch
-        self._ex["JZ"] = self.branch
-        self._ex["JNZ"] = self.branch
-        self._ex["JO"] = self.branch
-        self._ex["JNO"] = self.branch
-        self._ex["JE"] = self.branch
-        self._ex["JNE"] = self.branch
-        self._ex["JM"] = self.branch
-        self._ex["JNM"] = self.branch
-        self._ex["JP"] = self.branch
-        self._ex["JNP"] = self.branch
-        self._ex["JH"] = self.branch
-        self._ex["JNH"] = self.branch
-        self._ex["JL"] = self.branch
-        self._ex["JNL"] = self.branch
-        self._ex["BCR"] = self.branch_return
-        self._ex["BR"] = self.branch_return
-        self._ex["NOPR"] = self.branch_return
-        self._ex["BER"] = self.branch_return
-        self._ex["BNER"] = self.branch_return
-        self._ex["BHR"] = self.branch_return
-        self._ex["BNHR"] = self.branch_return
-        self._ex["BLR"] = self.branch_return
-        self._ex["BNLR"] = self.branch_return
-        self._ex["BZR"] = self.branch_return
-        self._ex["BNZR"] = self.branch_return
-        self._ex["BOR"] = self.branch_return
-        self._ex["BNOR"] = self.branch_return
-        self._ex["BPR"] = self.branch_return
-        self._ex["BNPR"] = self.branch_return
-        self._ex["BMR"] = self.branch_return
-        self._ex["BNMR"] = self.branch_return
+        ex["MVC"] = cls.move_character
+        ex["MVI"] = cls.move_immediate
+        ex["MVCL"] = cls.move_character_long
+        ex["MVN"] = cls.move_numeric
+        ex["MVZ"] = cls.move_zone
+        ex["MVO"] = cls.move_with_offset
+        ex["BCT"] = cls.branch_on_count
+        ex["JCT"] = cls.branch_on_count
+        ex["BRCT"] = cls.branch_on_count
+        ex["BCTR"] = cls.branch_on_count_register
+        ex["BXLE"] = cls.branch_on_index_low_or_equal
+        ex["BXH"] = cls.branch_on_index_high
+        ex["BAS"] = cls.branch_and_save
+        ex["BAL"] = cls.branch_and_save
+        ex["JAS"] = cls.branch_and_save
+        ex["BRAS"] = cls.branch_and_save
+        ex["BASR"] = cls.branch_and_save_register
+        ex["B"] = cls.branch
+        ex["NOP"] = cls.branch
+        ex["BZ"] = cls.branch
+        ex["BNZ"] = cls.branch
+        ex["BO"] = cls.branch
+        ex["BNO"] = cls.branch
+        ex["BE"] = cls.branch
+        ex["BNE"] = cls.branch
+        ex["BM"] = cls.branch
+        ex["BNM"] = cls.branch
+        ex["BP"] = cls.branch
+        ex["BNP"] = cls.branch
+        ex["BH"] = cls.branch
+        ex["BNH"] = cls.branch
+        ex["BL"] = cls.branch
+        ex["BNL"] = cls.branch
+        ex["BC"] = cls.branch
+        ex["JC"] = cls.branch
+        ex["BRC"] = cls.branch
+        ex["J"] = cls.branch
+        ex["JNOP"] = cls.branch
+        ex["JZ"] = cls.branch
+        ex["JNZ"] = cls.branch
+        ex["JO"] = cls.branch
+        ex["JNO"] = cls.branch
+        ex["JE"] = cls.branch
+        ex["JNE"] = cls.branch
+        ex["JM"] = cls.branch
+        ex["JNM"] = cls.branch
+        ex["JP"] = cls.branch
+        ex["JNP"] = cls.branch
+        ex["JH"] = cls.branch
+        ex["JNH"] = cls.branch
+        ex["JL"] = cls.branch
+        ex["JNL"] = cls.branch
+        ex["BCR"] = cls.branch_return
+        ex["BR"] = cls.branch_return
+        ex["NOPR"] = cls.branch_return
+        ex["BER"] = cls.branch_return
+        ex["BNER"] = cls.branch_return
+        ex["BHR"] = cls.branch_return
+        ex["BNHR"] = cls.branch_return
+        ex["BLR"] = cls.branch_return
+        ex["BNLR"] = cls.branch_return
+        ex["BZR"] = cls.branch_return
+        ex["BNZR"] = cls.branch_return
+        ex["BOR"] = cls.branch_return
+        ex["BNOR"] = cls.branch_return
+        ex["BPR"] = cls.branch_return
+        ex["BNPR"] = cls.branch_return
+        ex["BMR"] = cls.branch_return
+        ex["BNMR"] = cls.branch_return
 
         # S06 -  Compare & Logical
-        self._ex["CR"] = self.compare_register
-        self._ex["C"] = self.compare_fullword
-        self._ex["CL"] = self.compare_logical_fullword
-        self._ex["CH"] = self.compare_halfword
-        self._ex["CHI"] = self.compare_halfword_immediate
-        self._ex["CLR"] = self.compare_logical_register
-        self._ex["CLI"] = self.compare_logical_immediate
-        self._ex["CLC"] = self.compare_logical_character
-        self._ex["CLM"] = self.compare_logical_character_mask
-        self._ex["CLCL"] = self.compare_logical_character_long
-        self._ex["SLL"] = self.shift_left_logical
-        self._ex["SRL"] = self.shift_right_logical
-        self._ex["SLDL"] = self.shift_left_double_logical
-        self._ex["SRDL"] = self.shift_right_double_logical
-        self._ex["ALR"] = self.add_logical_register
-        self._ex["AL"] = self.add_logical_fullword
-        self._ex["SLR"] = self.subtract_logical_register
-        self._ex["SL"] = self.subtract_logical_fullword
+        ex["CR"] = cls.compare_register
+        ex["C"] = cls.compare_fullword
+        ex["CL"] = cls.compare_logical_fullword
+        ex["CH"] = cls.compare_halfword
+        ex["CHI"] = cls.compare_halfword_immediate
+        ex["CLR"] = cls.compare_logical_register
+        ex["CLI"] = cls.compare_logical_immediate
+        ex["CLC"] = cls.compare_logical_character
+        ex["CLM"] = cls.compare_logical_character_mask
+        ex["CLCL"] = cls.compare_logical_character_long
+        ex["SLL"] = cls.shift_left_logical
+        ex["SRL"] = cls.shift_right_logical
+        ex["SLDL"] = cls.shift_left_double_logical
+        ex["SRDL"] = cls.shift_right_double_logical
+        ex["ALR"] = cls.add_logical_register
+        ex["AL"] = cls.add_logical_fullword
+        ex["SLR"] = cls.subtract_logical_register
+        ex["SL"] = cls.subtract_logical_fullword
 
         # S07 - And/Or/Xor, TM, EX, Data Conversion
-        self._ex["OR"] = self.or_register
-        self._ex["NR"] = self.and_register
-        self._ex["XR"] = self.xor_register
-        self._ex["N"] = self.and_fullword
-        self._ex["O"] = self.or_fullword
-        self._ex["NC"] = self.and_character
-        self._ex["OC"] = self.or_character
-        self._ex["XC"] = self.xor_character
-        self._ex["NI"] = self.and_immediate
-        self._ex["OI"] = self.or_immediate
-        self._ex["XI"] = self.xor_immediate  # (Need to check the status of flipped bits via is_updated_bit)
-        self._ex["TM"] = self.test_mask
-        self._ex["EX"] = self.execute
-        self._ex["PACK"] = self.pack
-        self._ex["CVB"] = self.convert_binary
-        self._ex["CVD"] = self.convert_decimal
-        self._ex["UNPK"] = self.unpack
+        ex["OR"] = cls.or_register
+        ex["NR"] = cls.and_register
+        ex["XR"] = cls.xor_register
+        ex["N"] = cls.and_fullword
+        ex["O"] = cls.or_fullword
+        ex["NC"] = cls.and_character
+        ex["OC"] = cls.or_character
+        ex["XC"] = cls.xor_character
+        ex["NI"] = cls.and_immediate
+        ex["OI"] = cls.or_immediate
+        ex["XI"] = cls.xor_immediate  # (Need to check the status of flipped bits via is_updated_bit)
+        ex["TM"] = cls.test_mask
+        ex["EX"] = cls.execute
+        ex["PACK"] = cls.pack
+        ex["CVB"] = cls.convert_binary
+        ex["CVD"] = cls.convert_decimal
+        ex["UNPK"] = cls.unpack
 
         # S08 - Decimal Arithmetic & Complex
-        self._ex["ZAP"] = self.zap
-        self._ex["AP"] = self.ap
-        self._ex["SP"] = self.sp
-        self._ex["MP"] = self.mp
-        self._ex["DP"] = self.dp
-        self._ex["SRP"] = self.srp
-        self._ex["CP"] = self.cp
-        self._ex["TP"] = self.tp
-        self._ex["TR"] = self.tr
-        self._ex["TRT"] = self.trt
-        self._ex["STCK"] = self.stck
+        ex["ZAP"] = cls.zap
+        ex["AP"] = cls.ap
+        ex["SP"] = cls.sp
+        ex["MP"] = cls.mp
+        ex["DP"] = cls.dp
+        ex["SRP"] = cls.srp
+        ex["CP"] = cls.cp
+        ex["TP"] = cls.tp
+        ex["TR"] = cls.tr
+        ex["TRT"] = cls.trt
+        ex["STCK"] = cls.stck
         # ED, EDMK
 
         # S09 - All new z/TPF instruction
-        self._ex["LG"] = self.load_grande
-        self._ex["STG"] = self.store_grande
-        self._ex["XGR"] = self.xor_grande_register
-        self._ex["CLHHSI"] = self.compare_logical_halfword_immediate
-        self._ex["MVHHI"] = self.move_halfword_immediate
-        self._ex["LLC"] = self.load_logical_character
+        ex["LG"] = cls.load_grande
+        ex["STG"] = cls.store_grande
+        ex["XGR"] = cls.xor_grande_register
+        ex["CLHHSI"] = cls.compare_logical_halfword_immediate
+        ex["MVHHI"] = cls.move_halfword_immediate
+        ex["LLC"] = cls.load_logical_character
 
         # Realtime Macros
-        self._ex["GETCC"] = self.getcc
-        self._ex["LEVTA"] = self.levta
-        self._ex["MODEC"] = self.no_operation
-        self._ex["DETAC"] = self.detac
-        self._ex["ATTAC"] = self.attac
-        self._ex["RELCC"] = self.relcc
-        self._ex["RCUNC"] = self.relcc
-        self._ex["RELFC"] = self.no_operation
-        self._ex["RLCHA"] = self.no_operation
-        self._ex["CRUSA"] = self.crusa
-        self._ex["SENDA"] = self.senda
-        self._ex["SYSRA"] = self.sysra
-        self._ex["SERRC"] = self.serrc
-        self._ex["SNAPC"] = self.snapc
-        self._ex["ENTRC"] = self.entrc
-        self._ex["ENTNC"] = self.entnc
-        self._ex["ENTDC"] = self.entdc
-        self._ex["BACKC"] = self.backc
-        self._ex["ALASC"] = self.alasc
-        self._ex["PNAMC"] = self.pnamc
-        self._ex["FLIPC"] = self.flipc
-        self._ex["EOWNRC"] = self.no_operation
-        self._ex["CREMC"] = self.no_operation
-        self._ex["CREDC"] = self.no_operation
-        self._ex["CREEC"] = self.no_operation
-        self._ex["SWISC"] = self.no_operation
-        self._ex["POSTC"] = self.no_operation
-        self._ex["EVNTC"] = self.no_operation
-        self._ex["EVNQC"] = self.no_operation
-        self._ex["EVNWC"] = self.no_operation
-        self._ex["GLMOD"] = self.no_operation
-        self._ex["FILKW"] = self.no_operation
-        self._ex["KEYCC"] = self.no_operation
-        self._ex["KEYRC"] = self.no_operation
-        self._ex["GLBLC"] = self.no_operation
-        self._ex["DLAYC"] = self.no_operation
-        self._ex["DEFRC"] = self.no_operation
-        self._ex["REALTIMA"] = self.realtima
-        self._ex["MALOC"] = self.maloc
-        self._ex["CALOC"] = self.maloc
-        self._ex["FREEC"] = self.no_operation
-        self._ex["CINFC"] = self.cinfc
-        self._ex["WTOPC"] = self.no_operation
+        ex["GETCC"] = cls.getcc
+        ex["LEVTA"] = cls.levta
+        ex["MODEC"] = cls.no_operation
+        ex["DETAC"] = cls.detac
+        ex["ATTAC"] = cls.attac
+        ex["RELCC"] = cls.relcc
+        ex["RCUNC"] = cls.relcc
+        ex["RELFC"] = cls.no_operation
+        ex["RLCHA"] = cls.no_operation
+        ex["CRUSA"] = cls.crusa
+        ex["SENDA"] = cls.senda
+        ex["SYSRA"] = cls.sysra
+        ex["SERRC"] = cls.serrc
+        ex["SNAPC"] = cls.snapc
+        ex["ENTRC"] = cls.entrc
+        ex["ENTNC"] = cls.entnc
+        ex["ENTDC"] = cls.entdc
+        ex["BACKC"] = cls.backc
+        ex["ALASC"] = cls.alasc
+        ex["PNAMC"] = cls.pnamc
+        ex["FLIPC"] = cls.flipc
+        ex["EOWNRC"] = cls.no_operation
+        ex["CREMC"] = cls.no_operation
+        ex["CREDC"] = cls.no_operation
+        ex["CREEC"] = cls.no_operation
+        ex["SWISC"] = cls.no_operation
+        ex["POSTC"] = cls.no_operation
+        ex["EVNTC"] = cls.no_operation
+        ex["EVNQC"] = cls.no_operation
+        ex["EVNWC"] = cls.no_operation
+        ex["GLMOD"] = cls.no_operation
+        ex["FILKW"] = cls.no_operation
+        ex["KEYCC"] = cls.no_operation
+        ex["KEYRC"] = cls.no_operation
+        ex["GLBLC"] = cls.no_operation
+        ex["DLAYC"] = cls.no_operation
+        ex["DEFRC"] = cls.no_operation
+        ex["REALTIMA"] = cls.realtima
+        ex["MALOC"] = cls.maloc
+        ex["CALOC"] = cls.maloc
+        ex["FREEC"] = cls.no_operation
+        ex["CINFC"] = cls.cinfc
+        ex["WTOPC"] = cls.no_operation
 
         # SPM Macros
-        self._ex["#SPM"] = self.no_operation
-        self._ex["#PERF"] = self.no_operation
+        ex["#SPM"] = cls.no_operation
+        ex["#PERF"] = cls.no_operation
 
         # User Defined Executable Macros
-        self._ex["AAGET"] = self.aaget
-        self._ex["AACPY"] = self.aacpy
-        self._ex["AAINT"] = self.aaint
-        self._ex["CFCMA"] = self.heapa
-        self._ex["HEAPA"] = self.heapa
-        self._ex["EHEAPA"] = self.heapa
-        self._ex["MHINF"] = self.mhinf
-        self._ex["MCPCK"] = self.mcpck
-        self._ex["NMSEA"] = self.nmsea
-        self._ex["PRIMA"] = self.prima
-        self._ex["PNRCC"] = self.pnrcc
-        self._ex["AGSQR"] = self.no_operation
-        self._ex["TKDNA"] = self.tkdna
-        self._ex["TOURA"] = self.toura
-        self._ex["FLBKA"] = self.no_operation
-        self._ex["PNRUA"] = self.pnrua
-        self._ex["DATE"] = self.date_macro
+        ex["AAGET"] = cls.aaget
+        ex["AACPY"] = cls.aacpy
+        ex["AAINT"] = cls.aaint
+        ex["CFCMA"] = cls.heapa
+        ex["HEAPA"] = cls.heapa
+        ex["EHEAPA"] = cls.heapa
+        ex["MHINF"] = cls.mhinf
+        ex["MCPCK"] = cls.mcpck
+        ex["NMSEA"] = cls.nmsea
+        ex["PRIMA"] = cls.prima
+        ex["PNRCC"] = cls.pnrcc
+        ex["AGSQR"] = cls.no_operation
+        ex["TKDNA"] = cls.tkdna
+        ex["TOURA"] = cls.toura
+        ex["FLBKA"] = cls.no_operation
+        ex["PNRUA"] = cls.pnrua
+        ex["DATE"] = cls.date_macro
 
         # User Defined Executable Macros created for this tool
-        self._ex["PARS_DATE"] = self.pars_date
-        self._ex["ERROR_CHECK"] = self.error_check
-        self._ex["FACE"] = self.face
-        self._ex["UIO1_USER_EXIT"] = self.uio1_user_exit
-        self._ex["FMSG_USER_EXIT"] = self.fmsg_user_exit
-        self._ex["GENERATE_LOCATOR"] = self.generate_locator
+        ex["PARS_DATE"] = cls.pars_date
+        ex["ERROR_CHECK"] = cls.error_check
+        ex["FACE"] = cls.face
+        ex["UIO1_USER_EXIT"] = cls.uio1_user_exit
+        ex["FMSG_USER_EXIT"] = cls.fmsg_user_exit
+        ex["GENERATE_LOCATOR"] = cls.generate_locator
 
         # Realtime Db Macros - 'Not yet supported'
-        self._ex["FINWC"] = self.finwc
-        self._ex["FIWHC"] = self.finwc
+        ex["FINWC"] = cls.finwc
+        ex["FIWHC"] = cls.finwc
         # FINHC
-        self._ex["SONIC"] = self.sonic
-        self._ex["GETFC"] = self.getfc
-        self._ex["FILUC"] = self.filec
-        self._ex["FILEC"] = self.filec
-        self._ex["FILNC"] = self.filec
-        self._ex["WAITC"] = self.no_operation
-        self._ex["UNFRC"] = self.no_operation
+        ex["SONIC"] = cls.sonic
+        ex["GETFC"] = cls.getfc
+        ex["FILUC"] = cls.filec
+        ex["FILEC"] = cls.filec
+        ex["FILNC"] = cls.filec
+        ex["WAITC"] = cls.no_operation
+        ex["UNFRC"] = cls.no_operation
 
         # User defined Db Macros
-        self._ex["PDCRE"] = self.no_operation
-        self._ex["PDRED"] = self.pdred
-        self._ex["LOCAA"] = self.locaa
-        self._ex["PDCLS"] = self.pdcls
-        self._ex["PDMOD"] = self.pdmod
-        self._ex["PDADD"] = self.no_operation
-        self._ex["PDCTL"] = self.pdctl
-        self._ex["PNRJR"] = self.pdred
+        ex["PDCRE"] = cls.no_operation
+        ex["PDRED"] = cls.pdred
+        ex["LOCAA"] = cls.locaa
+        ex["PDCLS"] = cls.pdcls
+        ex["PDMOD"] = cls.pdmod
+        ex["PDADD"] = cls.no_operation
+        ex["PDCTL"] = cls.pdctl
+        ex["PNRJR"] = cls.pdred
         # PDDEL
 
         # TPFDF Macros
-        self._ex["DBOPN"] = self.dbopn
-        self._ex["DBRED"] = self.dbred
-        self._ex["DBCLS"] = self.dbcls
-        self._ex["DBIFB"] = self.dbifb
-        self._ex["DBADD"] = self.dbadd
-        self._ex["DBDEL"] = self.dbdel
-        self._ex["DBMOD"] = self.dbmod
+        ex["DBOPN"] = cls.dbopn
+        ex["DBRED"] = cls.dbred
+        ex["DBCLS"] = cls.dbcls
+        ex["DBIFB"] = cls.dbifb
+        ex["DBADD"] = cls.dbadd
+        ex["DBDEL"] = cls.dbdel
+        ex["DBMOD"] = cls.dbmod
         # DBREP
 
         # No operation
-        self._ex["EQU"] = self.no_operation
-        self._ex["DS"] = self.no_operation
-        self._ex["EXITC"] = self.no_operation
+        ex["EQU"] = cls.no_operation
+        ex["DS"] = cls.no_operation
+        ex["EXITC"] = cls.no_operation
+        return MappingProxyType(ex)
 
     @property
     def supported_commands(self) -> set:
         return set(self._ex)
 
-    @staticmethod
-    def no_operation(node: InstructionType) -> str:
+    def no_operation(self, node: InstructionType) -> str:
         return node.fall_down
+
+
+TpfServer._ex = TpfServer._build_ex()
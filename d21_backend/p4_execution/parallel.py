@@ -0,0 +1,107 @@
+import atexit
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
+from multiprocessing import get_context
+from threading import Lock
+from typing import List, Optional, Dict, Tuple, Callable
+
+from d21_backend.config import config
+from d21_backend.p1_utils.domain import get_domain
+from d21_backend.p2_assembly.mac2_data_macro import init_macros
+from d21_backend.p2_assembly.seg9_collection import init_seg_collection
+from d21_backend.p3_db.test_data import TestData
+from d21_backend.p3_db.test_data_elements import Output
+from d21_backend.p4_execution.profiler import ProfilerSession
+
+# Worker pools are kept for the life of the process. A worker initializes the macros and segments of its domain once and
+# keeps the assembled segments between runs. Every chunk is run on a new server. Pnr, Tpfdf and FlatFile DB are class
+# level and hence isolated per process.
+_server_class: Optional[type] = None
+_pools: Dict[Tuple[type, str, int, Optional[str]], ProcessPoolExecutor] = dict()
+_pools_lock: Lock = Lock()
+
+
+def init_worker(server_class: type, domain: str) -> None:
+    global _server_class
+    _server_class = server_class
+    config.DOMAIN = domain
+    init_macros()
+    init_seg_collection()
+
+
+def get_pool(server_class: type, workers: int, start_method: Optional[str] = None) -> ProcessPoolExecutor:
+    domain = get_domain()
+    key = (server_class, domain, workers, start_method)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ProcessPoolExecutor(max_workers=workers, mp_context=get_context(start_method),
+                                              initializer=init_worker, initargs=(server_class, domain))
+        return _pools[key]
+
+
+def shutdown_pools() -> None:
+    # The workers of the pools are stopped once the running chunks are completed. New pools are created on next use.
+    # It is called at exit and when the macros or segments are changed since the workers keep them.
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=False)
+    return
+
+
+atexit.register(shutdown_pools)
+
+
+def map_in_pool(server_class: type, workers: int, start_method: Optional[str], function: Callable, *iterables) -> list:
+    pool = get_pool(server_class, workers, start_method)
+    try:
+        return list(pool.map(function, *iterables))
+    except BrokenProcessPool:
+        # A worker has terminated abruptly. The pool is created again for the next run.
+        with _pools_lock:
+            for key, value in list(_pools.items()):
+                if value is pool:
+                    del _pools[key]
+        raise
+
+
+def run_variation_chunk(seg_name: str, startup_script: str, test_data_variants: List[TestData],
+                        stats: bool = False) -> List[Output]:
+    return _server_class().run_variations(seg_name, startup_script, test_data_variants, stats=stats)
+
+
+def split_in_chunks(items: list, count: int) -> List[list]:
+    # Contiguous chunks so that the outputs can be merged back in order. Empty chunks are dropped for fewer items.
+    size, remainder = divmod(len(items), count)
+    chunks = list()
+    start = 0
+    for index in range(count):
+        end = start + size + (1 if index < remainder else 0)
+        chunks.append(items[start:end])
+        start = end
+    return [chunk for chunk in chunks if chunk]
+
+
+def run_variations_in_pool(server_class: type, seg_name: str, startup_script: str,
+                           test_data_variants: List[TestData], workers: int,
+                           start_method: Optional[str] = None, stats: bool = False) -> List[Output]:
+    chunks = split_in_chunks(test_data_variants, workers)
+    results = map_in_pool(server_class, workers, start_method, run_variation_chunk, repeat(seg_name),
+                          repeat(startup_script), chunks, repeat(stats))
+    return [output for outputs in results for output in outputs]
+
+
+def run_profiler_chunk(seg_name: str, test_data_list: List[TestData]) -> Dict[str, Dict[Tuple[str, str], int]]:
+    # Every test data is run on a new server like it is done without a pool.
+    profiler = ProfilerSession(seg_name)
+    for test_data in test_data_list:
+        _server_class().run(test_data.seg_name, test_data, profiler)
+    return profiler.get_path_hits()
+
+
+def run_profiler_in_pool(server_class: type, seg_name: str, test_data_list: List[TestData], workers: int,
+                         start_method: Optional[str] = None) -> List[Dict[str, Dict[Tuple[str, str], int]]]:
+    chunks = split_in_chunks(test_data_list, workers)
+    return map_in_pool(server_class, workers, start_method, run_profiler_chunk, repeat(seg_name), chunks)
@@ -0,0 +1,103 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from time import perf_counter
+from typing import List, Optional
+
+from d21_backend.config import config
+from d21_backend.p1_utils.errors import AssemblyFileNotFoundError
+from d21_backend.p2_assembly.mac2_data_macro import get_macros, init_macros, create_symbol_table
+from d21_backend.p2_assembly.seg9_collection import get_seg_collection, init_seg_collection
+from d21_backend.p4_execution.ex5_execute import TpfServer
+
+# Assembles every segment and loads every data macro of a domain so that the macro and segment caches on disk are
+# warm. The symbol tables of all macros are also written to one file that new processes memory map instead of loading
+# the macros. Run it with: python -m d21_backend.p4_execution.prewarm --domain general --workers 4
+
+_supported_commands: set = set()
+
+
+class PrewarmResult:
+
+    def __init__(self, seg_name: str, file_type: str):
+        self.seg_name: str = seg_name
+        self.file_type: str = file_type
+        self.seconds: float = 0.0
+        self.loc: int = 0
+        self.unsupported_count: int = 0  # Instructions that are not supported by the execution
+        self.error: str = str()  # Assembly error
+
+    def __repr__(self):
+        return f"{self.seg_name}:{self.file_type}:{self.seconds:.3f}s:{self.loc}:U{self.unsupported_count}"
+
+
+def init_prewarm_worker(domain: str) -> None:
+    global _supported_commands
+    config.DOMAIN = domain
+    init_macros()
+    init_seg_collection()
+    _supported_commands = TpfServer().supported_commands
+
+
+def load_macro(macro_name: str) -> str:
+    get_macros()[macro_name].load()
+    return macro_name
+
+
+def assemble_segment(seg_name: str) -> PrewarmResult:
+    segment = get_seg_collection().get_seg(seg_name)
+    result = PrewarmResult(seg_name, segment.file_type)
+    start = perf_counter()
+    try:
+        segment.assemble()
+    except AssemblyFileNotFoundError as error:
+        result.error = str(error)
+    except Exception as error:  # An error in one segment (like a missing macro) does not stop the other segments
+        result.error = f"{type(error).__name__}: {error}"
+    result.seconds = perf_counter() - start
+    result.error = result.error or segment.error_line or segment.error_constant
+    result.loc = len(segment.nodes)
+    result.unsupported_count = sum(1 for node in segment.nodes.values() if node.command not in _supported_commands)
+    return result
+
+
+def prewarm_domain(domain: str, workers: int = config.PREWARM_WORKERS,
+                   start_method: Optional[str] = None) -> List[PrewarmResult]:
+    # Macros are loaded before the segments so that each segment only reads the macros from the cache.
+    init_prewarm_worker(domain)
+    macro_names = list(get_macros())
+    seg_names = sorted(get_seg_collection().segments)
+    if workers <= 1:
+        for macro_name in macro_names:
+            load_macro(macro_name)
+        create_symbol_table()
+        return [assemble_segment(seg_name) for seg_name in seg_names]
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context(start_method),
+                             initializer=init_prewarm_worker, initargs=(domain,)) as executor:
+        list(executor.map(load_macro, macro_names))
+        create_symbol_table()
+        return list(executor.map(assemble_segment, seg_names))
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Assemble all segments of a domain to warm the caches.")
+    parser.add_argument("--domain", nargs="+", default=[config.DOMAIN])
+    parser.add_argument("--workers", type=int, default=config.PREWARM_WORKERS)
+    parsed_args = parser.parse_args(args)
+    for domain in parsed_args.domain:
+        start = perf_counter()
+        results = prewarm_domain(domain, parsed_args.workers)
+        for result in results:
+            print(f"{result.seg_name:4} {result.file_type:3} {result.seconds:8.3f}s LOC {result.loc:6} "
+                  f"Unsupported {result.unsupported_count:4} {result.error}")
+        errors = [result for result in results if result.error]
+        unsupported = sum(result.unsupported_count for result in results)
+        print(f"{domain}: {len(results)} segments assembled in {perf_counter() - start:.3f}s with {len(errors)} "
+              f"assembly errors and {unsupported} unsupported instructions.")
+        for result in errors:
+            print(f"Assembly error in {result.seg_name}: {result.error}")
+    return
+
+
+if __name__ == "__main__":
+    main()
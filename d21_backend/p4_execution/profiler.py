@@ -1,10 +1,11 @@
-from typing import List
+from typing import List, Dict, Tuple, Optional
 
 from munch import Munch
 
 from d21_backend.config import config
 from d21_backend.p1_utils.errors import ProfilerError
 from d21_backend.p2_assembly.seg3_ins_type import InstructionType
+from d21_backend.p2_assembly.seg9_collection import get_seg_collection
 
 
 class InstructionPath:
@@ -42,40 +43,109 @@ def convert_instructions_to_instruction_paths(instructions: List[InstructionType
 
 
 class SegmentProfiler:
+    # Hits are counted in hit_counters by the position of the instruction path. The position is found from the label
+    # and the next label of the path. The counters are copied to the instruction paths when they are read.
 
     def __init__(self, instructions: List[InstructionType]):
         if len(instructions) == 0:
             raise ProfilerError
         self.instruction_paths: List[InstructionPath] = convert_instructions_to_instruction_paths(instructions)
         self.initial_label: str = instructions[0].label
+        self.hit_counters: List[int] = [0] * len(self.instruction_paths)
+        self.covered_instruction_paths: int = 0
+        self._positions: Dict[Tuple[str, str], int] = dict()
+        for position, instruction_path in enumerate(self.instruction_paths):
+            self._positions.setdefault((instruction_path.label, instruction_path.next_label), position)
 
     @property
     def total_instruction_paths(self) -> int:
         return len(self.instruction_paths)
 
-    @property
-    def covered_instruction_paths(self) -> int:
-        return sum(1 for instruction_path in self.instruction_paths if instruction_path.is_hit())
-
     @property
     def documentation_coverage(self) -> str:
         return f"{round(self.covered_instruction_paths * 100 / self.total_instruction_paths)}%"
 
-    def hit(self, instruction: InstructionType, default_next_label: str) -> None:
-        next_label: str = default_next_label if default_next_label else str()
-        instruction_path: InstructionPath = next((instruction_path for instruction_path in self.instruction_paths
-                                                  if instruction_path.is_equal(instruction.label, next_label)), None)
-        if instruction_path:
-            instruction_path.increment_hit_counter()
+    def _increment_hit_counter(self, label: str, next_label: str) -> None:
+        position = self._positions.get((label, next_label))
+        if position is None:
+            return
+        if self.hit_counters[position] == 0:
+            self.covered_instruction_paths += 1
+        self.hit_counters[position] += 1
+        return
+
+    def get_path_hits(self) -> Dict[Tuple[str, str], int]:
+        # The order of the instruction paths can be different in another process. So hits are keyed by the path.
+        return {(instruction_path.label, instruction_path.next_label): hit_counter
+                for instruction_path, hit_counter in zip(self.instruction_paths, self.hit_counters) if hit_counter}
+
+    def add_path_hits(self, path_hits: Dict[Tuple[str, str], int]) -> None:
+        for (label, next_label), hit_counter in path_hits.items():
+            position = self._positions.get((label, next_label))
+            if position is None:
+                continue
+            if self.hit_counters[position] == 0:
+                self.covered_instruction_paths += 1
+            self.hit_counters[position] += hit_counter
+        return
+
+    def hit(self, instruction: InstructionType, default_next_label: str, seg_name: Optional[str] = None) -> None:
+        # The paths are matched by label only. So seg_name is not used.
+        self._increment_hit_counter(instruction.label, default_next_label if default_next_label else str())
         if instruction.command in config.CALL_AND_RETURN:
-            instruction_path: InstructionPath = next((instruction_path for instruction_path in self.instruction_paths
-                                                      if instruction_path.is_equal(instruction.label, instruction.fall_down)), None)
-            if instruction_path:
-                instruction_path.increment_hit_counter()
+            self._increment_hit_counter(instruction.label, instruction.fall_down)
+        return
+
+    def _update_instruction_paths(self) -> None:
+        for instruction_path, hit_counter in zip(self.instruction_paths, self.hit_counters):
+            instruction_path.hit_counter = hit_counter
         return
 
     def get_all_instruction_paths(self) -> List[Munch]:
+        self._update_instruction_paths()
         return [Munch(instruction_path.__dict__) for instruction_path in self.instruction_paths]
 
     def get_missing_instruction_paths(self) -> List[Munch]:
+        self._update_instruction_paths()
         return [Munch(instruction_path.__dict__) for instruction_path in self.instruction_paths if not instruction_path.is_hit()]
+
+
+class ProfilerSession:
+    # Path coverage of the segment and of every segment that it calls with ENTRC, ENTNC or ENTDC. A segment is profiled
+    # from the first time one of its instructions is executed.
+
+    def __init__(self, seg_name: str):
+        self.seg_name: str = seg_name
+        self.profilers: Dict[str, Optional[SegmentProfiler]] = dict()
+        if not self.get_profiler(seg_name):
+            raise ProfilerError
+
+    @property
+    def profiler(self) -> SegmentProfiler:
+        return self.profilers[self.seg_name]
+
+    def get_profiler(self, seg_name: str) -> Optional[SegmentProfiler]:
+        if seg_name not in self.profilers:
+            segment = get_seg_collection().get_seg(seg_name)
+            if segment:
+                segment.assemble()
+            self.profilers[seg_name] = SegmentProfiler(segment.get_instructions()) \
+                if segment and segment.nodes else None
+        return self.profilers[seg_name]
+
+    def hit(self, instruction: InstructionType, default_next_label: str, seg_name: Optional[str] = None) -> None:
+        profiler = self.profilers.get(seg_name) or self.get_profiler(seg_name or self.seg_name)
+        if profiler:
+            profiler.hit(instruction, default_next_label)
+        return
+
+    def get_path_hits(self) -> Dict[str, Dict[Tuple[str, str], int]]:
+        return {seg_name: profiler.get_path_hits() for seg_name, profiler in self.profilers.items() if profiler}
+
+    def merge(self, path_hits: Dict[str, Dict[Tuple[str, str], int]]) -> None:
+        # Adds the hits of a session that was run in another process
+        for seg_name, seg_path_hits in path_hits.items():
+            profiler = self.get_profiler(seg_name)
+            if profiler:
+                profiler.add_path_hits(seg_path_hits)
+        return
@@ -0,0 +1,26 @@
+from typing import Callable, Dict, List, Mapping, Optional
+
+from d21_backend.p2_assembly.seg3_ins_type import InstructionType
+from d21_backend.p2_assembly.seg6_segment import Segment
+
+
+class Program:
+    # Index addressed form of the nodes of an assembled segment. Each instruction is a record of
+    # (handler, node, next index) stored in parallel lists so that run_seg can step through integers.
+    NO_INDEX = -1
+
+    def __init__(self, seg: Segment, ex: Mapping[str, Callable]):
+        self.seg: Segment = seg
+        self.seg_name: str = seg.seg_name
+        self.source: Dict[str, InstructionType] = seg.nodes
+        self.nodes: List[InstructionType] = list(seg.nodes.values())
+        self.labels: Dict[str, int] = {label: index for index, label in enumerate(seg.nodes)}
+        self.handlers: List[Optional[Callable]] = [ex.get(node.command) for node in self.nodes]
+        self.fall_down: List[int] = [self.labels.get(node.fall_down, self.NO_INDEX) for node in self.nodes]
+
+    def __repr__(self) -> str:
+        return f"Program:{self.seg_name}:{len(self.nodes)}"
+
+    def is_compiled_from(self, seg: Segment) -> bool:
+        return self.seg is seg and self.source is seg.nodes
+
@@ -0,0 +1,56 @@
+from typing import Dict, List, Set
+
+from d21_backend.p2_assembly.seg3_ins_type import InstructionType
+from d21_backend.p2_assembly.seg5_exec_macro import KeyValue
+
+
+class ExecutionStats:
+    # Number of executions and the time spent in the handler of every command (instruction or executable macro) and the
+    # number of instructions executed in every segment. It is only created when the stats are requested.
+
+    def __init__(self):
+        self.commands: Dict[str, List[int]] = dict()  # Command -> [count, nanoseconds]
+        self.macros: Set[str] = set()  # Commands that are executable macros like PDRED, DBRED, FINWC
+        self.segments: Dict[str, int] = dict()
+
+    def __repr__(self) -> str:
+        return f"ExecutionStats:{len(self.commands)}:{sum(self.segments.values())}"
+
+    def hit(self, node: InstructionType, seg_name: str, nanoseconds: int) -> None:
+        counters = self.commands.get(node.command)
+        if counters is None:
+            counters = self.commands[node.command] = [0, 0]
+            if isinstance(node, KeyValue):
+                self.macros.add(node.command)
+        counters[0] += 1
+        counters[1] += nanoseconds
+        self.segments[seg_name] = self.segments.get(seg_name, 0) + 1
+        return
+
+    def add_stats(self, stats: dict) -> None:
+        # Adds the stats of another run in the format of get_stats
+        for command_stats in stats.get("commands", list()):
+            counters = self.commands.setdefault(command_stats["command"], [0, 0])
+            counters[0] += command_stats["count"]
+            counters[1] += command_stats["nanoseconds"]
+            if command_stats["macro"]:
+                self.macros.add(command_stats["command"])
+        for seg_stats in stats.get("segments", list()):
+            self.segments[seg_stats["seg_name"]] = self.segments.get(seg_stats["seg_name"], 0) + \
+                seg_stats["instructions"]
+        return
+
+    def get_stats(self) -> dict:
+        # Commands that took the most time are first
+        commands = sorted(self.commands.items(), key=lambda item: (-item[1][1], item[0]))
+        nanoseconds = sum(counters[1] for counters in self.commands.values())
+        return {
+            "instructions": sum(self.segments.values()),
+            "nanoseconds": nanoseconds,
+            "commands": [{"command": command, "macro": command in self.macros, "count": count,
+                          "nanoseconds": command_nanoseconds,
+                          "percent": round(command_nanoseconds * 100 / nanoseconds, 2) if nanoseconds else 0}
+                         for command, (count, command_nanoseconds) in commands],
+            "segments": [{"seg_name": seg_name, "instructions": instructions}
+                         for seg_name, instructions in sorted(self.segments.items())],
+        }
@@ -1,52 +1,111 @@
+from collections import deque
 from copy import copy
-from typing import List
+from itertools import islice
+from typing import List, Optional, Tuple, Union, Deque, Iterator
 
 from d21_backend.config import config
 from d21_backend.p2_assembly.seg3_ins_type import InstructionType
 
+# A value is either the bytes or a tuple of the number and its length. A length of None is a signed fullword.
+TraceValue = Optional[Union[bytes, Tuple[int, Optional[int]]]]
+
 
 class TraceData:
+    # Values read by an instruction. They are kept as they are and are formatted only when the traces are read.
+    __slots__ = ("read1", "read2", "reg_pointer")
+
     def __init__(self):
-        self.read1: str = str()
-        self.read2: str = str()
-        self.reg_pointer: str = str()
+        self.read1: TraceValue = None
+        self.read2: TraceValue = None
+        self.reg_pointer: TraceValue = None
+
+    def set_signed_value1(self, value: int):
+        self.read1 = (value, None)
+
+    def set_signed_value2(self, value: int):
+        self.read2 = (value, None)
+
+    def set_unsigned_value1(self, value: int, length: int):
+        self.read1 = (value, length)
+
+    def set_unsigned_value2(self, value: int, length: int):
+        self.read2 = (value, length)
+
+    def set_reg_pointer(self, value: int):
+        self.reg_pointer = (value, None)
+
+    def set_byte_array1(self, byte_array: bytearray):
+        self.read1 = bytes(byte_array)
+
+    @staticmethod
+    def format_value(value: TraceValue) -> str:
+        if value is None:
+            return str()
+        if isinstance(value, bytes):
+            return value.hex().upper()
+        number, length = value
+        return f"{number & config.REG_MAX:08X}" if length is None else f"{number:0{length * 2}X}"
+
+
+class NoTraceData(TraceData):
+    # Used when no segment is debugged. Nothing is recorded.
+    __slots__ = ()
 
     def set_signed_value1(self, value: int):
-        self.read1 = f"{value & config.REG_MAX:08X}"
+        return
 
     def set_signed_value2(self, value: int):
-        self.read2 = f"{value & config.REG_MAX:08X}"
+        return
 
     def set_unsigned_value1(self, value: int, length: int):
-        self.read1 = f"{value:0{length * 2}X}"
+        return
 
     def set_unsigned_value2(self, value: int, length: int):
-        self.read2 = f"{value:0{length * 2}X}"
+        return
 
     def set_reg_pointer(self, value: int):
-        self.reg_pointer = f"{value & config.REG_MAX:08X}"
+        return
 
     def set_byte_array1(self, byte_array: bytearray):
-        self.read1 = byte_array.hex().upper()
+        return
 
 
-class TraceItem:
-    def __init__(self, trace_data: TraceData, node: InstructionType, seg_name: str):
-        self.data: TraceData = trace_data
-        self.instruction: str = str(node)[7:]
-        self.seg_name: str = seg_name
+NO_TRACE_DATA: NoTraceData = NoTraceData()
 
 
 class TraceList:
+    # Each trace is a tuple of (node, seg_name, read1, read2, reg_pointer) in a ring buffer of the last traces.
     def __init__(self):
-        self.trace_items: List[TraceItem] = list()
+        self.trace_items: Deque[tuple] = deque(maxlen=config.TRACE_BUFFER_SIZE)
         self.seg_list: List[str] = list()
+        self.hit_count: int = 0  # Traces of the run including the ones dropped from the buffer
 
-    def hit(self, trace_data, node: InstructionType, seg_name: str):
+    def __deepcopy__(self, memo: dict) -> "TraceList":
+        # The traces are immutable tuples. So the nodes of the segment are not copied.
+        trace_list = TraceList()
+        trace_list.trace_items = copy(self.trace_items)
+        trace_list.seg_list = list(self.seg_list)
+        trace_list.hit_count = self.hit_count
+        return trace_list
+
+    @property
+    def dropped_count(self) -> int:
+        # The earliest traces that are dropped when the buffer is full. The first trace in the buffer is the next one.
+        return self.hit_count - len(self.trace_items)
+
+    def hit(self, trace_data: TraceData, node: InstructionType, seg_name: str):
         if seg_name in self.seg_list:
-            self.trace_items.append(TraceItem(copy(trace_data), node, seg_name))
+            self.trace_items.append((node, seg_name, trace_data.read1, trace_data.read2, trace_data.reg_pointer))
+            self.hit_count += 1
         return
 
-    def get_traces(self) -> List[dict]:
-        return [{"seg_name": trace.seg_name, "instruction": trace.instruction, "read1": trace.data.read1,
-                 "read2": trace.data.read2, "reg_pointer": trace.data.reg_pointer} for trace in self.trace_items]
+    def iter_traces(self, cursor: int = 0, limit: Optional[int] = None) -> Iterator[dict]:
+        # Traces from the position cursor. Only the traces that are read are formatted.
+        format_value = TraceData.format_value
+        trace_items = islice(self.trace_items, cursor, None if limit is None else cursor + limit)
+        return ({"seg_name": seg_name, "instruction": str(node)[7:], "read1": format_value(read1),
+                 "read2": format_value(read2), "reg_pointer": format_value(reg_pointer)}
+                for node, seg_name, read1, read2, reg_pointer in trace_items)
+
+    def get_traces(self, cursor: int = 0, limit: Optional[int] = None) -> List[dict]:
+        return list(self.iter_traces(cursor, limit))
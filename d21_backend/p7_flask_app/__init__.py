@@ -22,7 +22,8 @@ def make_shell_context():
     from d21_backend.p1_utils import domain
     from d21_backend.p1_utils.file_line import File
     from d21_backend.p2_assembly.mac2_data_macro import init_macros
-    from d21_backend.p2_assembly.seg8_listing import create_listing_commands, write_tmp_output, LstCmd, create_lxp
+    from d21_backend.p2_assembly.seg8_listing import create_listing_commands, write_tmp_output, LstCmd, create_lxp, \
+        convert_lxp_folder
     from d21_backend.p2_assembly.seg9_collection import SegLst, get_seg_collection, init_seg_collection
     from d21_backend.p3_db.test_data import TestData
     from d21_backend.p3_db import template_crud
@@ -49,6 +50,8 @@ def make_shell_context():
         "LstCmd": LstCmd,
         "write_tmp_output": write_tmp_output,
         "create_lxp": create_lxp,
+        "convert_lxp_folder": convert_lxp_folder,
+        "convert_all_lxp": tpf.convert_all_lxp,
         "seg_collection": get_seg_collection(),
         "init_seg_collection": init_seg_collection,
         "init_macros": init_macros,
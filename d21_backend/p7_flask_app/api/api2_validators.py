@@ -1,7 +1,7 @@
 from typing import Tuple, List
 
 from d21_backend.config import config
-from d21_backend.p2_assembly.mac2_data_macro import indexed_macros, get_macros
+from d21_backend.p2_assembly.mac2_data_macro import get_label_macro_name, get_macros
 from d21_backend.p7_flask_app.api.api0_constants import ErrorMsg, Types, FIELD_DATA, FIELD, NAME, MACRO_NAME, TYPE, \
     VARIATION_NAME, NEW_VARIATION_NAME, VARIATION
 from d21_backend.p7_flask_app.api.api1_models import TestData
@@ -50,8 +50,11 @@ def get_macro_name(data_dict: dict) -> str:
     if validate_empty_list(data_dict, FIELD_DATA):
         return str()
     for field in data_dict[FIELD_DATA]:
-        if not validate_empty_str(field, FIELD) and field[FIELD].strip().upper() in indexed_macros:
-            return indexed_macros[field[FIELD].strip().upper()]
+        if validate_empty_str(field, FIELD):
+            continue
+        macro_name = get_label_macro_name(field[FIELD].strip().upper())
+        if macro_name:
+            return macro_name
     return str()
 
 
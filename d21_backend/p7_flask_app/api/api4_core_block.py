@@ -1,6 +1,6 @@
 from typing import List
 
-from d21_backend.p2_assembly.mac2_data_macro import indexed_macros, get_macros
+from d21_backend.p2_assembly.mac2_data_macro import get_label_macro_name, get_macros
 from d21_backend.p7_flask_app.api.api0_constants import Types, MACRO_NAME, VARIATION, FIELD_DATA, NAME, TYPE, FIELD, DATA, \
     VARIATION_NAME, SuccessMsg, ErrorMsg, LENGTH
 from d21_backend.p7_flask_app.api.api1_models import TestData
@@ -89,7 +89,7 @@ def validate_field_data_for_update(data_dict: dict, macro_name: str, db_fields:
         if FIELD in field_errors:
             continue
         label = field[FIELD].strip().upper()
-        field_macro_name = indexed_macros.get(label, None)
+        field_macro_name = get_label_macro_name(label)
         if label in field_set:
             field_errors[FIELD] = ErrorMsg.UNIQUE
         elif not macro_name:
@@ -119,7 +119,7 @@ def validate_field_data_for_delete(data_dict: dict, macro_name: str, db_fields:
         if FIELD in field_errors:
             continue
         label = field[FIELD].strip().upper()
-        field_macro_name = indexed_macros.get(label, None)
+        field_macro_name = get_label_macro_name(label)
         if label in field_set:
             field_errors[FIELD] = ErrorMsg.UNIQUE
         elif not macro_name:
@@ -148,7 +148,8 @@ def get_data_length(field: dict, element_type: str) -> dict:
         return {DATA: field[DATA]}
     if LENGTH in field:
         return {LENGTH: field[LENGTH]}
-    label_ref = get_macros()[indexed_macros[field[FIELD].strip().upper()]].lookup(field[FIELD].strip().upper())
+    label = field[FIELD].strip().upper()
+    label_ref = get_macros()[get_label_macro_name(label)].lookup(label)
     return {LENGTH: label_ref.length}
 
 
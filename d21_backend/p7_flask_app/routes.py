@@ -1,3 +1,5 @@
+import json
+from itertools import islice
 from typing import Dict, List, Optional, Union
 from urllib.parse import unquote
 
@@ -9,7 +11,7 @@ from d21_backend.config import config
 from d21_backend.p1_utils.domain import get_bucket
 from d21_backend.p2_assembly.mac0_generic import LabelReference
 from d21_backend.p2_assembly.mac2_data_macro import get_macros
-from d21_backend.p2_assembly.seg9_collection import get_seg_collection, SegLst, get_seg_lst_for_domain
+from d21_backend.p2_assembly.seg9_collection import get_seg_collection, SegLst, get_seg_lst_for_domain, reload_macros
 from d21_backend.p3_db.startup_script import test_data_create, test_data_update
 from d21_backend.p3_db.test_data import TestData
 from d21_backend.p3_db.test_data_elements import Tpfdf, FixedFile
@@ -17,6 +19,8 @@ from d21_backend.p3_db.test_data_variations import rename_variation, copy_variat
 from d21_backend.p3_db.test_results_crud import update_comment, create_test_result, get_test_results, delete_test_result, \
     get_test_result
 from d21_backend.p4_execution.ex5_execute import TpfServer
+from d21_backend.p4_execution.parallel import shutdown_pools
+from d21_backend.p4_execution.stats import ExecutionStats
 from d21_backend.p7_flask_app import tpf1_app
 from d21_backend.p7_flask_app.auth import token_auth, User
 from d21_backend.p7_flask_app.errors import error_response
@@ -82,7 +86,7 @@ def run_test_data(test_data_id: str, **kwargs) -> Response:
     if not get_seg_collection().is_seg_present(test_data.seg_name):
         return error_response(400, "Error in segment name")
     tpf_server = TpfServer()
-    output_test_data = tpf_server.run(test_data.seg_name, test_data)
+    output_test_data = tpf_server.run(test_data.seg_name, test_data, stats=request.args.get("stats") == "true")
     final_test_data = output_test_data.cascade_to_dict()
     # Indicate which type of test data variation is present
     final_test_data["test_data_variation"] = {"core": False, "pnr": False, "tpfdf": False, "file": False}
@@ -93,6 +97,58 @@ def run_test_data(test_data_id: str, **kwargs) -> Response:
     return jsonify(final_test_data)
 
 
+@tpf1_app.route("/test_data/<string:test_data_id>/run/stats")
+@token_auth.login_required
+@test_data_with_links_required
+def run_test_data_stats(test_data_id: str, **kwargs) -> Response:
+    # Runs the test data and returns only the execution stats of all variations combined.
+    test_data: TestData = kwargs[test_data_id]
+    if not get_seg_collection().is_seg_present(test_data.seg_name):
+        return error_response(400, "Error in segment name")
+    output_test_data = TpfServer().run(test_data.seg_name, test_data, stats=True)
+    stats = ExecutionStats()
+    for output in output_test_data.outputs:
+        stats.add_stats(output.stats)
+    return jsonify(stats.get_stats())
+
+
+@tpf1_app.route("/test_data/<string:test_data_id>/traces")
+@token_auth.login_required
+@test_data_with_links_required
+def get_traces(test_data_id: str, **kwargs) -> Response:
+    # Runs only the variation of the result and streams a page of its traces as NDJSON. The last line has the number of
+    # traces in the buffer, the number of earliest traces dropped from it and the cursor of the next page. The cursor is
+    # null after the last page.
+    test_data: TestData = kwargs[test_data_id]
+    if not get_seg_collection().is_seg_present(test_data.seg_name):
+        return error_response(400, "Error in segment name")
+    try:
+        result_id = int(request.args.get("result_id", 1))
+        cursor = int(request.args.get("cursor", 0))
+        limit = int(request.args.get("limit", config.TRACE_PAGE_SIZE))
+    except ValueError:
+        return error_response(400, "Error in trace page")
+    if result_id < 1 or cursor < 0 or limit < 1:
+        return error_response(400, "Error in trace page")
+    test_data_variant: Optional[TestData] = next(islice(test_data.yield_variation(), result_id - 1, None), None)
+    if test_data_variant is None:
+        return error_response(400, "Error in result id")
+    tpf_server = TpfServer()
+    tpf_server.trace_page = (cursor, 0)  # The traces are formatted from the trace list while they are streamed
+    output = tpf_server.run_variations(test_data.seg_name, test_data.startup_script, [test_data_variant])[0]
+    trace_list = tpf_server.trace_list
+    limit = min(limit, config.TRACE_BUFFER_SIZE)
+    next_cursor = cursor + limit
+
+    def generate_traces():
+        for index, trace in enumerate(trace_list.iter_traces(cursor, limit)):
+            yield json.dumps({"cursor": cursor + index, **trace}) + "\n"
+        yield json.dumps({"trace_count": output.trace_count, "traces_dropped": output.traces_dropped,
+                          "next_cursor": next_cursor if next_cursor < output.trace_count else None}) + "\n"
+
+    return Response(generate_traces(), mimetype="application/x-ndjson")
+
+
 @tpf1_app.route("/test_data/<string:test_data_id>")
 @token_auth.login_required
 @test_data_with_links_required
@@ -491,6 +547,23 @@ def segment_list() -> Response:
     return jsonify(response_dict)
 
 
+@tpf1_app.route("/macros/reload", methods=["POST"])
+@token_auth.login_required
+def macro_reload() -> Response:
+    # Macros can be specified in the body. By default, all the macros whose file has changed are reloaded.
+    payload = request.get_json(silent=True) or dict()
+    if not isinstance(payload, dict):
+        return error_response(400, "Error in payload")
+    macro_names = payload.get("macros")
+    if macro_names is not None:
+        if not isinstance(macro_names, list) or not all(isinstance(macro_name, str) for macro_name in macro_names):
+            return error_response(400, "Macros should be a list of macro names")
+        macro_names = {macro_name.upper() for macro_name in macro_names}
+    macros, segments = reload_macros(macro_names)
+    shutdown_pools()  # The workers keep the macros and the assembled segments
+    return jsonify({"macros": sorted(macros), "segments": segments})
+
+
 def close_jsonify(response: dict, client: Optional[Client] = None):
     if client:
         client.close()
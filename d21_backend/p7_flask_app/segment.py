@@ -3,9 +3,10 @@ from typing import Optional
 from d21_backend.config import config
 from d21_backend.p1_utils.domain import get_domain
 from d21_backend.p2_assembly.seg6_segment import Segment
-from d21_backend.p2_assembly.seg8_listing import LstCmd
+from d21_backend.p2_assembly.seg8_listing import sync_lst_cmds
 from d21_backend.p2_assembly.seg9_collection import SegLst, get_seg_collection
 from d21_backend.p4_execution.ex5_execute import TpfServer
+from d21_backend.p4_execution.parallel import shutdown_pools
 
 
 def reset_seg_assembly(blob_name: str, file_type) -> Optional[SegLst]:
@@ -15,10 +16,11 @@ def reset_seg_assembly(blob_name: str, file_type) -> Optional[SegLst]:
     if not segment:
         return None
     if file_type == config.LST:
-        LstCmd.objects.filter_by(seg_name=seg_name).delete()
+        sync_lst_cmds(seg_name, segment.file_name, segment.blob_name)
     SegLst.objects.filter_by(seg_name=seg_name).delete()
     seg: SegLst = get_seg_lst(segment)  # Assemble the segment and create LstCmd
     seg.create()
+    shutdown_pools()  # The workers keep the assembled segments
     return seg
 
 
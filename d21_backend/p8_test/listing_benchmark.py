@@ -0,0 +1,18 @@
+from time import perf_counter
+
+from d21_backend.p2_assembly.seg8_listing import create_listing_commands
+from d21_backend.p8_test.test_local.test_seg_assembly import get_synthetic_listing
+
+
+def main() -> None:
+    # Ingestion of a listing is linear. Four times the statements should take about four times as long.
+    for stmt_count in (10000, 40000):
+        lines = get_synthetic_listing(stmt_count)
+        start = perf_counter()
+        lst_cmds = create_listing_commands("TS32", lines)
+        print(f"{len(lines)} lines, {len(lst_cmds)} listing commands in {perf_counter() - start:.3f} seconds")
+    return
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 from typing import Callable
 
+from flask import Response
 from munch import Munch
 
 from d21_backend.p7_flask_app import tpf1_app
@@ -8,14 +9,20 @@ from d21_backend.p7_flask_app.auth import User
 CLIENT = tpf1_app.test_client()
 
 TOKEN_CACHE: Munch = Munch()
+
+
+def get_token(email: str) -> str:
+    if email not in TOKEN_CACHE:
+        TOKEN_CACHE[email] = User.objects.filter_by(email=email).first().token
+    return TOKEN_CACHE[email]
+
+
 def authorized_request(func: Callable, url: str, email: str, **kwargs) -> Munch:
     if "api_other_auth" in kwargs:
         token = User.objects.filter_by(email="john.stack@smltd.com").first().token
         del kwargs["api_other_auth"]
     else:
-        if email not in TOKEN_CACHE:
-            TOKEN_CACHE[email] = User.objects.filter_by(email=email).first().token
-        token = TOKEN_CACHE[email]
+        token = get_token(email)
     kwargs['headers'] = {'Authorization': f"Bearer {token}"}
     response = func(url, **kwargs)
     if response.status_code == 401 and email in TOKEN_CACHE:
@@ -39,3 +46,12 @@ def api_post_using_general_domain_auth(url: str, **kwargs):
 
 def api_delete(url: str, **kwargs):
     return authorized_request(CLIENT.delete, url, email="nayan@crazyideas.co.in", **kwargs)
+
+
+def api_patch(url: str, **kwargs):
+    return authorized_request(CLIENT.patch, url, email="nayan@crazyideas.co.in", **kwargs)
+
+
+def api_get_response(url: str, **kwargs) -> Response:
+    # The response is not parsed. It is used for streamed responses and for checking the status code.
+    return CLIENT.get(url, headers={"Authorization": f"Bearer {get_token('nayan@crazyideas.co.in')}"}, **kwargs)
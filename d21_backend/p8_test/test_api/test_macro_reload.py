@@ -0,0 +1,22 @@
+from unittest import TestCase
+
+from munch import Munch
+
+from d21_backend.p8_test.test_api import api_post
+
+
+class MacroReload(TestCase):
+
+    def test_reload_changed_macros(self):
+        rsp: Munch = api_post("/macros/reload")
+        self.assertIsInstance(rsp.macros, list)
+        self.assertIsInstance(rsp.segments, list)
+
+    def test_reload_macros(self):
+        rsp: Munch = api_post("/macros/reload", json={"macros": ["wa0aa"]})
+        self.assertIn("WA0AA", rsp.macros)
+
+    def test_invalid_macros(self):
+        self.assertDictEqual(dict(), api_post("/macros/reload", json={"macros": [1]}))
+        self.assertDictEqual(dict(), api_post("/macros/reload", json={"macros": "WA0AA"}))
+        self.assertDictEqual(dict(), api_post("/macros/reload", json=["WA0AA"]))
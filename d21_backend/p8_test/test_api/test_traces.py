@@ -0,0 +1,54 @@
+import json
+from typing import List
+from unittest import TestCase
+
+from munch import Munch
+
+from d21_backend.p3_db.test_data import TestData
+from d21_backend.p8_test.test_api import api_post, api_patch, api_get_response
+
+
+class Traces(TestCase):
+    NAME = "Trace test data 58213"
+
+    def setUp(self) -> None:
+        body = {"name": self.NAME, "seg_name": "TS14", "stop_segments": "", "startup_script": ""}
+        rsp: Munch = api_post("/test_data", json=body)
+        self.assertEqual(False, rsp.error, rsp.error_fields)
+        self.test_data_id: str = rsp.id
+        rsp = api_patch(f"/test_data/{self.test_data_id}/output/debug", json={"traces": ["TS14"]})
+        self.assertListEqual(["TS14"], rsp.outputs[0].debug)
+
+    def tearDown(self) -> None:
+        TestData.objects.filter_by(name=self.NAME).delete()
+
+    def get_trace_lines(self, query_string: dict) -> List[dict]:
+        response = api_get_response(f"/test_data/{self.test_data_id}/traces", query_string=query_string)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual("application/x-ndjson", response.mimetype)
+        return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    def test_invalid_page(self):
+        for query_string in ({"result_id": 0}, {"result_id": 2}, {"result_id": "A"}, {"cursor": -1}, {"limit": 0},
+                             {"limit": "A"}):
+            response = api_get_response(f"/test_data/{self.test_data_id}/traces", query_string=query_string)
+            self.assertEqual(400, response.status_code, query_string)
+
+    def test_pages(self):
+        traces = self.get_trace_lines(dict())
+        last_line = traces.pop()
+        self.assertIsNone(last_line["next_cursor"])
+        self.assertEqual(0, last_line["traces_dropped"])
+        self.assertEqual(len(traces), last_line["trace_count"])
+        self.assertGreater(len(traces), 2)
+        self.assertListEqual(list(range(len(traces))), [trace["cursor"] for trace in traces])
+        self.assertSetEqual({"TS14"}, {trace["seg_name"] for trace in traces})
+        page_traces = list()
+        cursor = 0
+        while cursor is not None:
+            lines = self.get_trace_lines({"cursor": cursor, "limit": 2})
+            last_line = lines.pop()
+            self.assertLessEqual(len(lines), 2)
+            page_traces.extend(lines)
+            cursor = last_line["next_cursor"]
+        self.assertListEqual(traces, page_traces)
@@ -25,6 +25,17 @@ class Variation(NameGeneral):
         self.assertEqual(f"{3:02X}", test_data.get_field("WA0PTI", pnr_variation=2))
         self.assertEqual(f"{3:02X}", test_data.get_field("WA0PTI", pnr_variation=3))
 
+    def test_multiple_name_in_pool(self):
+        self.test_data.add_pnr_element(["2ZAVERI", "6SHAH"], "name", variation=0)
+        self.test_data.add_pnr_element(["C/21TOURS", "2ZAVERI", "6SHAH"], "name", variation=1)
+        self.test_data.add_pnr_element(["2ZAVERI", "6SHAH", "I/3ZAVERI"], "name", variation=2)
+        test_data = self.tpf_server.run("ETA5", self.test_data, workers=2)
+        self.assertListEqual([1, 2, 3], [output.result_id for output in test_data.outputs])
+        self.assertListEqual([0, 1, 2], [output.variation["pnr"] for output in test_data.outputs])
+        self.assertEqual("F0F0", test_data.get_field("WA0EXT", pnr_variation=0))
+        self.assertEqual("F1F3", test_data.get_field("WA0EXT", pnr_variation=1))
+        self.assertEqual(f"{11:02X}", test_data.get_field("WA0PTY", pnr_variation=2))
+
     def test_WA0PN2_group(self):
         self.test_data.add_pnr_element(["C/99W/TOURS", "3SHAH"], "name", variation=0)
         self.test_data.add_pnr_element(["C/999W/TOURS", "3SHAH"], "name", variation=1)
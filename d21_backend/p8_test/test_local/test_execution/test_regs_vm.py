@@ -1,5 +1,6 @@
 import unittest
 
+from d21_backend.config import config
 from d21_backend.p1_utils.data_type import Register
 from d21_backend.p1_utils.errors import RegisterInvalidError, MaskError
 from d21_backend.p4_execution.ex0_regs_store import Registers, Storage
@@ -71,18 +72,19 @@ class StorageTest(unittest.TestCase):
         self.assertEqual(0x00011000, self.storage.nab)
         self.assertEqual('12345000', self.storage.base_key(0x12345678))
         self.assertEqual(0x678, self.storage.dsp(0x12345678))
-        # 2. Check extend frames and _frame
+        # 2. Check extend frames
         block = self.storage.allocate()
         r1 = Register('R1')
         self.regs.set_value(block, r1)
-        base_r1 = self.storage.base_key(block)
+        page_r1 = self.storage.page_number(block)
         self.assertEqual(bytearray([0x00]), self.storage.get_bytes(self.regs.get_value(r1)))
         self.assertEqual(bytearray([0x00] * 2), self.storage.get_bytes(self.regs.get_address(r1, 30), 2))
-        self.assertEqual(32, len(self.storage.frames[base_r1]))
-        self.assertEqual(bytearray([0xFF] * 32), self.storage._frame[base_r1])
+        self.assertEqual(32, self.storage.lengths[page_r1])
+        self.assertEqual(bytearray([0x00] * 32), self.storage.get_data_from_base_address(block))
+        self.assertFalse(self.storage.is_updated(block, 32))
         # 3. Check get & set of bytes & value
         self.regs.set_value(self.storage.allocate(), 'R2')
-        base_r2 = self.storage.base_key(self.regs.get_value('R2'))
+        page_r2 = self.storage.page_number(self.regs.get_value('R2'))
         self.storage.set_bytes(bytearray([0xD5, 0xE9]), self.regs.R2 + 0x012, 2)
         self.assertEqual(bytearray([0x00, 0x00, 0xD5, 0xE9]), self.storage.get_bytes(self.regs.R2 + 0x010, 4))
         self.assertEqual(bytearray([0xE9]), self.storage.get_bytes(self.regs.R2 + 0x013))
@@ -108,8 +110,8 @@ class StorageTest(unittest.TestCase):
         self.assertTrue(self.storage.all_bits_off(byte, 0x40))
         self.storage.and_bit(byte, 0xFF - 0x80)
         self.assertFalse(self.storage.all_bits_on(byte, 0x80))
-        self.assertEqual(0x00, self.storage.frames[base_r2][5])
-        self.assertEqual(0x7F, self.storage._frame[base_r2][5])
+        self.assertEqual(0x00, self.storage.pages[page_r2][5])
+        self.assertEqual(0x80, self.storage.updated_bits[page_r2][5])
         # Just updating a bit out of a byte will still indicate that the byte is NOT updated.
         self.assertFalse(self.storage.is_updated(byte))
         self.assertTrue(self.storage.is_updated_bit(byte, 0x80))
@@ -133,3 +135,39 @@ class StorageTest(unittest.TestCase):
         self.assertEqual(0x3E, self.storage.get_byte(byte))
         self.storage.and_bit(byte, 0xFF - 0x18)
         self.assertEqual(0x26, self.storage.get_byte(byte))
+        # 7. Check bits that are updated one by one
+        byte = self.regs.R2 + 7
+        self.storage.or_bit(byte, 0xF0)
+        self.storage.and_bit(byte, 0xF0)
+        self.assertTrue(self.storage.is_updated(byte))
+        self.assertNotIn(7, self.storage.updated_bits[page_r2])
+        self.storage.xor_bit(byte + 1, 0xFF)
+        self.assertFalse(self.storage.is_updated_bit(byte + 1, 0x01))
+
+    def test_storage_move(self):
+        address = self.storage.allocate()
+        self.storage.set_bytes(bytearray([0xC1, 0xC2, 0xC3, 0xC4]), address, 4)
+        # Overlapping move propagates the first byte
+        self.assertEqual(bytearray([0xC1] * 4), self.storage.move_bytes(address, address + 1, 4))
+        self.assertEqual(bytearray([0xC1] * 5), self.storage.get_bytes(address, 5))
+        # Move across the page boundary
+        self.storage.allocate()
+        self.storage.move_bytes(address, address + config.F4K - 2, 4)
+        self.assertEqual(bytearray([0xC1] * 2), self.storage.get_bytes(address + config.F4K - 2, 2))
+        self.assertEqual(2, self.storage.lengths[self.storage.page_number(address + config.F4K)])
+        self.assertTrue(self.storage.is_updated(address + config.F4K, 2))
+        # XC on itself clears the field
+        self.assertEqual(bytearray(5), self.storage.xor_bytes(address, address, 5))
+        self.assertTrue(self.storage.is_updated(address, 5))
+
+    def test_storage_snapshot(self):
+        address = self.storage.allocate()
+        self.storage.set_bytes(bytearray([0xC1, 0xC2]), address, 2)
+        snapshot = self.storage.snapshot()
+        snapshot.set_byte(0xC3, address)
+        snapshot.or_bit(address + 2, 0x80)
+        self.assertEqual(bytearray([0xC3, 0xC2, 0x80]), snapshot.get_bytes(address, 3))
+        self.assertEqual(bytearray([0xC1, 0xC2, 0x00]), self.storage.get_bytes(address, 3))
+        self.assertFalse(self.storage.is_updated_bit(address + 2, 0x80))
+        self.storage.set_byte(0xC4, address + 1)
+        self.assertEqual(0xC2, snapshot.get_byte(address + 1))
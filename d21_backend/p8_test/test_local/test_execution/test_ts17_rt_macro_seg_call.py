@@ -26,6 +26,15 @@ class RealTimeMacro(unittest.TestCase):
         self.assertEqual(0, len(self.tpf_server.detac_stack['1']))
         self.assertEqual(20, test_data.output.regs['R5'])
 
+    def test_ts17_rerun(self):
+        self.tpf_server.run('TS17', self.test_data)
+        program = self.tpf_server.programs['TS17']
+        test_data = self.tpf_server.run('TS17', self.test_data)
+        self.assertListEqual(['021014', '19000'], test_data.output.dumps)
+        self.assertEqual(1, len(self.tpf_server.detac_stack['2']))
+        self.assertIs(program, self.tpf_server.programs['TS17'])
+        self.assertIs(TpfServer._ex, self.tpf_server._ex)
+
     def test_segment_call(self):
         # Flow is TS10 <-> TS01 -> TS02 -< TS10 => TS13
         test_data = self.tpf_server.run('TS10', self.test_data)
@@ -38,6 +47,17 @@ class RealTimeMacro(unittest.TestCase):
         # Check PNAMC
         self.assertEqual('E3E2F1F0', test_data.get_field('EBX000'))
 
+    def test_segment_call_program(self):
+        self.tpf_server.run('TS10', self.test_data)
+        for seg_name in ['TS10', 'TS01', 'TS02', 'TS13']:
+            program = self.tpf_server.programs[seg_name]
+            self.assertEqual(len(program.seg.nodes), len(program.nodes))
+            for label, node in program.seg.nodes.items():
+                index = program.labels[label]
+                self.assertIs(node, program.nodes[index])
+                if node.fall_down in program.seg.nodes:
+                    self.assertEqual(node.fall_down, program.nodes[program.fall_down[index]].label)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,5 +1,7 @@
 import unittest
 
+from d21_backend.config import config
+from d21_backend.p1_utils.errors import PnrLocatorNotFoundError
 from d21_backend.p4_execution.ex5_execute import TpfServer
 from d21_backend.p8_test.test_local import TestDataUTS
 
@@ -29,6 +31,17 @@ class PdredNames(unittest.TestCase):
         self.assertIn("MORE THAN 99 NAMES", test_data.output.messages)
         self.assertEqual(100, test_data.output.regs['R1'])
 
+    def test_pnr_store(self):
+        self.test_data.add_pnr_element(['C/21TOURS', '2ZAVERI'], 'name')
+        self.test_data.add_pnr_element(['SSRFQTUAA2812Y20OCTDFW  ORD  0510GLD*DGHWCL RR    '], 'hfax')
+        self.tpf_server.run('TS18', self.test_data)
+        pnr_store = self.tpf_server.pnr_store
+        self.assertEqual(2, pnr_store.get_len(config.AAAPNR, '50'))
+        self.assertEqual(1, pnr_store.get_len(config.AAAPNR, '84'))
+        pnr_store.replace_pnr_data(bytearray(b'\xF2'), config.AAAPNR, '50', 2, packed=True)
+        self.assertEqual((bytearray(b'\xF2'), 2), pnr_store.get_pnr_data(config.AAAPNR, '50', 2, packed=True))
+        self.assertRaises(PnrLocatorNotFoundError, pnr_store.get_len, 'ABCDEF', '50')
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,5 +1,7 @@
 import unittest
+from operator import eq, ne
 
+from d21_backend.p1_utils.data_type import DataType
 from d21_backend.p3_db.tpfdf import Tpfdf
 from d21_backend.p4_execution.ex5_execute import TpfServer
 from d21_backend.p8_test.test_local import TestDataUTS
@@ -38,6 +40,21 @@ class DbTest(unittest.TestCase):
         self.tpf_server.run("TS20", self.test_data)
         self.assertEqual(bytearray([0xC1, 0xC1, 0xC1]), Tpfdf.DB[0]["doc"][0]["data"][116:119])
 
+    def test_item_numbers(self):
+        Tpfdf.init_db()
+        for key, occ in [("40", "AA"), ("80", "AA"), ("40", "BB"), ("40", "AA")]:
+            Tpfdf.add({"TR1G_40_OCC": DataType("C", input=occ).to_bytes()}, key, "TR1GAA")
+        value = DataType("C", input="AA").to_bytes()
+        self.assertListEqual([1, 3, 4], Tpfdf.get_item_numbers("TR1GAA", "40", dict()))
+        self.assertListEqual([3, 4], Tpfdf.get_item_numbers("TR1GAA", "40", dict(), start=3))
+        self.assertListEqual([1, 4], Tpfdf.get_item_numbers("TR1GAA", "40", {"TR1G_40_OCC": (eq, value)}))
+        self.assertListEqual([3], Tpfdf.get_item_numbers("TR1GAA", "40", {"TR1G_40_OCC": (ne, value)}))
+        Tpfdf.delete_lrec("TR1GAA", [1])
+        self.assertListEqual([2, 3], Tpfdf.get_item_numbers("TR1GAA", "40", dict()))
+        self.assertListEqual([1], Tpfdf.get_item_numbers("TR1GAA", "80", dict()))
+        Tpfdf.add({"TR1G_40_OCC": value}, "80", "TR1GAA")
+        self.assertListEqual([1, 4], Tpfdf.get_item_numbers("TR1GAA", "80", {"TR1G_40_OCC": (eq, value)}))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,6 +1,13 @@
+import os
+import sys
 import unittest
+from tempfile import TemporaryDirectory
 
-from d21_backend.p2_assembly.mac2_data_macro import DataMacro, get_macros
+from d21_backend.p1_utils.errors import NotFoundInSymbolTableError
+from d21_backend.p1_utils.file_line import Line, File
+from d21_backend.p2_assembly.mac0_generic import get_expression
+from d21_backend.p2_assembly.mac2_data_macro import DataMacro, get_macros, get_label_macro_name, get_merged_labels, \
+    DataMacroCollection
 
 
 class MacroTest(unittest.TestCase):
@@ -13,6 +20,82 @@ class MacroTest(unittest.TestCase):
         self.assertNotIn("ETA5", macros)
         self.assertEqual(self.NUMBER_OF_FILES, len(macros), "Update number of files in MacroTest")
 
+    def test_lazy_load(self):
+        macro = get_macros()["WA0AA"]
+        cached_macro = DataMacro(macro.name, macro.file_name, macro.parent)
+        self.assertFalse(cached_macro.loaded)
+        self.assertEqual(macro.lookup("WA0AA").dsp, cached_macro.lookup("WA0AA").dsp)
+        self.assertTrue(cached_macro.loaded)
+        self.assertEqual(len(macro.all_labels), len(cached_macro.all_labels))
+        self.assertIs(macro.lookup("EBW000"), cached_macro.lookup("EBW000"))
+        self.assertEqual(macro.cache_filename, cached_macro.cache_filename)
+        self.assertNotEqual(macro.cache_filename, DataMacro(macro.name, macro.file_name).cache_filename)
+
+    def test_label_index(self):
+        self.assertEqual("EB0EB", get_label_macro_name("EBW000"))
+        self.assertEqual("WA0AA", get_label_macro_name("WA0AA"))
+        self.assertIsNone(get_label_macro_name("INVALID FIELD"))
+        self.assertIs(get_macros()["EB0EB"].lookup("EBW000"), DataMacro.get_label_reference("EBW000"))
+        self.assertIs(get_macros()["WI0BS"].lookup("WI0BS"), get_merged_labels(("PR001W", "WI0BS")).get("WI0BS"))
+
+    def test_default_layers(self):
+        collection = DataMacroCollection()
+        collection.shared = None
+        macro = collection.macros["WA0AA"]
+        default_macro = collection.macros["EB0EB"]
+        self.assertIs(default_macro.own_labels, macro.all_labels.maps[-len(default_macro.macro_names)])
+        self.assertEqual(len(macro.macro_names), len(macro.all_labels.maps))
+        self.assertNotIn("EBW000", macro.own_labels)
+        self.assertIs(default_macro.lookup("EBW000"), macro.lookup("EBW000"))
+        self.assertEqual(len(macro.all_labels), len(macro.own_labels) + len(macro.parent.all_labels))
+
+    def test_memory(self):
+        # Symbol tables hold many label references. They have slots and share the interned strings.
+        collection = DataMacroCollection()
+        macro = collection.macros["WA0AA"]
+        macro.load()
+        label, label_ref = next(iter(macro.own_labels.items()))
+        self.assertFalse(hasattr(label_ref, "__dict__"))
+        self.assertIs(sys.intern("WA0AA"), label_ref.name)
+        self.assertIs(label, label_ref.label)
+        self.assertTrue(all(key is value.label for key, value in macro.own_labels.items()))
+        line = next(Line.iter_from_file(File(macro.file_name).iter_lines()))
+        self.assertFalse(hasattr(line, "__dict__"))
+
+    def test_shared_symbol_table(self):
+        collection = DataMacroCollection()
+        with TemporaryDirectory() as folder:
+            filename = os.path.join(folder, "symbols.sym")
+            self.assertTrue(collection.write_symbol_table(filename))
+            shared_collection = DataMacroCollection()
+            self.assertTrue(shared_collection.attach_symbol_table(filename))
+        for macro_name, data_macro in collection.macros.items():
+            shared_macro = shared_collection.macros[macro_name]
+            self.assertListEqual([str(label_ref) for label_ref in data_macro.all_labels.values()],
+                                 [str(label_ref) for label_ref in shared_macro.all_labels.values()])
+            self.assertDictEqual(data_macro.indexed_data, shared_macro.indexed_data)
+            self.assertListEqual(list(data_macro.own_labels), list(shared_macro.own_labels))
+        shared_macros = shared_collection.macros
+        self.assertIs(shared_macros["EB0EB"].lookup("EBW000"), shared_macros["WA0AA"].lookup("EBW000"))
+        self.assertIs(shared_macros["EB0EB"].lookup("EBW000"), shared_collection.get_label_reference("EBW000"))
+        self.assertEqual("WA0AA", shared_collection.get_label_macro_name("WA0AA"))
+        self.assertIsNone(shared_collection.get_label_reference("INVALID FIELD"))
+        self.assertRaises(NotFoundInSymbolTableError, shared_macros["WA0AA"].lookup, "INVALID FIELD")
+        self.assertEqual(len(collection.macros["WA0AA"].all_labels), len(shared_macros["WA0AA"].all_labels))
+        self.assertFalse(DataMacroCollection().attach_symbol_table(filename))
+
+    def test_get_value(self):
+        macro = get_macros()["EB0EB"]
+        ebw000 = macro.lookup("EBW000").dsp
+        self.assertEqual(ebw000 + macro.lookup("EBW000").length, macro.get_value("EBW000+L'EBW000"))
+        self.assertEqual(int((ebw000 + 7) / 8 * 8), macro.get_value("(EBW000+7)/8*8"))
+        self.assertEqual(0xC1 - 3, macro.get_value("C'A'-R3"))
+        self.assertEqual(-2, macro.get_value("-2"))
+        self.assertTrue(get_expression("X'FF'+2*3").is_constant)
+        self.assertEqual(0x105, get_expression("X'FF'+2*3").evaluate(macro))
+        self.assertFalse(get_expression("EBW000+2").is_constant)
+        self.assertRaises(NotFoundInSymbolTableError, macro.get_value, "INVALID+2")
+
     def _common_checks(self, macro_name, accepted_errors_list=None):
         macros = get_macros()
         self.macro: DataMacro = macros[macro_name]
@@ -0,0 +1,95 @@
+import unittest
+
+from d21_backend.config import config
+from d21_backend.p2_assembly.seg9_collection import get_seg_collection
+from d21_backend.p3_db.profiler_methods import execute_profiler, extract_data_from_session
+from d21_backend.p4_execution.ex5_execute import TpfServer
+from d21_backend.p4_execution.parallel import get_pool, shutdown_pools
+from d21_backend.p4_execution.profiler import SegmentProfiler, ProfilerSession
+from d21_backend.p4_execution.stats import ExecutionStats
+from d21_backend.p8_test.test_local import TestDataUTS
+
+
+class ProfilerTest(unittest.TestCase):
+    SEG_NAME = "TS14"
+
+    def setUp(self) -> None:
+        self.test_data = TestDataUTS()
+        self.test_data.add_all_regs()
+        self.test_data.add_fields([("EBW001", 6), ("EBW008", 6), "EBW000"], "EB0EB")
+        segment = get_seg_collection().get_seg(self.SEG_NAME)
+        segment.assemble()
+        self.profiler = SegmentProfiler(segment.get_instructions())
+
+    def test_hit_counters(self):
+        TpfServer().run(self.SEG_NAME, self.test_data, self.profiler)
+        first_counters = list(self.profiler.hit_counters)
+        TpfServer().run(self.SEG_NAME, self.test_data, self.profiler)
+        self.assertListEqual([hit_counter * 2 for hit_counter in first_counters], self.profiler.hit_counters)
+        all_paths = self.profiler.get_all_instruction_paths()
+        missing_paths = self.profiler.get_missing_instruction_paths()
+        covered = sum(1 for instruction_path in all_paths if instruction_path.hit_counter > 0)
+        self.assertGreater(covered, 0)
+        self.assertEqual(covered, self.profiler.covered_instruction_paths)
+        self.assertEqual(self.profiler.total_instruction_paths - covered, len(missing_paths))
+        self.assertEqual(self.profiler.initial_label, all_paths[0].label)
+        self.assertListEqual(self.profiler.hit_counters, [path.hit_counter for path in all_paths])
+
+    def test_unknown_path(self):
+        self.profiler._increment_hit_counter(self.profiler.initial_label, "INVALID LABEL")
+        self.assertEqual(0, self.profiler.covered_instruction_paths)
+        self.assertEqual(0, sum(self.profiler.hit_counters))
+
+    def test_session(self):
+        # Flow is TS10 <-> TS01 -> TS02 -< TS10 => TS13
+        test_data = TestDataUTS()
+        test_data.seg_name = "TS10"
+        test_data.add_all_reg_pointers(2)
+        test_data.add_all_regs()
+        test_data.add_fields(["EBT000", "EBW000", ("EBX000", 4)], "EB0EB")
+        profiler = ProfilerSession("TS10")
+        execute_profiler(profiler, [test_data] * 3, workers=1)
+        self.assertSetEqual({"TS10", "TS01", "TS02", "TS13"}, set(profiler.profilers))
+        pool_profiler = ProfilerSession("TS10")
+        execute_profiler(pool_profiler, [test_data] * 3, workers=2)
+        pool = get_pool(TpfServer, 2, config.VARIATION_START_METHOD)
+        next_pool_profiler = ProfilerSession("TS10")
+        execute_profiler(next_pool_profiler, [test_data] * 3, workers=2)
+        self.assertIs(pool, get_pool(TpfServer, 2, config.VARIATION_START_METHOD))
+        data = extract_data_from_session(profiler)
+        self.assertEqual(data, extract_data_from_session(pool_profiler))
+        self.assertEqual(data, extract_data_from_session(next_pool_profiler))
+        shutdown_pools()
+        self.assertIsNot(pool, get_pool(TpfServer, 2, config.VARIATION_START_METHOD))
+        shutdown_pools()
+        self.assertListEqual(["TS01", "TS02", "TS10", "TS13"], [segment.seg_name for segment in data.segments])
+        self.assertEqual(data.covered_instruction_paths, profiler.profilers["TS10"].covered_instruction_paths)
+
+
+class ExecutionStatsTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.test_data = TestDataUTS()
+        self.test_data.add_all_reg_pointers(2)
+        self.test_data.add_all_regs()
+        self.test_data.add_fields(["EBT000", "EBW000", ("EBX000", 4)], "EB0EB")
+
+    def test_stats(self):
+        # Flow is TS10 <-> TS01 -> TS02 -< TS10 => TS13
+        self.assertDictEqual(dict(), TpfServer().run("TS10", self.test_data).output.stats)
+        stats = TpfServer().run("TS10", self.test_data, stats=True).output.stats
+        self.assertListEqual(["TS01", "TS02", "TS10", "TS13"], [segment["seg_name"] for segment in stats["segments"]])
+        self.assertEqual(stats["instructions"], sum(command["count"] for command in stats["commands"]))
+        self.assertEqual(stats["nanoseconds"], sum(command["nanoseconds"] for command in stats["commands"]))
+        commands = {command["command"]: command for command in stats["commands"]}
+        self.assertTrue(commands["ENTRC"]["macro"])
+        self.assertFalse(next(command for command in stats["commands"] if not command["macro"])["macro"])
+        total_stats = ExecutionStats()
+        total_stats.add_stats(stats)
+        total_stats.add_stats(stats)
+        self.assertEqual(stats["instructions"] * 2, total_stats.get_stats()["instructions"])
+        self.assertEqual(commands["ENTRC"]["count"] * 2, total_stats.commands["ENTRC"][0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,85 @@
+import os
+import pickle
+import random
+import shutil
 import unittest
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from tempfile import TemporaryDirectory
+from typing import List
+from unittest.mock import patch
 
+from d21_backend.config import config
+from d21_backend.p1_utils.file_line import File, Line, get_lines_from_data_stream
 from d21_backend.p2_assembly.seg6_segment import Segment
-from d21_backend.p2_assembly.seg9_collection import get_seg_collection
+from d21_backend.p2_assembly.seg8_listing import LstCmd, LxpFile, convert_lxp_folder, get_from_lxp, \
+    get_or_create_lines, ListingStore, LocalListingBackend, FirestoreListingBackend, create_listing_commands
+from d21_backend.p2_assembly.mac2_data_macro import get_macros, get_label_macro_name
+from d21_backend.p2_assembly.seg9_collection import get_seg_collection, reload_macros, get_segment
 from d21_backend.p4_execution.ex5_execute import TpfServer
+from d21_backend.p4_execution.prewarm import init_prewarm_worker, assemble_segment, load_macro
+
+
+def get_listing_line(stmt: int, label: str, command: str, operand: str, loc: int = -1, object_code: str = str(),
+                     generated: bool = False, addr1: int = -1) -> str:
+    chars = [" "] * 121
+
+    def put(index: int, text: str):
+        chars[index:index + len(text)] = list(text)
+
+    if loc != -1:
+        put(1, f"{loc:08X}")
+    put(10, object_code)
+    if addr1 != -1:
+        put(25, f"{addr1:08X}")
+    put(43, f"{stmt:6}")
+    put(49, "+" if generated else " ")
+    put(50, f"{label:8} {command:5} {operand}")
+    return "".join(chars).rstrip()
+
+
+def get_synthetic_listing(stmt_count: int, seed: int = 0) -> List[str]:
+    # A listing of TS32 with data macros, executable macros, IBM macros and instructions that use the data macro fields.
+    rand = random.Random(seed)
+    lines = [get_listing_line(1, "", "BEGIN", "NAME=TS32"),
+             get_listing_line(2, "TS32", "CSECT", "", generated=True, loc=0)]
+    stmt, loc = 3, 8
+    fields: List[str] = list()
+    while stmt < stmt_count:
+        kind = rand.randrange(6)
+        if kind in (0, 1) or not fields:
+            lines.append(get_listing_line(stmt, "", "EB0EB", "REG=R9"))
+            lines.append(get_listing_line(stmt + 1, f"M{stmt:05}", "DSECT", "", generated=True, loc=0))
+            lines.append(get_listing_line(stmt + 2, "", "USING", f"M{stmt:05},R9", generated=True, addr1=0))
+            stmt += 3
+            for dsp in range(0, rand.randrange(2, 12) * 4, 4):
+                fields.append(f"F{stmt:06}")
+                if rand.randrange(3) or len(fields) == 1:
+                    lines.append(get_listing_line(stmt, fields[-1], "DS", "F", generated=True, loc=dsp))
+                else:
+                    lines.append(get_listing_line(stmt, fields[-1], "EQU", f"{fields[-2]}+4", generated=True,
+                                                  addr1=dsp))
+                stmt += 1
+        elif kind == 2:
+            lines.append(get_listing_line(stmt, "", "#IF", f"{rand.choice(fields)},EQ,1"))
+            lines.append(get_listing_line(stmt + 1, "", "CLI", f"{rand.choice(fields)},1", generated=True, loc=loc,
+                                          object_code="9501"))
+            lines.append(get_listing_line(stmt + 2, "", "BNE", f"#@LB{stmt}", generated=True, loc=loc + 4,
+                                          object_code="4770"))
+            lines.append(get_listing_line(stmt + 3, f"#@LB{stmt}", "EQU", "*", generated=True, addr1=loc + 8))
+            lines.append(get_listing_line(stmt + 4, f"#@XX{stmt}", "EQU", "*", generated=True, addr1=loc + 8))
+            stmt, loc = stmt + 5, loc + 8
+        elif kind == 3:
+            lines.append(get_listing_line(stmt, "", "ENTNC", "PROG=ABCD"))
+            lines.append(get_listing_line(stmt + 1, "", "L", "R15,=A(ABCD)", generated=True, loc=loc,
+                                          object_code="58F0"))
+            stmt, loc = stmt + 2, loc + 4
+        else:
+            lines.append(get_listing_line(stmt, rand.choice(["", f"L{stmt}"]), "MVC",
+                                          f"{rand.choice(fields)}(4),{rand.choice(fields)}", loc=loc,
+                                          object_code="D203"))
+            stmt, loc = stmt + 1, loc + 6
+    return lines
 
 
 class SegmentTest(unittest.TestCase):
@@ -23,6 +100,212 @@ class SegmentTest(unittest.TestCase):
         #     fh.writelines(f"{node}\n" for node in all_nodes)
         self.assertListEqual(list(), unknown, "\nUnsupported Instruction.")
 
+    def test_segment_cache(self):
+        seg: Segment = get_seg_collection().get_seg("TS01")
+        seg.assemble()
+        seg._save_to_cache(seg.cache_filename)
+        cached_seg = Segment(seg.seg_name, seg.file_name)
+        cached_seg.file_type = seg.file_type
+        self.assertTrue(cached_seg._load_from_cache(cached_seg.cache_filename))
+        self.assertListEqual([str(node) for node in seg.nodes.values()],
+                             [str(node) for node in cached_seg.nodes.values()])
+        self.assertListEqual([str(label_ref) for label_ref in seg.all_labels.values()],
+                             [str(label_ref) for label_ref in cached_seg.all_labels.values()])
+        self.assertEqual(seg.data.constant, cached_seg.data.constant)
+        self.assertIs(seg.lookup("EBW000"), cached_seg.lookup("EBW000"))
+        self.assertEqual(seg.evaluate("EBW000"), cached_seg.evaluate("EBW000"))
+
+    def test_segment_cache_cloud(self):
+        # A cloud segment is downloaded before the cache key is computed and hence a cold instance uses the cache.
+        seg: Segment = get_seg_collection().get_seg("TS01")
+        seg.assemble()
+        seg._save_to_cache(seg.cache_filename)
+
+        def download(_, filename: str) -> bool:
+            shutil.copyfile(seg.file_name, filename)
+            return True
+
+        with TemporaryDirectory() as folder:
+            filename = os.path.join(folder, os.path.basename(seg.file_name))
+            cloud_seg = get_segment("TS01", filename, seg.file_type, config.CLOUD, os.path.basename(filename))
+            with patch("d21_backend.p2_assembly.seg6_segment.download_from_cloud",
+                       side_effect=download) as download_mock:
+                self.assertEqual(seg.cache_filename, cloud_seg.cache_filename)
+                cloud_seg.assemble()
+            download_mock.assert_called_once_with(os.path.basename(filename), filename)
+        self.assertListEqual([str(node) for node in seg.nodes.values()],
+                             [str(node) for node in cloud_seg.nodes.values()])
+        missing_seg = get_segment("TS01", filename, seg.file_type, config.CLOUD, os.path.basename(filename))
+        with patch("d21_backend.p2_assembly.seg6_segment.download_from_cloud", return_value=False):
+            self.assertEqual(str(), missing_seg.cache_filename)
+
+    def test_reload_macros(self):
+        seg: Segment = get_seg_collection().get_seg("TS01")
+        seg.assemble()
+        self.assertIn("EB0EB", seg.macro_names)
+        macro = get_macros()["WA0AA"]
+        macro.load()
+        self.assertTupleEqual((set(), list()), reload_macros())
+        # A change in a macro file invalidates the macro, the macros that inherit it and the segments that use them.
+        stat = os.stat(macro.file_name)
+        os.utime(macro.file_name, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+        try:
+            self.assertTupleEqual(({"WA0AA"}, list()), reload_macros())
+        finally:
+            os.utime(macro.file_name, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertIsNot(macro, get_macros()["WA0AA"])
+        self.assertFalse(get_macros()["WA0AA"].loaded)
+        self.assertEqual("WA0AA", get_label_macro_name("WA0AA"))
+        self.assertIs(seg, get_seg_collection().get_seg("TS01"))
+        invalidated_macros, seg_names = reload_macros({"EB0EB"}, rebuild=True)
+        self.assertIn("WA0AA", invalidated_macros)
+        self.assertNotIn("SYSEQ", invalidated_macros)
+        self.assertIn("TS01", seg_names)
+        rebuilt_seg: Segment = get_seg_collection().get_seg("TS01")
+        self.assertIsNot(seg, rebuilt_seg)
+        self.assertListEqual([str(node) for node in seg.nodes.values()],
+                             [str(node) for node in rebuilt_seg.nodes.values()])
+        self.assertIs(get_macros()["EB0EB"].lookup("EBW000"), rebuilt_seg.lookup("EBW000"))
+
+    def test_prewarm(self):
+        # The worker initializes the macro and segment collections. So it is run in a separate process.
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn"), initializer=init_prewarm_worker,
+                                 initargs=(config.DOMAIN,)) as executor:
+            self.assertEqual("EB0EB", executor.submit(load_macro, "EB0EB").result())
+            result = executor.submit(assemble_segment, "TS01").result()
+        seg: Segment = get_seg_collection().get_seg("TS01")
+        seg.assemble()
+        self.assertEqual("TS01", result.seg_name)
+        self.assertEqual(len(seg.nodes), result.loc)
+        self.assertEqual(0, result.unsupported_count)
+        self.assertEqual(str(), result.error)
+
+    def test_prewarm_error(self):
+        seg: Segment = get_seg_collection().get_seg("TS01")
+        with patch.object(seg, "assemble", side_effect=KeyError("WA0AA")):
+            result = assemble_segment("TS01")
+        self.assertEqual("KeyError: 'WA0AA'", result.error)
+
+    def test_lxp_file(self):
+        lst_cmds: List[LstCmd] = list()
+        for stmt, label, command, operand, dsp in [("    12", "TS32", "EQU", "*", 0),
+                                                   ("     9", "", "USING", "EB0EB,R9", -1),
+                                                   ("   100", "L1", "MVC", "EBW000(2),EBW002", 8)]:
+            lst_cmd = LstCmd()
+            lst_cmd.seg_name, lst_cmd.stmt, lst_cmd.label, lst_cmd.command = "TS32", stmt, label, command
+            lst_cmd.operand, lst_cmd.dsp, lst_cmd.node_exception = operand, dsp, command == "USING"
+            lst_cmds.append(lst_cmd)
+        with TemporaryDirectory() as folder_name:
+            filename = os.path.join(folder_name, "ts32.lxp")
+            with open(filename, "wb") as file:
+                pickle.dump(lst_cmds, file)
+            self.assertFalse(LxpFile.is_lxp_file(filename))
+            self.assertListEqual(list(), convert_lxp_folder(folder_name))
+            self.assertTrue(LxpFile.is_lxp_file(filename))
+            self.assertListEqual(["ts32.lxp"], os.listdir(folder_name))
+            self.assertListEqual([str(lst_cmd) for lst_cmd in sorted(lst_cmds, key=lambda item: item.stmt)],
+                                 [str(lst_cmd) for lst_cmd in get_from_lxp(filename)])
+            lines = get_or_create_lines("TS32", filename, str())
+            with open(filename, "rb") as file:
+                lxp_data = file.read()
+            for size in (0, 10, len(lxp_data) // 2, len(lxp_data) - 1):
+                with open(filename, "wb") as file:
+                    file.write(lxp_data[:size])
+                self.assertIsNone(LxpFile.read(filename), size)
+        self.assertListEqual([9, 12, 100], [line.index for line in lines])
+        self.assertListEqual(["", "TS32", "L1"], [line.label for line in lines])
+        self.assertListEqual([True, False, False], [line.node_exception for line in lines])
+        self.assertEqual("EBW000(2),EBW002", lines[2].operand)
+        self.assertEqual(-1, lines[0].dsp)
+
+    def test_listing_commands(self):
+        lines = [get_listing_line(1, "", "BEGIN", "NAME=TS32"),
+                 get_listing_line(2, "TS32", "CSECT", "", generated=True, loc=0),
+                 get_listing_line(3, "", "EB0EB", "REG=R9"),
+                 get_listing_line(4, "EB0EB", "DSECT", "", generated=True, loc=0),
+                 get_listing_line(5, "EBW000", "DS", "F", generated=True, loc=8),
+                 get_listing_line(6, "EBW004", "EQU", "EBW000+4", generated=True, addr1=12),
+                 get_listing_line(7, "EBX000", "DS", "F", generated=True, loc=16),
+                 get_listing_line(8, "", "#IF", "EBW004,EQ,1"),
+                 get_listing_line(9, "", "CLI", "EBW004,1", generated=True, loc=8, object_code="9501"),
+                 get_listing_line(10, "", "BNE", "#@LB1", generated=True, loc=12, object_code="4770"),
+                 get_listing_line(11, "#@LB1", "EQU", "*", generated=True, addr1=16),
+                 get_listing_line(12, "#@LB2", "EQU", "*", generated=True, addr1=16),
+                 get_listing_line(13, "", "ENTNC", "PROG=ABCD"),
+                 get_listing_line(14, "", "L", "R15,=A(ABCD)", generated=True, loc=16, object_code="58F0")]
+        lst_cmds = create_listing_commands("TS32", lines)
+        self.assertListEqual(["1", "2", "3", "4", "5", "6", "9", "10", "11", "13"],
+                             [lst_cmd.stmt.strip() for lst_cmd in lst_cmds])
+        self.assertListEqual(["1", "2", "3", "4", "5", "6"],
+                             [lst_cmd.stmt.strip() for lst_cmd in lst_cmds if lst_cmd.node_exception])
+        self.assertEqual(8, next(lst_cmd.dsp for lst_cmd in lst_cmds if lst_cmd.command == "CLI"))
+
+    def test_synthetic_listing_commands(self):
+        # The listing commands of a randomly generated listing are pinned for a fixed seed.
+        lines = get_synthetic_listing(40, seed=7)
+        self.assertListEqual(lines, get_synthetic_listing(40, seed=7))
+        lst_cmds = create_listing_commands("TS32", lines)
+        self.assertListEqual(["1", "2", "3", "4", "5", "6", "7", "8", "9", "10", "11", "12", "14", "16", "17", "18",
+                              "24", "25", "26", "32", "33", "34", "35"], [lst_cmd.stmt.strip() for lst_cmd in lst_cmds])
+        self.assertListEqual(["1", "2", "3", "4", "5", "6", "7", "8", "9", "16", "17", "18", "24", "25", "26", "33",
+                              "34", "35"], [lst_cmd.stmt.strip() for lst_cmd in lst_cmds if lst_cmd.node_exception])
+
+    def test_file_lines(self):
+        # CVS adds a header and a space in front of every line.
+        file_lines = ["RCS file: ts99.asm\n", "\n", "          MVC   EBW000(2),EBW002\n", " * Comment\n",
+                      " {:71}X\n".format("         PNRCC ACTION=CRLON,REG=R4,MSG='THIS IS A LONG MESSAGE SPLIT"),
+                      " {:71} \n".format("               ACROSS LINES',WORK=R5"), " LABEL1   EQU   *\n"]
+        with TemporaryDirectory() as folder_name:
+            filename = os.path.join(folder_name, "ts99.asm")
+            with open(filename, "w") as file:
+                file.writelines(file_lines)
+            lines = Line.iter_from_file(File(filename).iter_lines())
+            self.assertEqual("None:MVC:EBW000(2),EBW002", str(next(lines)))
+            self.assertEqual("None:PNRCC:ACTION=CRLON,REG=R4,MSG='THIS IS A LONG MESSAGE SPLIT   ACROSS LINES',"
+                             "WORK=R5", str(next(lines)))
+            self.assertListEqual(["LABEL1:EQU:*"], [str(line) for line in lines])
+        self.assertListEqual(["MVC", "PNRCC", "EQU"],
+                             [line.command for line in get_lines_from_data_stream("".join(file_lines))])
+
+    def test_listing_store(self):
+        def get_lst_cmds(operands: List[str]) -> List[LstCmd]:
+            lst_cmds: List[LstCmd] = list()
+            for index, operand in enumerate(operands):
+                lst_cmd = LstCmd()
+                lst_cmd.seg_name, lst_cmd.stmt, lst_cmd.command, lst_cmd.operand = "TS32", f"{index:6}", "MVC", operand
+                lst_cmds.append(lst_cmd)
+            return lst_cmds
+
+        backend = LocalListingBackend()
+        store = ListingStore(backend)
+        self.assertTupleEqual((3, 0, 0), store.sync("TS32", get_lst_cmds(["A,B", "C,D", "E,F"])))
+        stored_ids = [lst_cmd.id for lst_cmd in store.get("TS32")]
+        self.assertTupleEqual((0, 0, 0), store.sync("TS32", get_lst_cmds(["A,B", "C,D", "E,F"])))
+        self.assertEqual(3, backend.writes)
+        self.assertTupleEqual((0, 1, 1), store.sync("TS32", get_lst_cmds(["A,B", "X,Y"])))
+        self.assertEqual(5, backend.writes)
+        lst_cmds = store.get("TS32")
+        self.assertListEqual(stored_ids[:2], [lst_cmd.id for lst_cmd in lst_cmds])
+        self.assertListEqual(["A,B", "X,Y"], [lst_cmd.operand for lst_cmd in lst_cmds])
+        self.assertTupleEqual((1, 0, 0), store.sync("TS32", get_lst_cmds(["A,B", "X,Y", "E,F"])))
+        self.assertEqual(3, store.delete("TS32"))
+        self.assertListEqual(list(), store.get("TS32"))
+
+    def test_firestore_listing_batches(self):
+        lst_cmds: List[LstCmd] = list()
+        for index in range(450):
+            lst_cmd = LstCmd()
+            lst_cmd.seg_name, lst_cmd.stmt = "TS32", f"{index:6}"
+            lst_cmds.append(lst_cmd)
+        with patch("d21_backend.p2_assembly.seg8_listing.firestore_db") as firestore_db:
+            FirestoreListingBackend().create(lst_cmds)
+            self.assertEqual(3, firestore_db.batch.call_count)  # 200 + 200 + 50 with LST_CMD_BATCH_SIZE of 200
+            self.assertEqual(450, firestore_db.batch.return_value.set.call_count)
+            self.assertEqual(3, firestore_db.batch.return_value.commit.call_count)
+            self.assertTrue(all(lst_cmd.id for lst_cmd in lst_cmds))
+            FirestoreListingBackend().delete(list())
+            self.assertEqual(3, firestore_db.batch.call_count)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+from copy import deepcopy
+
+from d21_backend.config import config
+from d21_backend.p4_execution.ex5_execute import TpfServer
+from d21_backend.p4_execution.trace import NO_TRACE_DATA
+from d21_backend.p8_test.test_local import TestDataUTS
+
+
+class TraceTest(unittest.TestCase):
+    # Flow is TS10 <-> TS01 -> TS02 -< TS10 => TS13
+
+    def setUp(self) -> None:
+        self.tpf_server = self._tpf_server()
+        self.test_data = TestDataUTS()
+        self.test_data.add_all_reg_pointers(2)
+        self.test_data.add_all_regs()
+        self.test_data.add_fields(["EBT000", "EBW000", ("EBX000", 4)], "EB0EB")
+
+    @staticmethod
+    def _tpf_server() -> TpfServer:
+        tpf_server = TpfServer()
+        tpf_server.trace_page = (0, None)
+        return tpf_server
+
+    def test_no_trace(self):
+        test_data = self.tpf_server.run("TS10", self.test_data)
+        self.assertListEqual(list(), test_data.output.traces)
+        self.assertEqual(0, len(self.tpf_server.trace_list.trace_items))
+        self.assertIs(NO_TRACE_DATA, self.tpf_server.trace_data)
+
+    def test_trace(self):
+        self.test_data.output.debug = ["TS01"]
+        traces = self.tpf_server.run("TS10", self.test_data).output.traces
+        self.assertGreater(len(traces), 0)
+        self.assertSetEqual({"TS01"}, {trace["seg_name"] for trace in traces})
+        self.assertTrue(any(trace["read1"] for trace in traces))
+        trace_list = deepcopy(self.tpf_server.trace_list)
+        self.assertIs(self.tpf_server.trace_list.trace_items[0][0], trace_list.trace_items[0][0])
+        self.assertListEqual(traces, trace_list.get_traces())
+
+    def test_trace_buffer_size(self):
+        self.test_data.output.debug = ["TS01"]
+        output = self._tpf_server().run("TS10", self.test_data).output
+        traces = output.traces
+        self.assertEqual(0, output.traces_dropped)
+        trace_buffer_size = config.TRACE_BUFFER_SIZE
+        config.TRACE_BUFFER_SIZE = 3
+        try:
+            last_output = self._tpf_server().run("TS10", self.test_data).output
+        finally:
+            config.TRACE_BUFFER_SIZE = trace_buffer_size
+        self.assertListEqual(traces[-3:], last_output.traces)
+        self.assertEqual(3, last_output.trace_count)
+        self.assertEqual(len(traces) - 3, last_output.traces_dropped)
+
+    def test_trace_page(self):
+        self.test_data.output.debug = ["TS01"]
+        output = self._tpf_server().run("TS10", self.test_data).output
+        self.assertEqual(len(output.traces), output.trace_count)
+        tpf_server = TpfServer()
+        tpf_server.trace_page = (2, 3)
+        page_output = tpf_server.run("TS10", self.test_data).output
+        self.assertListEqual(output.traces[2:5], page_output.traces)
+        self.assertEqual(output.trace_count, page_output.trace_count)
+        self.assertListEqual(output.traces[2:5], tpf_server.trace_list.get_traces(2, 3))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -11,7 +11,7 @@ from d21_backend.p1_utils.data_type import DataType
 from d21_backend.p1_utils.domain import get_bucket, get_domain_folder, is_domain_valid, get_folder_by_domain, get_base_folder, read_folder
 from d21_backend.p1_utils.ucdr import date_to_pars, pars_to_date
 from d21_backend.p2_assembly.seg6_segment import Segment
-from d21_backend.p2_assembly.seg8_listing import LstCmd, create_lxp
+from d21_backend.p2_assembly.seg8_listing import sync_lst_cmds, create_lxp, convert_lxp_folder
 from d21_backend.p2_assembly.seg9_collection import SegLst, get_segment, get_seg_collection, SegmentCollection
 from d21_backend.p7_flask_app.segment import get_seg_lst, reset_seg_assembly
 
@@ -61,6 +61,14 @@ def reset_and_create_lxp(blob_name: str):
     return
 
 
+def convert_all_lxp():
+    # Convert the pickled lxp files of the domain and base to the columnar format.
+    for folder_name in (get_domain_folder(config.LXP), get_base_folder(config.LXP)):
+        failed = convert_lxp_folder(folder_name)
+        print(f"{folder_name}: {len(failed)} not converted {failed}" if failed else f"{folder_name}: converted")
+    return
+
+
 def init_asm_seg(filename: str, base):
     # Example: init_asm_seg("ts30.asm",base=True)
     seg_name: str = SegmentCollection.filename_parser(filename)
@@ -146,7 +154,7 @@ def migrate_to_lst(seg_name: str):
     if not seg:
         print("Error in creating a segment object.")
         return
-    LstCmd.objects.filter_by(seg_name=seg.seg_name).delete()
+    sync_lst_cmds(seg.seg_name, seg.file_name, seg.blob_name)
     seg_lst: SegLst = get_seg_lst(seg)  # Assemble the segment and create LstCmd
     print(f"{seg_name} listing commands generated and filed.")
     # Create LXP
@@ -31,6 +31,7 @@ class Config:
     ECB_LEVELS: tuple = ("0", "1", "2", "3", "4", "5", "6", "7", "8", "9", "A", "B", "C", "D", "E", "F")
     DEFAULT_MACROS: tuple = ("WA0AA", "EB0EB", "MI0MI")
     AAAPNR: str = "AAAAAA"
+    TRACE_PAGE_SIZE: int = 500
     PNR_KEYS = [
         ("name", "NAME"),
         ("hfax", "HFAX"),
@@ -1,3 +1,4 @@
+import json
 from base64 import b64decode
 from types import SimpleNamespace
 from typing import Dict, List, Union
@@ -248,6 +249,28 @@ class Server:
             "No Stop Segments"
         return test_data
 
+    @classmethod
+    def get_traces(cls, test_data_id: str, result_id: int, cursor: int) -> dict:
+        # The traces are streamed as NDJSON. The last line has the trace count and the cursor of the next page.
+        try:
+            response = cls._send_request(f"/test_data/{test_data_id}/traces",
+                                         params={"result_id": result_id, "cursor": cursor,
+                                                 "limit": Config.TRACE_PAGE_SIZE})
+        except requests.exceptions.ConnectionError:
+            flash("Unable to connect to server. Try after some time or contact administrator.")
+            return dict()
+        if response.status_code == 401 and current_user.is_authenticated:
+            flash("Session timeout. Please login again.")
+            logout_user()
+        if response.status_code != 200:
+            return dict()
+        lines = response.get_data(as_text=True) if Config.SERVER_URL == ServerCallTags.CALL_LOCAL else response.text
+        traces = [json.loads(line) for line in lines.splitlines() if line]
+        trace_page = traces.pop()
+        trace_page["traces"] = traces
+        trace_page["cursor"] = cursor
+        return trace_page
+
     @classmethod
     def search_field(cls, field_name: str) -> dict:
         field_name = quote(field_name)
@@ -7,6 +7,7 @@ from flask_login import current_user
 from werkzeug.datastructures import MultiDict
 from wtforms import BooleanField
 
+from d29_frontend.config import Config
 from d29_frontend.flask_app import tpf2_app
 from d29_frontend.flask_app.server import Server
 from d29_frontend.flask_app.template_forms import CommentUpdateForm, SaveResultForm
@@ -110,6 +111,20 @@ def run_test_data(test_data_id: str):
     return render_template("test_data_variation.html", title="Results", test_data=test_data)
 
 
+@tpf2_app.route("/test_data/<string:test_data_id>/traces/<int:result_id>")
+@cookie_login_required
+def get_traces(test_data_id: str, result_id: int):
+    cursor = request.args.get("cursor", 0, type=int)
+    trace_page = Server.get_traces(test_data_id, result_id, cursor)
+    if not current_user.is_authenticated:
+        return redirect(url_for("logout"))
+    if not trace_page:
+        flash("Error in retrieving the traces")
+        return redirect(url_for("get_test_data", test_data_id=test_data_id))
+    return render_template("test_data_traces.html", title="Traces", test_data_id=test_data_id, result_id=result_id,
+                           trace_page=trace_page, page_size=Config.TRACE_PAGE_SIZE)
+
+
 @tpf2_app.route("/test_results/<test_data_id>/save_test_results", methods=["GET", "POST"])
 @cookie_login_required
 @error_check